@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 10:05:32 2026
+
+Synthetic GridREx-style rule sets and problem instances for the benchmarks.
+"""
+
+import numpy as np
+
+import const_define as cd
+from utils.rule_sets import CompiledRules
+
+
+def grid_cuts(n_rules, n_dims):
+    """
+    Returns the number of intervals of each input, so that the grid has about n_rules cells.
+    """
+    n_cuts = [1] * n_dims
+    # Split the input with the fewest intervals until the grid is large enough
+    while int(np.prod(n_cuts)) < n_rules:
+        n_cuts[int(np.argmin(n_cuts))] += 1
+    return n_cuts
+
+
+def grid_rule_set(target, inputs, lbs, ubs, n_rules, seed=0):
+    """
+    Generates a GridREx-style rule set: the box [lbs, ubs] is split in a regular grid with about n_rules hypercubes,
+    and each hypercube has its own random linear THEN expression of the inputs.
+
+    :param target: model variable predicted by the rules (e.g., 'y_ANTICIPATE_memAvg(MB)')
+    :param inputs: model variables of the IF statements (e.g., ['y_nScenarios', 'y_PV_mean'])
+    :param lbs: lower bounds of the inputs
+    :param ubs: upper bounds of the inputs
+    :param n_rules: approximate number of rules
+    :param seed: random seed
+
+    :return: CompiledRules object
+    """
+    rng = np.random.default_rng(seed)
+    n_cuts = grid_cuts(n_rules, len(inputs))
+    edges = [np.linspace(lb, ub, k + 1) for lb, ub, k in zip(lbs, ubs, n_cuts)]
+    cells = np.stack(np.meshgrid(*[np.arange(k) for k in n_cuts], indexing='ij'), axis=-1).reshape(-1, len(inputs))
+    lb = np.stack([edges[j][cells[:, j]] for j in range(len(inputs))], axis=1)
+    ub = np.stack([edges[j][cells[:, j] + 1] for j in range(len(inputs))], axis=1)
+    return CompiledRules(target, inputs, lb, ub, *_random_then(rng, len(cells), lbs, ubs))
+
+
+def tree_rule_set(target, inputs, lbs, ubs, n_rules, seed=0):
+    """
+    Generates a decision-tree-style rule set: the box [lbs, ubs] is recursively split at random points of random inputs
+    until there are n_rules boxes. Unlike grid_rule_set, the boxes do not form a grid.
+
+    :return: CompiledRules object
+    """
+    rng = np.random.default_rng(seed)
+    boxes = [(np.asarray(lbs, dtype=float), np.asarray(ubs, dtype=float))]
+    while len(boxes) < n_rules:
+        # Split the largest box
+        i = int(np.argmax([np.prod(ub - lb) for lb, ub in boxes]))
+        lb, ub = boxes.pop(i)
+        j = int(rng.integers(len(inputs)))
+        cut = lb[j] + (ub[j] - lb[j]) * rng.uniform(0.25, 0.75)
+        left_ub, right_lb = ub.copy(), lb.copy()
+        left_ub[j], right_lb[j] = cut, cut
+        boxes += [(lb, left_ub), (right_lb, ub)]
+    lb = np.stack([box[0] for box in boxes])
+    ub = np.stack([box[1] for box in boxes])
+    return CompiledRules(target, inputs, lb, ub, *_random_then(rng, len(boxes), lbs, ubs))
+
+
+def _random_then(rng, n, lbs, ubs):
+    """
+    Returns random intercepts and coefficients such that each THEN expression ranges in about [10, 100] on the box.
+    """
+    width = np.asarray(ubs, dtype=float) - np.asarray(lbs, dtype=float)
+    coef = rng.uniform(0., 1., size=(n, len(width))) * 50. / (len(width) * np.maximum(width, 1e-9))
+    intercept = 10. + rng.uniform(0., 40., size=n) - coef @ np.asarray(lbs, dtype=float)
+    return intercept, coef
+
+
+def format_gridrex_rules(rules):
+    """
+    Returns the rules (CompiledRules object or list of rule dicts) in the textual format of the GridREx exports (see
+    utils.rule_sets.parse_gridrex_rules), e.g., to write a synthetic rule set as the export file of an ML model.
+    """
+    lines = []
+    for rule in rules:
+        conditions = [f'{var_name} in ({lb!r}, {ub!r})'
+                      for var_name, (lb, ub) in zip(rule['if']['variable'], rule['if']['value'])]
+        lines.append('IF ' + ' AND '.join(conditions))
+        lines.append(f"THEN {rule['then']['variable'][0]} == {rule['then']['value'][0]}")
+    return '\n'.join(lines) + '\n'
+
+
+def synthetic_problem(n_rules, n_dims, n_algs=1, structure='grid', seed=0):
+    """
+    Generates a synthetic problem with the data structures used by build_and_solve_EML.
+    Each algorithm has one hyperparameter and its rules predict y_{ALG}_memAvg(MB) from the hyperparameter and
+    n_dims - 1 instance features.
+
+    :param n_rules: approximate number of rules of each algorithm
+    :param n_dims: number of inputs of the rules
+    :param n_algs: number of algorithms
+    :param structure: 'grid' (see grid_rule_set) or 'tree' (see tree_rule_set)
+    :param seed: random seed
+
+    :return: dict with the arguments df_mins, df_maxs, logic_constraints, algs, inst_descr and ml_trgt of
+        build_and_solve_EML
+    """
+    import pandas as pd
+
+    generator = {'grid': grid_rule_set, 'tree': tree_rule_set}[structure]
+    rng = np.random.default_rng(seed)
+    inst_descr = [f'feat{j}' for j in range(n_dims - 1)]
+    ml_trgt = list(cd.ML_TARGETS)
+
+    algs = {}
+    logic_constraints = {}
+    df_mins = {}
+    df_maxs = {}
+    glob_mins = {var: 0. for var in inst_descr}
+    glob_maxs = {var: 100. for var in inst_descr}
+    for a in range(n_algs):
+        alg = f'ALG{a}'
+        param = f'nParam{a}'
+        model = f'synthetic_{structure}_{alg}'
+        algs[alg] = {'dataset_cols': [param],
+                     'alg_params': {'0': {'name': param, 'type': int}},
+                     'ml_model': {model: {'target': 'memAvg(MB)', 'features': param}}}
+        glob_mins[param], glob_maxs[param] = 1., 100.
+
+        inputs = [param] + inst_descr[:n_dims - 1]
+        rules = generator(target=f'y_{alg}_memAvg(MB)', inputs=[f'y_{var}' for var in inputs],
+                          lbs=[glob_mins[var] for var in inputs], ubs=[glob_maxs[var] for var in inputs],
+                          n_rules=n_rules, seed=int(rng.integers(1 << 31)))
+        logic_constraints[alg] = {model: rules}
+
+        # Bounds of the ML targets: the range of the rules for the predicted target, random for the other ones
+        mins = {'memAvg(MB)': 0., 'time(sec)': float(rng.uniform(1., 10.)), 'sol(keuro)': float(rng.uniform(1., 10.))}
+        maxs = {'memAvg(MB)': 150., 'time(sec)': float(rng.uniform(50., 100.)),
+                'sol(keuro)': float(rng.uniform(50., 100.))}
+        index = [param] + inst_descr + ml_trgt
+        df_mins[alg] = pd.Series([glob_mins.get(var, mins.get(var)) for var in index], index=index, dtype=float)
+        df_maxs[alg] = pd.Series([glob_maxs.get(var, maxs.get(var)) for var in index], index=index, dtype=float)
+
+    index = list(glob_mins) + ml_trgt
+    df_mins['glob'] = pd.concat([df_mins[alg] for alg in algs], axis=1).min(axis=1).reindex(index)
+    df_maxs['glob'] = pd.concat([df_maxs[alg] for alg in algs], axis=1).max(axis=1).reindex(index)
+
+    return {'df_mins': df_mins, 'df_maxs': df_maxs, 'logic_constraints': logic_constraints, 'algs': algs,
+            'inst_descr': inst_descr, 'ml_trgt': ml_trgt}
+
+
+def synthetic_user_constraints(n_constraints, seed=0):
+    """
+    Generates n_constraints user constraints on the ML targets, with values chosen so that the problem stays feasible.
+
+    :return: dict {'variable': [...], 'type': [...], 'value': [...]}
+    """
+    rng = np.random.default_rng(seed)
+    # The lower bound on memAvg(MB) comes last: it is the one binding the minimum of the rules' target
+    choices = [('memAvg(MB)', '<=', (60., 100.)), ('time(sec)', '<=', (60., 100.)), ('sol(keuro)', '>=', (1., 10.)),
+               ('memAvg(MB)', '>=', (15., 30.))]
+    user_constraints = {'variable': [], 'type': [], 'value': []}
+    for i in range(n_constraints):
+        var_name, cstr_type, (low, high) = choices[i % len(choices)]
+        user_constraints['variable'].append(var_name)
+        user_constraints['type'].append(cstr_type)
+        user_constraints['value'].append(round(float(rng.uniform(low, high)), 2))
+    return user_constraints
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 11:48:09 2026
+
+Benchmarks of build_and_solve_EML on synthetic rule sets.
+
+Usage (from the project directory):
+    python -m benchmarks.run_benchmarks --suite quick --out bench.jsonl
+
+Each case runs in a fresh process, so that the peak memory of a case is not affected by the previous ones. The results
+are appended to the output file as JSON lines with a fixed set of fields (see RESULT_FIELDS), and summarized in a
+table on stdout.
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+# Bump when the fields of the results, or what they measure, change
+BENCHMARK_FORMAT_VERSION = 4
+
+# Objective of the cases: the target predicted by the synthetic rules (see generators.synthetic_problem), so that the
+# solve goes through the encoding of the rules
+OBJECTIVE_TYPE = 'min'
+OBJECTIVE_VAR = 'memAvg(MB)'
+
+RESULT_FIELDS = ['format_version', 'commit', 'suite', 'case', 'n_rules', 'n_dims', 'n_algs', 'structure',
+                 'n_constraints', 'formulation', 'engine', 'backend', 'repeat', 'status', 'objective_value', 'build_time',
+                 'solve_time', 'total_time', 'peak_rss_mb', 'variables', 'binary_variables', 'linear_constraints',
+                 'indicator_constraints', 'pwl_constraints', 'nodes', 'iterations', 'error']
+
+# Suites: lists of cases (n_rules, n_dims, n_algs, structure, n_constraints). 'quick' fits the limits of the CPLEX
+# Community Edition (1000 variables and constraints), the larger cases of 'scaling' need an open-source backend
+SUITES = {
+    'quick': [(5, 1, 1, 'grid', 1), (25, 2, 1, 'grid', 2), (64, 3, 1, 'grid', 2), (25, 2, 2, 'grid', 4),
+              (40, 2, 1, 'tree', 2)],
+    'scaling': [(n_rules, n_dims, n_algs, structure, 2)
+                for n_rules, n_dims, n_algs, structure in itertools.product([10, 100, 1000], [1, 2, 4], [1, 2],
+                                                                            ['grid', 'tree'])],
+}
+
+
+def _git_commit():
+    """
+    Returns the current git commit of the project, or None outside of a git repository.
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_case(n_rules, n_dims, n_algs, structure, n_constraints, formulation, engine='mip', backend='cplex', seed=0):
+    """
+    Runs a benchmark case in the current process.
+
+    :return: dict with the fields of RESULT_FIELDS measured on the case
+    """
+    from benchmarks.generators import synthetic_problem, synthetic_user_constraints
+    from utils.build_model_symbolic import build_and_solve_EML
+    from utils.instrumentation import RunMetrics
+    from utils.util_functions import setup_logging
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        setup_logging(level='quiet', log_file=os.path.join(tmp_dir, 'log.txt'))
+
+        problem = synthetic_problem(n_rules, n_dims, n_algs=n_algs, structure=structure, seed=seed)
+        user_constraints = synthetic_user_constraints(n_constraints, seed=seed)
+        metrics = RunMetrics()
+        result = {}
+        start = time.perf_counter()
+        try:
+            build_and_solve_EML(user_constraints=user_constraints, objective_type=OBJECTIVE_TYPE,
+                                objective_var=OBJECTIVE_VAR,
+                                model_name='benchmark', save_path=tmp_dir, formulation=formulation,
+                                snapshot_dir=None, runs_log='runs.jsonl', metrics=metrics, engine=engine,
+                                backend=backend, **problem)
+        except Exception as e:
+            # e.g., the size limits of the CPLEX Community Edition
+            result['status'] = 'error'
+            result['error'] = f'{type(e).__name__}: {e}'.splitlines()[0]
+        result['total_time'] = time.perf_counter() - start
+
+        # The phases are measured even if the solve fails, the model size and solver statistics only in the run record
+        phases = metrics.phases
+        result['build_time'] = sum(phases.get(phase, 0.) for phase in ['variables', 'rules', 'enumeration_setup',
+                                                                       'user_constraints', 'objective'])
+        result['solve_time'] = phases.get('solve')
+        runs_log = os.path.join(tmp_dir, 'runs.jsonl')
+        if os.path.exists(runs_log):
+            with open(runs_log) as f:
+                record = json.loads(f.readlines()[-1])
+            result['status'] = record['solver'].get('status')
+            result['objective_value'] = record['solver'].get('objective_value')
+            result['nodes'] = record['solver'].get('nodes')
+            result['iterations'] = record['solver'].get('iterations')
+            result.update(record['model'])
+        result['peak_rss_mb'] = metrics.memory().get('peak_rss_mb')
+        return result
+
+
+def _run_case_star(args):
+    return run_case(*args)
+
+
+def run_suite(cases, formulations, engines=('mip',), backends=('cplex',), repeat=1, suite='custom', out=None):
+    """
+    Runs the benchmark cases, each one in a fresh process.
+
+    :param cases: list of tuples (n_rules, n_dims, n_algs, structure, n_constraints)
+    :param formulations: list of formulations of the logic rules (see utils.formulations.FORMULATIONS)
+    :param engines: list of engines of build_and_solve_EML ('mip', 'enumeration' or 'auto')
+    :param backends: list of solver backends of the MIP model (see utils.backends.BACKENDS)
+    :param repeat: number of runs of each case
+    :param suite: name of the suite, stored in the results
+    :param out: path of the JSON-lines file where the results are appended; if None, they are not saved
+
+    :return: list of results
+    """
+    commit = _git_commit()
+    # 'spawn' gives each case a fresh interpreter, so the peak RSS and the import state do not leak between cases
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for (n_rules, n_dims, n_algs, structure, n_constraints), formulation, engine, backend, r in itertools.product(
+            cases, formulations, engines, backends, range(repeat)):
+        with ctx.Pool(1) as pool:
+            measures = pool.apply(_run_case_star,
+                                  ((n_rules, n_dims, n_algs, structure, n_constraints, formulation, engine, backend),))
+        result = {field: None for field in RESULT_FIELDS}
+        result.update(format_version=BENCHMARK_FORMAT_VERSION, commit=commit, suite=suite,
+                      case=f'{structure}-r{n_rules}-d{n_dims}-a{n_algs}-c{n_constraints}', n_rules=n_rules,
+                      n_dims=n_dims, n_algs=n_algs, structure=structure, n_constraints=n_constraints,
+                      formulation=formulation, engine=engine, backend=backend, repeat=r)
+        result.update({field: value for field, value in measures.items() if field in result})
+        results.append(result)
+        print(_format_row(result), flush=True)
+        if out is not None:
+            with open(out, 'a') as f:
+                f.write(json.dumps(result) + '\n')
+    return results
+
+
+_TABLE_COLUMNS = [('case', 28, 's'), ('formulation', 11, 's'), ('engine', 11, 's'), ('backend', 7, 's'),
+                  ('status', 26, 's'), ('build_time', 10, '.4f'),
+                  ('solve_time', 10, '.4f'), ('peak_rss_mb', 11, '.1f'), ('variables', 9, 'd'),
+                  ('binary_variables', 16, 'd'), ('indicator_constraints', 21, 'd')]
+
+
+def _format_row(result):
+    cells = []
+    for field, width, fmt in _TABLE_COLUMNS:
+        value = result[field]
+        cells.append(('-' if value is None else format(value, fmt))[:width].ljust(width))
+    return ' '.join(cells)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of build_and_solve_EML on synthetic rule sets.')
+    parser.add_argument('--suite', choices=sorted(SUITES), default='quick')
+    parser.add_argument('--formulations', default='indicator',
+                        help='comma-separated formulations of the logic rules (e.g., indicator,bigm,grid)')
+    parser.add_argument('--engines', default='mip',
+                        help='comma-separated engines of build_and_solve_EML (mip, enumeration, auto)')
+    parser.add_argument('--backends', default='cplex',
+                        help='comma-separated solver backends of the MIP model (cplex, highs)')
+    parser.add_argument('--repeat', type=int, default=1, help='number of runs of each case')
+    parser.add_argument('--out', default=None, help='JSON-lines file where the results are appended')
+    args = parser.parse_args(argv)
+
+    print(f'# suite={args.suite} python={platform.python_version()} platform={platform.platform()}')
+    print(' '.join(field.ljust(width) for field, width, _ in _TABLE_COLUMNS))
+    run_suite(SUITES[args.suite], args.formulations.split(','), engines=args.engines.split(','),
+              backends=args.backends.split(','), repeat=args.repeat, suite=args.suite, out=args.out)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
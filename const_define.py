@@ -11,6 +11,22 @@ import os
 PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(PROJECT_DIR, 'CP2021_datasets')
 MODEL_DIR = os.path.join(PROJECT_DIR, 'models')
+CACHE_DIR = os.path.join(PROJECT_DIR, 'cache')
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, 'snapshots')
+# Solver parameters tuned for each base model (see utils.tuning)
+SOLVER_PROFILES_FILE = os.path.join(CACHE_DIR, 'solver_profiles.json')
+
+# PV/Load instances of the empirical validation (see utils.batch)
+VALIDATION_SET = os.path.join(DATA_DIR, 'EmpiricalValidationSet.csv')
+
+# Confidence margins of the ML targets, {ALG}_coefficients_{k}_{confidence}[_pruned].csv (see utils.confidence)
+COEFFICIENTS_DIR = os.path.join(PROJECT_DIR, 'data')
+
+# JSON-lines file with one record per run (see utils.instrumentation)
+RUNS_LOG = 'eml_runs.jsonl'
+
+# GridREx export, stored in each ML model directory
+RULES_FILE = 'gridrex_rules.txt'
 
 # Data constants
 ALG_PARAM = {'ANTICIPATE': 'nScenarios',
@@ -21,3 +37,5 @@ TARGET = {'ANTICIPATE':
               {MODEL_DIR + '/no_input-memory_DecisionTree_MaxDepth10': 'memAvg(MB)'}}
 ML_TARGETS = ['memAvg(MB)', 'time(sec)', 'sol(keuro)']
 INSTANCE_FEATURES = ['PV_mean', 'PV_std', 'Load_mean', 'Load_std']
+# Columns of the confidence margin files and the ML targets they refer to
+MARGIN_TARGETS = {'Cost': 'sol(keuro)', 'Time': 'time(sec)', 'Memory': 'memAvg(MB)'}
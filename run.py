@@ -7,23 +7,44 @@ Created on Thu Mar 2 16:37:45 2023
 
 import const_define as cd
 from utils.build_model_symbolic import build_and_solve_EML
-from utils.util_functions import define_algs_dict, load_var_intervals, define_logic_rules
+from utils.compression import compress_logic_rules
+from utils.instrumentation import RunMetrics
+from utils.model_io import rules_key
+from utils.presolve import presolve
+from utils.util_functions import define_algs_dict, load_var_intervals, define_logic_rules, setup_logging
 
 # Specify the ML model(s) and algorithm(s) of interest
 # TODO: We focused on 'no_input-memory_DecisionTree_MaxDepth10' with ANTICIPATE algorithm.
 #  Extend the procedure to the other models.
 ML_MODELS = [cd.MODEL_DIR + '/no_input-memory_DecisionTree_MaxDepth10']
 ALGS = ['ANTICIPATE']
+# Maximum deviation of the compressed rules from the GridREx ones in their hypercubes (None: no compression)
+COMPRESSION_TOL = None
 
 if __name__ == '__main__':
+    # Log level: 'quiet', 'info' or 'debug' (per-rule and per-constraint dumps)
+    setup_logging(level='info', log_file='log_shell.txt')
+
+    # Per-phase timing and peak memory, appended to eml_runs.jsonl with the solver statistics
+    metrics = RunMetrics()
+
     # Define dictionary for the desired ml model(s) and algorithm(s)
     algs_dict = define_algs_dict(ml_models=ML_MODELS, algs=ALGS)
 
     # Load variables intervals
-    globmaxdict, globmindict = load_var_intervals(algs_dict=algs_dict)
+    with metrics.phase('bounds_loading'):
+        globmaxdict, globmindict = load_var_intervals(algs_dict=algs_dict)
 
     # Define logic rules extracted by GridREx
-    logic_constraints = define_logic_rules(algs=ALGS, ml_models=ML_MODELS)
+    with metrics.phase('rules_loading'):
+        logic_constraints = define_logic_rules(algs=ALGS, ml_models=ML_MODELS)
+
+    # Merge the adjacent rules with equivalent THEN expressions and drop the rules not reached by the training data
+    if COMPRESSION_TOL is not None:
+        with metrics.phase('compression'):
+            logic_constraints, _ = compress_logic_rules(logic_constraints=logic_constraints, algs=algs_dict,
+                                                        tol=COMPRESSION_TOL, df_mins=globmindict,
+                                                        df_maxs=globmaxdict)
 
     # Define user constraints
     # TODO: usage examples are in Boscarini's code
@@ -32,6 +53,18 @@ if __name__ == '__main__':
     user_constraints['type'] = []  # ['<=']
     user_constraints['value'] = []  # [70, 90] min functioning values
 
+    # Key of the solver profile tuned by tune.py, on the rules before the presolve, which depends on the user constraints
+    profile_key = rules_key(logic_constraints=logic_constraints, algs=algs_dict, inst_descr=cd.INSTANCE_FEATURES,
+                            ml_trgt=cd.ML_TARGETS, enable_var_type=False, formulation='indicator',
+                            grid_encoding='unary')
+
+    # Drop the rules ruled out by the user constraints and tighten the variable bounds
+    with metrics.phase('presolve'):
+        globmindict, globmaxdict, logic_constraints, _ = presolve(df_mins=globmindict, df_maxs=globmaxdict,
+                                                                  logic_constraints=logic_constraints,
+                                                                  user_constraints=user_constraints,
+                                                                  algs=algs_dict, ml_trgt=cd.ML_TARGETS)
+
     # Define objective function
     objective_var = 'sol(keuro)'
     objective_type = 'min'
@@ -47,4 +80,6 @@ if __name__ == '__main__':
                         enable_var_type=False,
                         inst_descr=cd.INSTANCE_FEATURES,
                         ml_trgt=cd.ML_TARGETS,
-                        algs=algs_dict)
+                        algs=algs_dict,
+                        metrics=metrics,
+                        profile_key=profile_key)
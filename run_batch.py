@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:21:08 2026
+
+Batch version of run.py: solves the problem for each instance of the empirical validation set, with the instance
+features fixed to the values of the instance.
+"""
+
+import const_define as cd
+from utils.batch import solve_instances
+from utils.util_functions import define_algs_dict, load_var_intervals, define_logic_rules, load_instances, \
+    setup_logging
+
+# Specify the ML model(s) and algorithm(s) of interest
+ML_MODELS = [cd.MODEL_DIR + '/no_input-memory_DecisionTree_MaxDepth10']
+ALGS = ['ANTICIPATE']
+
+if __name__ == '__main__':
+    setup_logging(level='info', log_file='log_batch.txt')
+
+    algs_dict = define_algs_dict(ml_models=ML_MODELS, algs=ALGS)
+    globmaxdict, globmindict = load_var_intervals(algs_dict=algs_dict)
+    logic_constraints = define_logic_rules(algs=ALGS, ml_models=ML_MODELS)
+
+    # Instance features of the validation instances, computed from their PV/Load series
+    instances = load_instances(cd.VALIDATION_SET)
+
+    # Define user constraints, shared by all the instances
+    user_constraints = {}
+    user_constraints['variable'] = []  # ['time(sec)']
+    user_constraints['type'] = []  # ['<=']
+    user_constraints['value'] = []  # [70, 90] min functioning values
+
+    # Solve all the instances with a process pool; results in validation_results.parquet (or .csv without pyarrow).
+    # The objective is memAvg(MB), the target of the rules of ML_MODELS, so that the optimum depends on the instance
+    # features
+    solve_instances(instances=instances,
+                    df_mins=globmindict,
+                    df_maxs=globmaxdict,
+                    user_constraints=user_constraints,
+                    logic_constraints=logic_constraints,
+                    objective_type='min',
+                    objective_var='memAvg(MB)',
+                    out='validation_results',
+                    enable_var_type=False,
+                    inst_descr=cd.INSTANCE_FEATURES,
+                    ml_trgt=cd.ML_TARGETS,
+                    algs=algs_dict)
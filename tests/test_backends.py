@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 00:47:09 2026
+
+Solver backends (utils.backends): the same optimum with CPLEX and HiGHS, and the big-M translation of the indicator
+constraints (utils.formulations.indicators_to_bigm).
+"""
+
+import pytest
+
+from benchmarks.generators import synthetic_problem
+from utils.build_model_symbolic import EMLSession
+from utils.formulations import indicators_to_bigm
+from utils.rule_index import check_solution
+from utils.util_functions import setup_logging
+
+MEM = 'memAvg(MB)'
+
+
+def constraints(*triples):
+    return {'variable': [t[0] for t in triples], 'type': [t[1] for t in triples], 'value': [t[2] for t in triples]}
+
+
+# User constraints, objective and fixed variables of the queries; the last one is infeasible
+QUERIES = [(constraints(), 'min', MEM, {}),
+           (constraints(), 'max', MEM, {}),
+           (constraints((MEM, '>=', 40.)), 'min', MEM, {}),
+           (constraints((MEM, '<=', 60.), ('time(sec)', '<=', 40.)), 'max', 'sol(keuro)', {}),
+           (constraints(), 'min', MEM, {'y_feat0': 37.5}),
+           (constraints((MEM, '<=', 1.)), 'min', MEM, {})]
+
+
+@pytest.fixture(autouse=True)
+def quiet_log():
+    setup_logging(level='quiet', log_file=None)
+
+
+def objective_values(session, problem):
+    values = []
+    for user_constraints, objective_type, objective_var, fixed in QUERIES:
+        session.fix_variables(fixed)
+        session.set_user_constraints(user_constraints)
+        session.set_objective(objective_type, objective_var)
+        sol = session.solve()
+        values.append(None if sol is None else sol.objective_value)
+        if sol is not None:
+            # The solution follows the rules
+            for alg, (_, _, _, ok) in check_solution(sol, problem['logic_constraints'], problem['algs']).items():
+                assert ok, f'{alg}: the solution does not follow the rules'
+    return values
+
+
+@pytest.mark.parametrize('formulation,objective_linearization', [('indicator', 'mccormick'), ('bigm', 'mccormick'),
+                                                                 ('grid', 'mccormick'), ('indicator', 'indicator')])
+def test_same_objective_with_cplex_and_highs(formulation, objective_linearization):
+    pytest.importorskip('highspy')
+    problem = synthetic_problem(25, 2, n_algs=2, seed=4)
+    values = {backend: objective_values(EMLSession(**problem, formulation=formulation,
+                                                   objective_linearization=objective_linearization, backend=backend),
+                                        problem)
+              for backend in ['cplex', 'highs']}
+
+    assert values['cplex'][-1] is None and values['highs'][-1] is None
+    assert values['highs'] == pytest.approx(values['cplex'], rel=1e-6, abs=1e-6)
+
+
+def test_indicators_to_bigm():
+    pytest.importorskip('highspy')
+    from docplex.mp.model import Model
+
+    from utils.backends import solve_highs
+
+    mdl = Model(name='indicators')
+    x = mdl.continuous_var(lb=0., ub=10., name='x')
+    y = mdl.continuous_var(lb=-5., ub=5., name='y')
+    z = mdl.binary_var(name='z')
+    # z == 1: x >= 7 and y == 2; z == 0: x + y <= 3
+    mdl.add_indicator(z, x >= 7.)
+    mdl.add_indicator(z, y == 2.)
+    mdl.add_indicator(z, x + y <= 3., active_value=0)
+    objectives = [('max', x - 2 * y), ('min', x + y - 4 * z), ('max', y - x), ('max', x + y)]
+    optima = []
+    for sense, objective in objectives:
+        mdl.set_objective(sense, objective)
+        optima.append(mdl.solve().objective_value)
+
+    assert indicators_to_bigm(mdl) == 3
+    assert mdl.number_of_indicator_constraints == 0
+    for (sense, objective), value in zip(objectives, optima):
+        mdl.set_objective(sense, objective)
+        assert mdl.solve().objective_value == pytest.approx(value, abs=1e-6)
+        sol, _ = solve_highs(mdl)
+        assert sol.objective_value == pytest.approx(value, abs=1e-6)
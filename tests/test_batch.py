@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 01:12:26 2026
+
+Batch solution over many instances (utils.batch): the streamed results file against the same instances solved one by
+one with EMLSession.fix_variables.
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils.batch as batch
+from benchmarks.generators import synthetic_problem
+from utils.batch import solve_instances
+from utils.build_model_symbolic import EMLSession
+from utils.util_functions import setup_logging
+
+MEM = 'memAvg(MB)'
+USER_CONSTRAINTS = {'variable': [MEM], 'type': ['>='], 'value': [20.]}
+
+
+@pytest.fixture(autouse=True)
+def quiet_log():
+    setup_logging(level='quiet', log_file=None)
+
+
+def read_results(path):
+    return pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'csv'])
+def test_results_match_fix_variables(tmp_path, monkeypatch, fmt):
+    if fmt == 'parquet':
+        pytest.importorskip('pyarrow')
+    else:
+        # Without pyarrow, the results are written to a csv file
+        monkeypatch.setitem(sys.modules, 'pyarrow', None)
+        monkeypatch.setitem(sys.modules, 'pyarrow.parquet', None)
+    # Several writes of the buffered rows
+    monkeypatch.setattr(batch, 'BATCH_WRITE_ROWS', 4)
+
+    problem = synthetic_problem(25, 3, n_algs=1, seed=5)
+    rng = np.random.default_rng(5)
+    instances = pd.DataFrame(rng.uniform(0., 100., (14, 2)), columns=problem['inst_descr'])
+    # Outside the bounds of the first feature
+    instances.loc[6, 'feat0'] = 150.
+
+    path = solve_instances(instances=instances, user_constraints=USER_CONSTRAINTS, objective_type='min',
+                           objective_var=MEM, out=str(tmp_path / 'results'), snapshot_dir=str(tmp_path / 'snapshots'),
+                           n_workers=2, chunksize=3, **problem)
+    assert path.endswith(f'.{fmt}')
+    if fmt == 'parquet':
+        import pyarrow.parquet
+
+        # One row group per write
+        assert pyarrow.parquet.ParquetFile(path).num_row_groups == 4
+    results = read_results(path)
+    assert results['instance'].tolist() == instances.index.tolist()
+    np.testing.assert_allclose(results[problem['inst_descr']].to_numpy(), instances.to_numpy())
+
+    # The same instances, one after the other on a single session
+    session = EMLSession(**problem)
+    session.set_user_constraints(USER_CONSTRAINTS)
+    session.set_objective('min', MEM)
+    for instance_id, row in instances.iterrows():
+        result = results.loc[results['instance'] == instance_id].iloc[0]
+        values = {f'y_{var}': v for var, v in row.items()}
+        if instance_id == 6:
+            with pytest.raises(ValueError):
+                session.fix_variables(values)
+            assert result['status'].startswith('out of bounds')
+            continue
+        session.fix_variables(values)
+        sol = session.solve()
+        assert result['status'] == str(session.solve_details.status)
+        assert result['objective_value'] == pytest.approx(sol.objective_value, abs=1e-6)
+        assert result['algorithm'] == 'ALG0'
+        for var_name, v in values.items():
+            assert result[var_name] == pytest.approx(v)
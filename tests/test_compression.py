@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:41:05 2026
+
+Compression of the rules (utils.compression): adjacency of the hypercubes and bound of the merge deviation.
+"""
+
+import numpy as np
+import pytest
+
+from utils.compression import _adjacent_pairs, _max_deviation, compress_rules
+from utils.rule_index import RuleIndex
+from utils.rule_sets import CompiledRules
+from utils.util_functions import setup_logging
+
+INPUTS = ['y_a', 'y_b']
+
+
+@pytest.fixture(autouse=True)
+def quiet_log():
+    setup_logging(level='quiet', log_file=None)
+
+
+def grid_rules(n, intercept, coef):
+    """
+    Returns the rules of an n x n grid on [0, n]^2, rule k = i * n + j covering [i, i + 1] x [j, j + 1], with the THEN
+    expressions given by the functions intercept(i, j) and coef(i, j).
+    """
+    cells = [(i, j) for i in range(n) for j in range(n)]
+    return CompiledRules('y_t', INPUTS, [[i, j] for i, j in cells], [[i + 1, j + 1] for i, j in cells],
+                         [intercept(i, j) for i, j in cells], [coef(i, j) for i, j in cells])
+
+
+def uniform_points(n, size, seed=0):
+    return np.random.default_rng(seed).uniform(0, n, (size, 2))
+
+
+def test_adjacent_pairs():
+    # 2 x 2 grid, plus a cell [2, 3] x [0, 2] whose union with a single cell of the grid is not a hypercube
+    lb = np.array([[0, 0], [0, 1], [1, 0], [1, 1], [2, 0]], dtype=float)
+    ub = np.array([[1, 1], [1, 2], [2, 1], [2, 2], [3, 2]], dtype=float)
+    alive = np.ones(len(lb), dtype=bool)
+    assert _adjacent_pairs(lb, ub, alive, 1e-9) == [(0, 1), (0, 2), (1, 3), (2, 3)]
+
+    # Once 2 and 3 are merged into [1, 2] x [0, 2], the merged cell is adjacent to the last one
+    lb[2], ub[2] = [1, 0], [2, 2]
+    alive[3] = False
+    assert _adjacent_pairs(lb, ub, alive, 1e-9) == [(0, 1), (2, 4)]
+
+    # Bounds equal within the tolerance
+    lb[4, 0] = 2 + 1e-12
+    assert (2, 4) in _adjacent_pairs(lb, ub, alive, 1e-9)
+    assert (2, 4) not in _adjacent_pairs(lb, ub, alive, 1e-15)
+
+
+def test_adjacent_pairs_unbounded():
+    # Half-lines on the first input: adjacent at 0, but nothing follows an upper bound at infinity
+    lb = np.array([[-np.inf, 0], [0, 0]])
+    ub = np.array([[0, 1], [np.inf, 1]])
+    assert _adjacent_pairs(lb, ub, np.ones(2, dtype=bool), 1e-9) == [(0, 1)]
+
+
+def test_max_deviation():
+    lb, ub = np.array([[0., 0.], [1., 0.]]), np.array([[1., 1.], [2., 1.]])
+    ref_intercept, ref_coef = np.array([0., 1.]), np.array([[1., 0.], [0., 1.]])
+    # 2 a + b vs a on [0, 1]^2: largest at (1, 1); vs 1 + b on [1, 2] x [0, 1]: largest at (2, 0)
+    assert _max_deviation(0., np.array([2., 1.]), ref_intercept, ref_coef, lb, ub) == pytest.approx(3.)
+    # Same coefficients on an unbounded input: no contribution
+    lb[:, 1], ub[:, 1] = -np.inf, np.inf
+    assert _max_deviation(0., np.array([2., 0.]), ref_intercept[:1], ref_coef[:1] * [1, 0], lb[:1], ub[:1]) == \
+        pytest.approx(1.)
+    assert _max_deviation(0., np.array([2., 1.]), ref_intercept, ref_coef, lb, ub) == np.inf
+
+
+def test_merge_equal_expressions():
+    rules = grid_rules(3, lambda i, j: 5., lambda i, j: [1., -2.])
+    X = uniform_points(3, 500)
+    compressed, report = compress_rules(rules, X, y=5 + X[:, 0] - 2 * X[:, 1], tol=1e-6)
+
+    assert len(compressed) == 1 and report['merged'] == 8
+    assert report['max_deviation'] == pytest.approx(0.)
+    np.testing.assert_allclose(compressed.lb, [[0, 0]])
+    np.testing.assert_allclose(compressed.ub, [[3, 3]])
+    assert report['max_error'] == pytest.approx((0., 0.))
+
+
+def test_merge_bounded_in_the_hypercubes():
+    # a and a + 10 (b - 0.5) agree on the training points (b = 0.5), but differ by up to 5 in the hypercubes
+    rules = CompiledRules('y_t', INPUTS, [[0, 0], [1, 0]], [[1, 1], [2, 1]], [0., -5.], [[1., 0.], [1., 10.]])
+    X = np.column_stack([np.linspace(0.01, 1.99, 200), np.full(200, 0.5)])
+    compressed, report = compress_rules(rules, X, tol=0.1)
+    assert report['merged'] == 0 and len(compressed) == len(rules)
+    _, report = compress_rules(rules, X, tol=5.)
+    assert report['merged'] == 1 and report['max_deviation'] == pytest.approx(5.)
+
+    # Close enough everywhere: merged, within the tolerance at any point of the original hypercubes
+    rules = grid_rules(4, lambda i, j: 0.01 * ((i + j) % 3), lambda i, j: [1. + 0.005 * i, -1.])
+    X = uniform_points(4, 1000, seed=1)
+    compressed, report = compress_rules(rules, X, tol=0.1)
+    assert report['merged'] > 0 and report['max_deviation'] <= 0.1
+    check = uniform_points(4, 20000, seed=2)
+    deviation = RuleIndex(compressed).predict(check) - RuleIndex(rules).predict(check)
+    assert np.max(np.abs(deviation)) <= report['max_deviation'] + 1e-9
+
+
+def test_merge_unbounded_inputs_in_the_domain():
+    # The second input is unbounded in the rules and only appears in the THEN expressions
+    lb, ub = [[0, -np.inf], [1, -np.inf]], [[1, np.inf], [2, np.inf]]
+    rules = CompiledRules('y_t', INPUTS, lb, ub, [0., 0.], [[1., 0.], [1., 0.01]])
+    X = np.column_stack([uniform_points(2, 200)[:, 0], np.zeros(200)])
+
+    _, report = compress_rules(rules, X, tol=0.1)
+    assert report['merged'] == 0
+    compressed, report = compress_rules(rules, X, tol=0.1, domain=([0, -5], [2, 5]))
+    assert report['merged'] == 1 and report['max_deviation'] <= 0.1
+    # The merged rule keeps the bounds of the original ones: the domain only limits the check of the deviation
+    np.testing.assert_allclose(compressed.lb, [[0, -np.inf]])
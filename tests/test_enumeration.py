@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:26:14 2026
+
+Choice of the engine of build_and_solve_EML: the enumeration of the rules against the MIP model.
+"""
+
+import numpy as np
+import pytest
+
+import utils.build_model_symbolic as build_model_symbolic
+import utils.enumeration as enumeration
+from benchmarks.generators import synthetic_problem
+from utils.build_model_symbolic import EMLSession, build_and_solve_EML
+from utils.enumeration import EnumerationSession
+from utils.instrumentation import RunMetrics
+from utils.rule_sets import as_compiled_rules
+from utils.util_functions import setup_logging
+
+
+@pytest.fixture(autouse=True)
+def quiet_log():
+    setup_logging(level='quiet', log_file=None)
+
+
+def solve(problem, tmp_path, engine='auto', **options):
+    metrics = RunMetrics()
+    sol = build_and_solve_EML(df_mins=problem['df_mins'], df_maxs=problem['df_maxs'],
+                              user_constraints={'variable': [], 'type': [], 'value': []},
+                              logic_constraints=problem['logic_constraints'], objective_type='min',
+                              objective_var='memAvg(MB)', save_path=str(tmp_path), inst_descr=problem['inst_descr'],
+                              ml_trgt=problem['ml_trgt'], algs=problem['algs'], snapshot_dir=None, runs_log=None,
+                              metrics=metrics, engine=engine, **options)
+    return sol, 'enumeration_setup' in metrics.phases
+
+
+def test_enumeration_limits():
+    problem = synthetic_problem(25, 3, seed=0)
+    kwargs = {name: problem[name] for name in ['df_mins', 'df_maxs', 'logic_constraints', 'algs', 'inst_descr',
+                                               'ml_trgt']}
+    n_rules = len(as_compiled_rules(problem['logic_constraints']['ALG0']['synthetic_grid_ALG0']))
+    assert enumeration.enumeration_support(**kwargs, enable_var_type=False) is None
+    assert enumeration.enumeration_support(**kwargs, enable_var_type=False, max_rules=n_rules, max_inputs=3) is None
+    assert 'rules of ALG0' in enumeration.enumeration_support(**kwargs, enable_var_type=False, max_rules=n_rules - 1)
+    assert 'inputs of the rules of ALG0' in enumeration.enumeration_support(**kwargs, enable_var_type=False,
+                                                                            max_inputs=2)
+
+
+def test_auto_engine_falls_back_to_mip(tmp_path, monkeypatch):
+    problem = synthetic_problem(25, 2, seed=0)
+    enumerated, used_enumeration = solve(problem, tmp_path)
+    assert used_enumeration
+
+    # Above the limits of engine='auto' the MIP model is built, with the same optimum
+    monkeypatch.setattr(build_model_symbolic, 'AUTO_ENUMERATION_MAX_RULES', 10)
+    sol, used_enumeration = solve(problem, tmp_path)
+    assert not used_enumeration
+    assert sol.objective_value == pytest.approx(enumerated.objective_value, abs=1e-6)
+    # The limits do not apply to an explicit engine='enumeration'
+    assert solve(problem, tmp_path, engine='enumeration')[1]
+
+    monkeypatch.undo()
+    monkeypatch.setattr(build_model_symbolic, 'AUTO_ENUMERATION_MAX_INPUTS', 1)
+    assert not solve(problem, tmp_path)[1]
+
+
+@pytest.mark.parametrize('options', [{'formulation': 'bigm'}, {'formulation': 'grid', 'grid_encoding': 'log'},
+                                     {'objective_linearization': 'indicator'}, {'backend': 'highs'},
+                                     {'solver_profile': 'deterministic'}])
+def test_auto_engine_keeps_mip_options(tmp_path, options):
+    problem = synthetic_problem(25, 2, seed=0)
+    enumerated, used_enumeration = solve(problem, tmp_path)
+    assert used_enumeration
+    # An option of the MIP model selects it, rather than being dropped by the enumeration
+    sol, used_enumeration = solve(problem, tmp_path, **options)
+    assert not used_enumeration
+    assert sol.objective_value == pytest.approx(enumerated.objective_value, abs=1e-6)
+
+
+def test_fix_variables_matches_mip():
+    problem = synthetic_problem(25, 3, seed=1)
+    kwargs = {name: problem[name] for name in ['df_mins', 'df_maxs', 'logic_constraints', 'algs', 'inst_descr',
+                                               'ml_trgt']}
+    sessions = [EnumerationSession(**kwargs), EMLSession(**kwargs)]
+    bounds = [(float(problem['df_mins']['glob'].loc[var]), float(problem['df_maxs']['glob'].loc[var]))
+              for var in problem['inst_descr']]
+    rng = np.random.default_rng(1)
+    fixes = [{}] + [{f'y_{var}': float(rng.uniform(lb, ub)) for var, (lb, ub) in zip(problem['inst_descr'], bounds)}
+                    for _ in range(4)] + [{}]
+    for values in fixes:
+        for objective_type in ['min', 'max']:
+            objectives = []
+            for session in sessions:
+                session.fix_variables(values)
+                session.set_objective(objective_type, 'memAvg(MB)')
+                sol = session.solve()
+                objectives.append(sol.objective_value)
+                for var_name, v in values.items():
+                    assert sol[var_name] == pytest.approx(v)
+            assert objectives[0] == pytest.approx(objectives[1], abs=1e-6)
+
+    var_name = f"y_{problem['inst_descr'][0]}"
+    with pytest.raises(ValueError):
+        sessions[0].fix_variables({var_name: bounds[0][1] + 1.})
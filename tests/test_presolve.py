@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 23:58:12 2026
+
+Presolve of the logic rules (utils.presolve): pruning of the rules ruled out by the user constraints, and bounds that
+never cut off the optimum.
+"""
+
+import numpy as np
+import pytest
+
+from benchmarks.generators import synthetic_problem
+from utils.build_model_symbolic import open_session
+from utils.presolve import presolve, rule_images
+from utils.rule_sets import as_compiled_rules
+from utils.util_functions import setup_logging
+
+MEM = 'memAvg(MB)'
+
+
+@pytest.fixture(autouse=True)
+def quiet_log():
+    setup_logging(level='quiet', log_file=None)
+
+
+def constraints(*triples):
+    return {'variable': [t[0] for t in triples], 'type': [t[1] for t in triples], 'value': [t[2] for t in triples]}
+
+
+def rule_keys(rules):
+    return {(tuple(lb), tuple(ub)) for lb, ub in zip(rules.lb, rules.ub)}
+
+
+@pytest.mark.parametrize('cstr_type, value', [('<=', 25.), ('>=', 60.)])
+def test_rules_ruled_out_are_dropped(cstr_type, value):
+    problem = synthetic_problem(64, 2, seed=0)
+    model = 'synthetic_grid_ALG0'
+    rules = as_compiled_rules(problem['logic_constraints']['ALG0'][model])
+    lbs = np.array([problem['df_mins']['glob'].loc[var[2:]] for var in rules.inputs])
+    ubs = np.array([problem['df_maxs']['glob'].loc[var[2:]] for var in rules.inputs])
+    y_min, y_max, _ = rule_images(rules, lbs, ubs)
+    feasible = y_min <= value if cstr_type == '<=' else y_max >= value
+    assert 0 < feasible.sum() < len(rules)
+
+    df_mins, df_maxs, logic_constraints, report = presolve(
+        df_mins=problem['df_mins'], df_maxs=problem['df_maxs'], logic_constraints=problem['logic_constraints'],
+        user_constraints=constraints((MEM, cstr_type, value)), algs=problem['algs'], ml_trgt=problem['ml_trgt'])
+
+    # Exactly the rules whose THEN range misses the constraint are dropped
+    presolved = as_compiled_rules(logic_constraints['ALG0'][model])
+    assert rule_keys(presolved) == rule_keys(rules.take(feasible))
+    assert report['ALG0'] == (len(rules), int(feasible.sum()))
+    # The bound of the target is tightened by the constraint, and the arguments are not modified
+    assert df_maxs['ALG0'].loc[MEM] <= value if cstr_type == '<=' else df_mins['ALG0'].loc[MEM] >= value
+    assert len(as_compiled_rules(problem['logic_constraints']['ALG0'][model])) == len(rules)
+
+
+def solve(problem, user_constraints, objective_type, presolved):
+    if presolved:
+        df_mins, df_maxs, logic_constraints, _ = presolve(df_mins=problem['df_mins'], df_maxs=problem['df_maxs'],
+                                                          logic_constraints=problem['logic_constraints'],
+                                                          user_constraints=user_constraints, algs=problem['algs'],
+                                                          ml_trgt=problem['ml_trgt'])
+        problem = dict(problem, df_mins=df_mins, df_maxs=df_maxs, logic_constraints=logic_constraints)
+    session = open_session(**problem, snapshot_dir=None, solver_profile='deterministic')
+    session.set_user_constraints(user_constraints)
+    session.set_objective(objective_type, MEM)
+    sol = session.solve()
+    return None if sol is None else sol.objective_value
+
+
+@pytest.mark.parametrize('user_constraints', [
+    constraints(),
+    constraints((MEM, '<=', 25.)),
+    constraints((MEM, '>=', 60.)),
+    constraints((MEM, '>=', 30.), (MEM, '<=', 40.)),
+    constraints((MEM, '>=', 30.), ('time(sec)', '<=', 70.)),
+    constraints((MEM, '<=', 1.)),
+])
+def test_presolve_keeps_the_optimum(user_constraints):
+    problem = synthetic_problem(25, 2, n_algs=2, seed=3)
+    for objective_type in ['min', 'max']:
+        reference = solve(problem, user_constraints, objective_type, presolved=False)
+        objective = solve(problem, user_constraints, objective_type, presolved=True)
+        if reference is None:
+            assert objective is None
+        else:
+            assert objective == pytest.approx(reference, abs=1e-6)
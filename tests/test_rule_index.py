@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 00:21:37 2026
+
+Evaluation of the rules as a predictor (utils.rule_index.RuleIndex) against a brute-force scan of the hypercubes.
+"""
+
+import numpy as np
+import pytest
+
+from benchmarks.generators import grid_rule_set, tree_rule_set
+from utils.rule_index import RuleIndex
+from utils.util_functions import setup_logging
+
+INPUTS = ['y_a', 'y_b', 'y_c']
+LBS, UBS = [0., 0., 0.], [10., 20., 5.]
+
+
+@pytest.fixture(autouse=True)
+def quiet_log():
+    setup_logging(level='quiet', log_file=None)
+
+
+def unbounded(rules):
+    """
+    Returns the rules with the outer faces of the hypercubes moved to infinity.
+    """
+    lb, ub = rules.lb.copy(), rules.ub.copy()
+    lb[lb == np.array(LBS)] = -np.inf
+    ub[ub == np.array(UBS)] = np.inf
+    return type(rules)(rules.target, rules.inputs, lb, ub, rules.intercept, rules.coef)
+
+
+def rule_sets():
+    grid = grid_rule_set('y_t', INPUTS, LBS, UBS, 60, seed=0)
+    tree = tree_rule_set('y_t', INPUTS, LBS, UBS, 60, seed=1)
+    # Rules dropped (e.g., by the presolve or the compression) leave holes in the domain
+    keep = np.random.default_rng(2).uniform(size=len(grid)) > 0.3
+    return {'grid': (grid, 'grid'), 'tree': (tree, 'interval'), 'grid_holes': (grid.take(keep), 'grid'),
+            'tree_holes': (tree.take(keep[:len(tree)]), 'interval'), 'unbounded_grid': (unbounded(grid), 'grid'),
+            'unbounded_tree': (unbounded(tree), 'interval')}
+
+
+def sample_points(rules, size, seed=0):
+    """
+    Returns random points in and around the domain, and points on the faces, edges and corners of the hypercubes.
+    """
+    rng = np.random.default_rng(seed)
+    lbs, ubs = np.array(LBS), np.array(UBS)
+    margin = 0.1 * (ubs - lbs)
+    inside = rng.uniform(lbs - margin, ubs + margin, (size, len(INPUTS)))
+    # Random rule, with a random subset of its coordinates moved to one of its faces
+    rows = rng.integers(len(rules), size=size)
+    lb = np.where(np.isfinite(rules.lb[rows]), rules.lb[rows], lbs - margin)
+    ub = np.where(np.isfinite(rules.ub[rows]), rules.ub[rows], ubs + margin)
+    faces = rng.uniform(lb, ub)
+    on_face = rng.uniform(size=faces.shape) < 0.5
+    faces = np.where(on_face, np.where(rng.uniform(size=faces.shape) < 0.5, lb, ub), faces)
+    return np.vstack([inside, faces])
+
+
+def brute_force(rules, X, tol):
+    """
+    Returns the mask of the hypercubes containing each point, and the THEN expressions of all the rules at each point.
+    """
+    contains = np.all((X[:, None, :] >= rules.lb[None] - tol) & (X[:, None, :] <= rules.ub[None] + tol), axis=2)
+    return contains, rules.intercept[None] + X @ rules.coef.T
+
+
+@pytest.mark.parametrize('name', list(rule_sets()))
+def test_matches_brute_force(name):
+    rules, kind = rule_sets()[name]
+    index = RuleIndex(rules)
+    assert index.kind == kind
+    X = sample_points(rules, 2000)
+    located = index.locate(X)
+    predicted = index.predict(X)
+    contains, thens = brute_force(rules, X, index.tol)
+
+    # Located exactly where some hypercube contains the point, and then in one of them
+    found = contains.any(axis=1)
+    np.testing.assert_array_equal(located >= 0, found)
+    assert np.all(contains[np.flatnonzero(found), located[found]])
+    # The prediction is the THEN expression of the located rule, NaN elsewhere
+    np.testing.assert_allclose(predicted[found], thens[np.flatnonzero(found), located[found]])
+    assert np.all(np.isnan(predicted[~found]))
+    # Away from the faces, a single hypercube contains the point
+    single = contains.sum(axis=1) == 1
+    np.testing.assert_array_equal(located[single], np.argmax(contains[single], axis=1))
+
+
+def test_matches_brute_force_in_chunks(monkeypatch):
+    import utils.rule_index as rule_index
+
+    rules = rule_sets()['tree_holes'][0]
+    X = sample_points(rules, 500, seed=3)
+    expected = RuleIndex(rules).locate(X)
+    monkeypatch.setattr(rule_index, 'LOCATE_CHUNK_ROWS', 64)
+    np.testing.assert_array_equal(RuleIndex(rules).locate(X), expected)
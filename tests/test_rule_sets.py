@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:48:10 2026
+
+Parsing and compilation of the GridREx rules (utils.rule_sets).
+"""
+
+import numpy as np
+import pytest
+
+from benchmarks.generators import format_gridrex_rules, grid_rule_set, tree_rule_set
+from utils.rule_sets import CompiledRules, align_rules, load_rules, parse_gridrex_rules
+
+
+@pytest.mark.parametrize('generator', [grid_rule_set, tree_rule_set])
+def test_gridrex_export_round_trip(tmp_path, generator):
+    inputs = ['y_nParam0', 'y_feat0', 'y_feat1']
+    rules = generator('y_ALG0_memAvg(MB)', inputs, [1., 0., -5.], [10., 1., 5.], 30, seed=0)
+    rules_file = tmp_path / 'rules.txt'
+    rules_file.write_text(format_gridrex_rules(rules))
+
+    # Parsed once, then read from the cache
+    for _ in range(2):
+        loaded = load_rules('ALG0', str(tmp_path), rules_file=str(rules_file), cache_dir=str(tmp_path / 'cache'))
+        loaded = align_rules(loaded, rules.target, rules.inputs)
+        for name in ['lb', 'ub', 'intercept', 'coef']:
+            np.testing.assert_array_equal(getattr(loaded, name), getattr(rules, name))
+
+
+def test_gridrex_export_half_bounded():
+    rules = CompiledRules('y_ALG0_memAvg(MB)', ['y_a', 'y_b'], [[-np.inf, 0.]], [[2.5, np.inf]], [1.], [[-0.5, 0.]])
+    text = format_gridrex_rules(rules)
+    # Infinite bounds and zero coefficients are written as such, or omitted
+    assert text.splitlines()[0] == 'IF y_a in (-inf, 2.5) AND y_b in (0.0, inf)'
+    assert 'y_b' not in text.splitlines()[1]
+    loaded = align_rules(CompiledRules.from_rules(parse_gridrex_rules(text, 'ALG0')), rules.target, rules.inputs)
+    for name in ['lb', 'ub', 'intercept', 'coef']:
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(rules, name))
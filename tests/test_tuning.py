@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:02:37 2026
+
+Offline tuning of the solver parameters (utils.tuning): cold solves and the check against the default profile.
+"""
+
+import json
+import os
+
+import pytest
+
+import const_define as cd
+
+from benchmarks.generators import synthetic_problem
+from utils.build_model_symbolic import build_and_solve_EML, open_session
+from utils.model_io import rules_key, snapshot_key
+from utils.presolve import presolve
+from utils.solver_params import save_tuned_profile
+from utils.tuning import run_queries, tune_solver_profile
+from utils.util_functions import setup_logging
+
+NO_CONSTRAINTS = {'variable': [], 'type': [], 'value': []}
+QUERIES = [{'user_constraints': NO_CONSTRAINTS, 'objective_type': 'min', 'objective_var': 'memAvg(MB)'},
+           {'user_constraints': {'variable': ['memAvg(MB)'], 'type': ['>='], 'value': [12.]},
+            'objective_type': 'min', 'objective_var': 'memAvg(MB)'}]
+
+
+@pytest.fixture(autouse=True)
+def quiet_log():
+    setup_logging(level='quiet', log_file=None)
+
+
+def test_run_queries_from_scratch():
+    problem = synthetic_problem(25, 2, n_algs=2, seed=0)
+    session = open_session(**problem, snapshot_dir=None, solver_profile={'threads': 1})
+    iterations = []
+    for _ in range(3):
+        times, objectives = run_queries(session, QUERIES[:1])
+        iterations.append(session.solve_details.nb_iterations)
+        assert len(times) == 1 and objectives[0] is not None
+    # The same work at each solve, i.e., no start from the previous solution, and the parameters are restored
+    assert len(set(iterations)) == 1
+    assert session.solver_params == {'threads': 1}
+
+
+def test_tuned_profile_saved_above_min_gain(tmp_path):
+    problem = synthetic_problem(25, 2, n_algs=1, seed=0)
+    profiles_file = str(tmp_path / 'profiles.json')
+    kwargs = dict(problem, queries=QUERIES, snapshot_dir=None, space={}, repeats=2, profiles_file=profiles_file)
+
+    result = tune_solver_profile(**kwargs, min_gain=1.)
+    assert not result['saved'] and not os.path.exists(profiles_file)
+
+    # Any candidate other than the default one is saved, whatever its gain
+    result = tune_solver_profile(**kwargs, min_gain=-float('inf'))
+    assert result['saved'] == (result['profile'] != 'default') == os.path.exists(profiles_file)
+
+
+def test_tuned_profile_reused_across_user_constraints(tmp_path, monkeypatch):
+    problem = synthetic_problem(25, 2, n_algs=1, seed=0)
+    options = dict(enable_var_type=False, formulation='indicator', grid_encoding='unary')
+    profile_key = rules_key(logic_constraints=problem['logic_constraints'], algs=problem['algs'],
+                            inst_descr=problem['inst_descr'], ml_trgt=problem['ml_trgt'], **options)
+    profiles_file = str(tmp_path / 'profiles.json')
+    monkeypatch.setattr(cd, 'SOLVER_PROFILES_FILE', profiles_file)
+    save_tuned_profile(profile_key, 'cplex', {'threads': 1}, profiles_file=profiles_file)
+
+    model_keys = set()
+    for user_constraints in [NO_CONSTRAINTS, {'variable': ['memAvg(MB)'], 'type': ['<='], 'value': [20.]}]:
+        df_mins, df_maxs, logic_constraints, _ = presolve(df_mins=problem['df_mins'], df_maxs=problem['df_maxs'],
+                                                          logic_constraints=problem['logic_constraints'],
+                                                          user_constraints=user_constraints, algs=problem['algs'],
+                                                          ml_trgt=problem['ml_trgt'])
+        kwargs = dict(problem, df_mins=df_mins, df_maxs=df_maxs, logic_constraints=logic_constraints)
+        model_keys.add(snapshot_key(**kwargs, **options))
+
+        session = open_session(**kwargs, snapshot_dir=None, profile_key=profile_key)
+        assert session.solver_profile == 'tuned' and session.solver_params == {'threads': 1}
+
+        # The default engine builds the MIP model to use the tuned profile
+        build_and_solve_EML(**kwargs, user_constraints=user_constraints, objective_type='min',
+                            objective_var='memAvg(MB)', save_path=str(tmp_path), snapshot_dir=None,
+                            profile_key=profile_key)
+        with open(tmp_path / cd.RUNS_LOG) as f:
+            options_run = json.loads(f.readlines()[-1])['options']
+        assert options_run['engine'] == 'mip' and options_run['solver_profile'] == 'tuned'
+
+    # The presolved models differ, but share the profile
+    assert len(model_keys) == 2
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:12:40 2026
+
+Rules patched in a built model (EMLSession.update_rules) against a fresh build with the same rules.
+"""
+
+import numpy as np
+import pytest
+
+from benchmarks.generators import synthetic_problem
+from utils.build_model_symbolic import EMLSession, open_session
+from utils.rule_sets import CompiledRules, as_compiled_rules, diff_rules, index_rules, rule_keys
+from utils.util_functions import setup_logging
+
+
+@pytest.fixture(autouse=True)
+def quiet_log():
+    setup_logging(level='quiet', log_file=None)
+
+
+def retrain(rules, rng, n_modified=2, n_split=2):
+    """
+    Returns shuffled rules where n_modified rules have a new THEN expression and n_split rules are split in two along
+    their first bounded input, i.e., n_split rules are removed and 2 * n_split added.
+    """
+    lb, ub = rules.lb.copy(), rules.ub.copy()
+    intercept, coef = rules.intercept.copy(), rules.coef.copy()
+    modified = rng.choice(len(rules), n_modified, replace=False)
+    intercept[modified] += rng.uniform(-20, 20, n_modified)
+    coef[modified] *= rng.uniform(0.5, 1.5, coef[modified].shape)
+    keep = np.ones(len(rules), dtype=bool)
+    new_lb, new_ub, new_intercept, new_coef = [], [], [], []
+    for i in rng.choice(np.setdiff1d(np.arange(len(rules)), modified), n_split, replace=False):
+        col = int(np.flatnonzero(np.isfinite(lb[i]) & np.isfinite(ub[i]))[0])
+        mid = (lb[i, col] + ub[i, col]) / 2
+        for low, high, shift in [(lb[i, col], mid, -5.), (mid, ub[i, col], 5.)]:
+            row_lb, row_ub = lb[i].copy(), ub[i].copy()
+            row_lb[col], row_ub[col] = low, high
+            new_lb.append(row_lb)
+            new_ub.append(row_ub)
+            new_intercept.append(intercept[i] + shift)
+            new_coef.append(coef[i])
+        keep[i] = False
+    new_rules = CompiledRules(rules.target, rules.inputs, np.vstack([lb[keep]] + new_lb),
+                              np.vstack([ub[keep]] + new_ub), np.concatenate([intercept[keep], new_intercept]),
+                              np.vstack([coef[keep]] + new_coef))
+    return new_rules.take(rng.permutation(len(new_rules)))
+
+
+def session_kwargs(problem, logic_constraints=None, **kwargs):
+    return dict(df_mins=problem['df_mins'], df_maxs=problem['df_maxs'],
+                logic_constraints=logic_constraints or problem['logic_constraints'], inst_descr=problem['inst_descr'],
+                ml_trgt=problem['ml_trgt'], algs=problem['algs'], **kwargs)
+
+
+def objective_values(session, problem):
+    """
+    Returns the optimal memAvg(MB), minimized and maximized, with free and fixed instance features.
+    """
+    feature = problem['inst_descr'][0]
+    fixed = {f'y_{feature}': float((problem['df_mins']['glob'].loc[feature] +
+                                    problem['df_maxs']['glob'].loc[feature]) / 2)}
+    values = []
+    for variables in [{}, fixed]:
+        session.fix_variables(variables)
+        for objective_type in ['min', 'max']:
+            session.set_objective(objective_type, 'memAvg(MB)')
+            sol = session.solve()
+            values.append(None if sol is None else round(sol.objective_value, 4))
+    session.fix_variables({})
+    return values
+
+
+def retrain_all(problem, logic_constraints, rng, **kwargs):
+    """
+    Returns the logic constraints with the rules of every algorithm retrained (see retrain).
+    """
+    new_constraints = {}
+    for alg, ml_models in logic_constraints.items():
+        model = list(problem['algs'][alg]['ml_model'].keys())[0]
+        new_constraints[alg] = {model: retrain(as_compiled_rules(ml_models[model]), rng, **kwargs)}
+    return new_constraints
+
+
+def update_all(session, problem, logic_constraints):
+    return {alg: session.update_rules(alg, ml_models[list(problem['algs'][alg]['ml_model'].keys())[0]])
+            for alg, ml_models in logic_constraints.items()}
+
+
+def test_diff_rules():
+    rules = as_compiled_rules(synthetic_problem(25, 2, seed=0)['logic_constraints']['ALG0']['synthetic_grid_ALG0'])
+    new_rules = retrain(rules, np.random.default_rng(0), n_modified=3, n_split=2)
+    index = index_rules(*rule_keys(rules), range(len(rules)))
+    ids, modified, removed, added = diff_rules(index, *rule_keys(new_rules))
+
+    assert len(modified) == 3 and len(removed) == 2 and len(added) == 4
+    # The kept rules map to their old id, the modified ones to the id of the rule with the same hypercube
+    for i in np.flatnonzero(ids >= 0):
+        assert np.array_equal(new_rules.lb[i], rules.lb[ids[i]]) and np.array_equal(new_rules.ub[i], rules.ub[ids[i]])
+    for rule_id, i in modified:
+        assert ids[i] == rule_id and new_rules.intercept[i] != rules.intercept[rule_id]
+    assert sorted(added) == sorted(np.flatnonzero(ids < 0).tolist())
+    assert not set(removed) & set(ids.tolist())
+
+
+@pytest.mark.parametrize('formulation,backend', [('indicator', 'cplex'), ('bigm', 'cplex'), ('bigm', 'highs')])
+def test_patched_model_matches_fresh_build(formulation, backend):
+    if backend == 'highs':
+        pytest.importorskip('highspy')
+    problem = synthetic_problem(25, 2, n_algs=2, seed=1)
+    rng = np.random.default_rng(1)
+    session = EMLSession(**session_kwargs(problem, formulation=formulation, backend=backend))
+    logic_constraints = problem['logic_constraints']
+    for _ in range(2):
+        logic_constraints = retrain_all(problem, logic_constraints, rng)
+        counts = update_all(session, problem, logic_constraints)
+        assert all((c['modified'], c['removed'], c['added']) == (2, 2, 4) for c in counts.values())
+        fresh = EMLSession(**session_kwargs(problem, logic_constraints, formulation=formulation, backend=backend))
+
+        assert objective_values(session, problem) == objective_values(fresh, problem)
+        # The binary variables of the removed rules stay in the model, but are not counted
+        assert sorted(session.binary_vars_names) != sorted(fresh.binary_vars_names)
+        assert len(session.binary_vars_names) == len(fresh.binary_vars_names)
+        assert session.statistics()['binary_variables'] == fresh.statistics()['binary_variables']
+        assert session.statistics()['variables'] > fresh.statistics()['variables']
+
+
+def test_reloaded_session_is_rebuilt(tmp_path):
+    problem = synthetic_problem(25, 2, n_algs=2, seed=2)
+    open_session(**session_kwargs(problem, snapshot_dir=str(tmp_path)))
+    session = open_session(**session_kwargs(problem, snapshot_dir=str(tmp_path)))
+    assert session.from_snapshot
+    handle = session.add_user_constraint('memAvg(MB)', '<=', 80.)
+
+    logic_constraints = retrain_all(problem, problem['logic_constraints'], np.random.default_rng(2))
+    # The first algorithm rebuilds the model, the second one is patched in the rebuilt model
+    update_all(session, problem, logic_constraints)
+    assert not session.from_snapshot
+    # The user constraints keep their handles
+    session.update_user_constraint(handle, 60.)
+
+    fresh = EMLSession(**session_kwargs(problem, logic_constraints))
+    fresh.add_user_constraint('memAvg(MB)', '<=', 60.)
+    assert objective_values(session, problem) == objective_values(fresh, problem)
+    assert session.statistics()['binary_variables'] == fresh.statistics()['binary_variables']
+
+
+def test_rebuild_past_dead_rules_ratio():
+    problem = synthetic_problem(25, 2, n_algs=1, seed=3)
+    session = EMLSession(**session_kwargs(problem))
+    # A coarser partition of the same inputs: none of the rules is kept, and the removed ones would be more than
+    # MAX_DEAD_RULES_RATIO of the encoded ones
+    new_rules = synthetic_problem(9, 2, n_algs=1, seed=4)['logic_constraints']['ALG0']['synthetic_grid_ALG0']
+    counts = session.update_rules('ALG0', new_rules)
+    assert counts['unchanged'] == 0 and counts['removed'] > counts['added']
+
+    fresh = EMLSession(**session_kwargs(problem, {'ALG0': {'synthetic_grid_ALG0': new_rules}}))
+    assert session.statistics() == fresh.statistics()
+    assert objective_values(session, problem) == objective_values(fresh, problem)
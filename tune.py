@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 23:41:16 2026
+
+Offline tuning of the solver parameters: solves representative queries on the model of run.py with several parameter
+profiles, and saves the fastest one, used by the later runs on the same model (see utils.tuning).
+"""
+
+import const_define as cd
+from utils.model_io import rules_key
+from utils.presolve import presolve
+from utils.tuning import tune_solver_profile
+from utils.util_functions import define_algs_dict, load_var_intervals, define_logic_rules, setup_logging
+
+# Specify the ML model(s) and algorithm(s) of interest
+ML_MODELS = [cd.MODEL_DIR + '/no_input-memory_DecisionTree_MaxDepth10']
+ALGS = ['ANTICIPATE']
+
+if __name__ == '__main__':
+    setup_logging(level='info', log_file='log_tuning.txt')
+
+    algs_dict = define_algs_dict(ml_models=ML_MODELS, algs=ALGS)
+    globmaxdict, globmindict = load_var_intervals(algs_dict=algs_dict)
+    logic_constraints = define_logic_rules(algs=ALGS, ml_models=ML_MODELS)
+
+    # User constraints of run.py
+    no_constraints = {'variable': [], 'type': [], 'value': []}
+
+    # The profile is saved under the key of the rules before the presolve, as run.py looks it up, so that it serves the
+    # runs with any user constraints; the rules must be those of run.py (same compression, if any)
+    profile_key = rules_key(logic_constraints=logic_constraints, algs=algs_dict, inst_descr=cd.INSTANCE_FEATURES,
+                            ml_trgt=cd.ML_TARGETS, enable_var_type=False, formulation='indicator',
+                            grid_encoding='unary')
+
+    # The queries are solved on the presolved model, as in run.py
+    globmindict, globmaxdict, logic_constraints, _ = presolve(df_mins=globmindict, df_maxs=globmaxdict,
+                                                              logic_constraints=logic_constraints,
+                                                              user_constraints=no_constraints,
+                                                              algs=algs_dict, ml_trgt=cd.ML_TARGETS)
+
+    # Representative queries of the production runs: user constraints and objective of each one. The objective is
+    # memAvg(MB), the target of the rules of ML_MODELS, so that the solves go through the rule encoding; the last
+    # query fixes the instance features, as the batch solves of run_batch.py do
+    mid_features = {f'y_{var}': float((globmindict['glob'].loc[var] + globmaxdict['glob'].loc[var]) / 2)
+                    for var in cd.INSTANCE_FEATURES}
+    queries = [
+        {'user_constraints': no_constraints, 'objective_type': 'min', 'objective_var': 'memAvg(MB)'},
+        {'user_constraints': {'variable': ['time(sec)'], 'type': ['<='], 'value': [70]},
+         'objective_type': 'min', 'objective_var': 'memAvg(MB)'},
+        {'user_constraints': no_constraints, 'objective_type': 'min', 'objective_var': 'memAvg(MB)',
+         'fixed': mid_features},
+    ]
+
+    # Fastest profile saved to cd.SOLVER_PROFILES_FILE, under the key of the rules, if it beats the default one
+    tune_solver_profile(df_mins=globmindict,
+                        df_maxs=globmaxdict,
+                        logic_constraints=logic_constraints,
+                        queries=queries,
+                        enable_var_type=False,
+                        inst_descr=cd.INSTANCE_FEATURES,
+                        ml_trgt=cd.ML_TARGETS,
+                        algs=algs_dict,
+                        repeats=3,
+                        profile_key=profile_key)
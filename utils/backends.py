@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:02:37 2026
+
+Solver backends of the EML model: CPLEX (through docplex) and HiGHS (through highspy), and the solver adapters of
+EMLSession, for a model built with docplex (DocplexModel) or read directly into CPLEX (CplexModel).
+"""
+
+import os
+import tempfile
+import time
+
+from utils.formulations import LINEARIZATIONS, add_product_var
+from utils.model_io import SnapshotSolution, SolveDetails
+from utils.solver_params import apply_cplex_params, highs_options
+
+BACKENDS = ['cplex', 'highs']
+
+# Constraint types supported natively by each backend; the other ones are translated by EMLSession
+# (indicator constraints to big-M constraints, the 'piecewise' formulation to 'bigm')
+BACKEND_FEATURES = {
+    'cplex': {'indicators': True, 'pwl': True},
+    'highs': {'indicators': False, 'pwl': False},
+}
+
+
+def _import_highspy():
+    try:
+        import highspy
+    except ImportError as e:
+        raise ImportError("The 'highs' backend requires the highspy package (pip install highspy)") from e
+    return highspy
+
+
+def solve_highs(mdl, time_limit=20000, mip_start=None, params=None):
+    """
+    Solves a docplex model with HiGHS. The model is passed to HiGHS in LP format, so it must contain only linear
+    constraints (see utils.formulations.indicators_to_bigm).
+
+    :param mdl: docplex model
+    :param time_limit: time limit of the solver (sec)
+    :param mip_start: optional dict mapping the variable names to the values of a known solution
+    :param params: optional dict with the solver parameters (see utils.solver_params.highs_options)
+
+    :return: tuple (SnapshotSolution, or None if no solution is found, SolveDetails)
+    """
+    highspy = _import_highspy()
+
+    h = highspy.Highs()
+    h.setOptionValue('output_flag', False)
+    # HiGHS reads the model from a file: the LP writer of docplex is pure Python and keeps the variable names
+    fd, lp_path = tempfile.mkstemp(suffix='.lp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(mdl.export_as_lp_string())
+        if h.readModel(lp_path) != highspy.HighsStatus.kOk:
+            raise RuntimeError(f'HiGHS could not read the model {mdl.name}')
+    finally:
+        os.remove(lp_path)
+    h.setOptionValue('time_limit', float(time_limit))
+    for option, value in highs_options(params or {}).items():
+        h.setOptionValue(option, value)
+
+    names = list(h.getLp().col_names_)
+    if mip_start:
+        start_sol = highspy.HighsSolution()
+        start_sol.col_value = [float(mip_start.get(name, 0.)) for name in names]
+        start_sol.value_valid = True
+        h.setSolution(start_sol)
+
+    start = time.perf_counter()
+    h.run()
+    solve_time = time.perf_counter() - start
+
+    info = h.getInfo()
+    feasible = info.primal_solution_status == highspy.SolutionStatus.kSolutionStatusFeasible
+    solve_details = SolveDetails(status=h.modelStatusToString(h.getModelStatus()),
+                                 time=solve_time,
+                                 nb_nodes_processed=info.mip_node_count,
+                                 nb_iterations=info.simplex_iteration_count,
+                                 mip_relative_gap=info.mip_gap if feasible else None,
+                                 best_bound=info.mip_dual_bound)
+    if not feasible:
+        return None, solve_details
+
+    values = dict(zip(names, h.getSolution().col_value))
+    # Variables absent from the LP file (i.e., in no constraint nor objective) are at their lower bound
+    for var in mdl.iter_variables():
+        values.setdefault(var.name, var.lb)
+    return SnapshotSolution(values, info.objective_function_value, solve_details), solve_details
+
+
+class DocplexModel:
+    """
+    Solver adapter of a model built with docplex, solved by CPLEX or HiGHS. The variables are referred to by name, and
+    the constraints by the docplex constraints returned by add_constraints.
+    """
+
+    def __init__(self, mdl, var_index, backend='cplex'):
+        """
+        :param mdl: docplex model
+        :param var_index: dict mapping the variable names to the model variables, extended with the product variables
+        :param backend: solver backend, one of BACKENDS
+        """
+        self.mdl = mdl
+        self.var_index = var_index
+        self.backend = backend
+        self.params = {}
+
+    def bounds(self, var_name):
+        var = self.var_index[var_name]
+        return var.lb, var.ub
+
+    def set_bounds(self, bounds):
+        """
+        Sets the bounds of the variables, given as a dict mapping the variable names to tuples (lb, ub).
+        """
+        for var_name, (lb, ub) in bounds.items():
+            var = self.var_index[var_name]
+            var.lb, var.ub = lb, ub
+
+    def add_constraints(self, rows):
+        """
+        Adds linear constraints given as tuples (dict {variable name: coefficient}, '<=' or '>=', rhs).
+
+        :return: list of the new constraints
+        """
+        mdl = self.mdl
+        cts = []
+        for coefs, sense, rhs in rows:
+            expr = mdl.scal_prod([self.var_index[var_name] for var_name in coefs], list(coefs.values()))
+            cts.append(expr <= rhs if sense == '<=' else expr >= rhs)
+        return mdl.add_constraints(cts)
+
+    def remove_constraints(self, cts):
+        self.mdl.remove_constraints(cts)
+
+    def shift_rhs(self, cts, shifts):
+        """
+        Adds shifts[i] to the right-hand side of the constraint cts[i], in place.
+        """
+        for ct, shift in zip(cts, shifts):
+            ct.rhs = ct.rhs.constant + shift
+
+    def add_product_var(self, y, b, name, linearization='mccormick'):
+        """
+        Adds the variable name == y * b (see utils.formulations.add_product_var).
+        """
+        self.var_index[name] = add_product_var(self.mdl, self.var_index[y], self.var_index[b], name=name,
+                                               linearization=linearization)
+
+    def set_objective(self, objective_type, var_names):
+        """
+        Sets the objective min/max of the sum of the variables.
+        """
+        mdl = self.mdl
+        expr = mdl.sum([self.var_index[var_name] for var_name in var_names])
+        if objective_type == 'min':
+            mdl.minimize(expr)
+        else:
+            mdl.maximize(expr)
+
+    def set_params(self, params):
+        """
+        Sets the solver parameters, resetting the ones set by the previous call.
+        """
+        if self.backend == 'cplex':
+            apply_cplex_params(self.mdl.parameters, params, previous=self.params)
+        self.params = dict(params)
+
+    def solve(self, time_limit=20000, warm_start=None):
+        """
+        Solves the model.
+
+        :param time_limit: time limit of the solver (sec)
+        :param warm_start: optional solution of a previous solve, used as MIP start
+
+        :return: tuple (docplex solution, SnapshotSolution with a backend other than CPLEX, or None if no solution is
+            found, solve details)
+        """
+        mdl = self.mdl
+        if self.backend == 'highs':
+            return solve_highs(mdl, time_limit=time_limit,
+                               mip_start=warm_start._values if warm_start is not None else None, params=self.params)
+        mdl.clear_mip_starts()
+        if warm_start is not None:
+            mdl.add_mip_start(warm_start)
+        mdl.set_time_limit(time_limit)
+        sol = mdl.solve()
+        return sol, mdl.solve_details
+
+    def statistics(self):
+        """
+        Returns the size of the model, read from the docplex counters without scanning the model.
+        Logical constraints other than the linear, quadratic and PWL ones are counted as indicator constraints.
+        """
+        mdl = self.mdl
+        return {'variables': mdl.number_of_variables,
+                'linear_constraints': mdl.number_of_linear_constraints,
+                'indicator_constraints': (mdl.number_of_constraints - mdl.number_of_linear_constraints
+                                          - mdl.number_of_quadratic_constraints - mdl.number_of_pwl_constraints),
+                'pwl_constraints': mdl.number_of_pwl_constraints}
+
+    def dump(self, f):
+        """
+        Writes the variables and constraints of the model to a text file object.
+        """
+        mdl = self.mdl
+        f.write(f'{mdl.number_of_variables} VARIABLES\n')
+        for var in mdl.iter_variables():
+            f.write(f'\t* {var} in [{var.lb}, {var.ub}]\n')
+        f.write(f'{mdl.number_of_linear_constraints} LINEAR CONSTRAINTS\n')
+        for ct in mdl.iter_linear_constraints():
+            f.write(f'\t* {ct}\n')
+        f.write('INDICATOR CONSTRAINTS\n')
+        for ct in mdl.iter_indicator_constraints():
+            f.write(f'\t* {ct}\n')
+        f.write(f'{mdl.number_of_pwl_constraints} PWL CONSTRAINTS\n')
+        for ct in mdl.iter_pwl_constraints():
+            f.write(f'\t* {ct}\n')
+
+    def get_cplex(self):
+        """
+        Returns the cplex.Cplex object of the model, kept in sync by docplex.
+        """
+        return self.mdl.get_cplex()
+
+
+class CplexModel:
+    """
+    Solver adapter of a model read directly into CPLEX (e.g., a snapshot of the base model, see
+    utils.model_io.load_snapshot), without docplex. Same interface as DocplexModel; the constraints are referred to by
+    name.
+    """
+
+    def __init__(self, cpx):
+        """
+        :param cpx: cplex.Cplex object
+        """
+        self.cpx = cpx
+        self.params = {}
+        self._next_row = 0
+        self._objective_vars = []
+
+    @classmethod
+    def read(cls, path, model_name, filetype='sav'):
+        """
+        Reads a model file into a new cplex.Cplex object, with its output streams silenced.
+        """
+        import cplex
+
+        cpx = cplex.Cplex()
+        cpx.set_results_stream(None)
+        cpx.set_log_stream(None)
+        cpx.set_warning_stream(None)
+        cpx.read(path, filetype)
+        cpx.set_problem_name(model_name)
+        return cls(cpx)
+
+    def bounds(self, var_name):
+        return self.cpx.variables.get_lower_bounds(var_name), self.cpx.variables.get_upper_bounds(var_name)
+
+    def set_bounds(self, bounds):
+        if bounds:
+            self.cpx.variables.set_lower_bounds([(var_name, float(lb)) for var_name, (lb, _) in bounds.items()])
+            self.cpx.variables.set_upper_bounds([(var_name, float(ub)) for var_name, (_, ub) in bounds.items()])
+
+    def add_constraints(self, rows):
+        import cplex
+
+        names = [f'uc{self._next_row + i}' for i in range(len(rows))]
+        self._next_row += len(rows)
+        self.cpx.linear_constraints.add(lin_expr=[cplex.SparsePair(ind=list(coefs), val=list(coefs.values()))
+                                                  for coefs, _, _ in rows],
+                                        senses=['L' if sense == '<=' else 'G' for _, sense, _ in rows],
+                                        rhs=[float(rhs) for _, _, rhs in rows],
+                                        names=names)
+        return names
+
+    def remove_constraints(self, cts):
+        self.cpx.linear_constraints.delete(cts)
+
+    def shift_rhs(self, cts, shifts):
+        rhs = self.cpx.linear_constraints.get_rhs(cts)
+        self.cpx.linear_constraints.set_rhs([(name, r + shift) for name, r, shift in zip(cts, rhs, shifts)])
+
+    def add_product_var(self, y, b, name, linearization='mccormick'):
+        import cplex
+
+        assert linearization in LINEARIZATIONS, \
+            f"Unsupported linearization '{linearization}', choose among {LINEARIZATIONS}"
+        lb, ub = self.bounds(y)
+        self.cpx.variables.add(lb=[min(lb, 0.)], ub=[max(ub, 0.)], names=[name])
+        if linearization == 'mccormick':
+            if abs(lb) >= cplex.infinity or abs(ub) >= cplex.infinity:
+                raise ValueError(f'McCormick linearization requires finite bounds on {y}')
+            # w >= lb * b, w <= ub * b, w <= y - lb * (1 - b), w >= y - ub * (1 - b)
+            self.add_constraints([({name: 1., b: -lb}, '>=', 0.),
+                                  ({name: 1., b: -ub}, '<=', 0.),
+                                  ({name: 1., y: -1., b: -lb}, '<=', -lb),
+                                  ({name: 1., y: -1., b: -ub}, '>=', -ub)])
+        else:
+            self.cpx.indicator_constraints.add_batch(
+                lin_expr=[cplex.SparsePair(ind=[name, y], val=[1., -1.]), cplex.SparsePair(ind=[name], val=[1.])],
+                sense=['E', 'E'], rhs=[0., 0.], indvar=[b, b], complemented=[0, 1])
+
+    def set_objective(self, objective_type, var_names):
+        objective = self.cpx.objective
+        if self._objective_vars:
+            objective.set_linear([(var_name, 0.) for var_name in self._objective_vars])
+        objective.set_linear([(var_name, 1.) for var_name in var_names])
+        objective.set_sense(objective.sense.minimize if objective_type == 'min' else objective.sense.maximize)
+        self._objective_vars = list(var_names)
+
+    def set_params(self, params):
+        apply_cplex_params(self.cpx.parameters, params, previous=self.params)
+        self.params = dict(params)
+
+    def solve(self, time_limit=20000, warm_start=None):
+        """
+        Solves the model.
+
+        :return: tuple (SnapshotSolution, or None if no solution is found, SolveDetails)
+        """
+        import cplex
+
+        cpx = self.cpx
+        if cpx.MIP_starts.get_num() > 0:
+            cpx.MIP_starts.delete()
+        if warm_start is not None:
+            values = warm_start._values
+            cpx.MIP_starts.add(cplex.SparsePair(ind=list(values), val=list(values.values())),
+                               cpx.MIP_starts.effort_level.auto)
+        cpx.parameters.timelimit.set(time_limit)
+        start = cpx.get_time()
+        cpx.solve()
+        solve_time = cpx.get_time() - start
+        feasible = cpx.solution.is_primal_feasible()
+        solve_details = SolveDetails(status=cpx.solution.get_status_string(),
+                                     time=solve_time,
+                                     nb_nodes_processed=cpx.solution.progress.get_num_nodes_processed(),
+                                     nb_iterations=cpx.solution.progress.get_num_iterations(),
+                                     mip_relative_gap=cpx.solution.MIP.get_mip_relative_gap() if feasible else None,
+                                     best_bound=cpx.solution.MIP.get_best_objective())
+        if not feasible:
+            return None, solve_details
+        values = dict(zip(cpx.variables.get_names(), cpx.solution.get_values()))
+        return SnapshotSolution(values, cpx.solution.get_objective_value(), solve_details), solve_details
+
+    def statistics(self):
+        """
+        Returns the size of the model, read from the CPLEX counters.
+        """
+        cpx = self.cpx
+        return {'variables': cpx.variables.get_num(),
+                'linear_constraints': cpx.linear_constraints.get_num(),
+                'indicator_constraints': cpx.indicator_constraints.get_num(),
+                'pwl_constraints': cpx.pwl_constraints.get_num()}
+
+    def dump(self, f):
+        """
+        Writes the model to a text file object, in LP format.
+        """
+        f.write(self.cpx.write_as_string('lp'))
+
+    def get_cplex(self):
+        return self.cpx
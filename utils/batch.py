@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:40:12 2026
+
+Batch solution of the EML problem over many instances (e.g., the empirical validation set) with a process pool.
+"""
+
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import const_define as cd
+from utils.build_model_symbolic import open_session, prepare_snapshot
+from utils.util_functions import print_log, setup_logging
+
+# Number of result rows written at once (one row group of the parquet file)
+BATCH_WRITE_ROWS = 256
+
+# Session of the worker process, built once by _init_worker
+_worker = {}
+
+
+def _init_worker(session_kwargs, user_constraints, objective_type, objective_var, log_level):
+    """
+    Builds the session of a worker process: the base model is reloaded from its snapshot (or built), and the user
+    constraints and the objective are set once for all the instances.
+    """
+    setup_logging(level=log_level, log_file=os.devnull)
+    session = open_session(**session_kwargs)
+    session.set_user_constraints(user_constraints)
+    session.set_objective(objective_type, objective_var)
+    _worker['session'] = session
+
+
+def _solve_instance(instance):
+    """
+    Solves the problem of a single instance in a worker process, fixing the instance features and nothing else.
+
+    :param instance: tuple (instance id, dict mapping the instance features to their values)
+
+    :return: dict with the fields of the result row
+    """
+    instance_id, features = instance
+    session = _worker['session']
+    row = {'instance': instance_id}
+    row.update(features)
+    row.update(status=None, objective_value=None, algorithm=None, solve_time=None)
+    try:
+        session.fix_variables({f'y_{var}': v for var, v in features.items()})
+    except ValueError as e:
+        # Outside the domain of the variables, i.e., of the training data of the ML models
+        row['status'] = f'out of bounds: {e}'
+        return row
+
+    start = time.perf_counter()
+    try:
+        sol = session.solve()
+    except Exception as e:
+        # e.g., the size limits of the CPLEX Community Edition: recorded, so that the batch goes on
+        row['status'] = f'error: {type(e).__name__}: {e}'.splitlines()[0]
+        return row
+    row['solve_time'] = time.perf_counter() - start
+    row['status'] = str(session.solve_details.status)
+    if sol is not None:
+        row['objective_value'] = sol.objective_value
+        row['algorithm'] = max(session.algs, key=lambda alg: sol[f'b_{alg}'])
+        for var in session.DT_vars + session.DT_vars_int:
+            row[getattr(var, 'name', var)] = sol[var]
+    return row
+
+
+class ResultWriter:
+    """
+    Streams the result rows to a parquet file if pyarrow is available, otherwise to a csv file. Rows are buffered and
+    written BATCH_WRITE_ROWS at a time, so the results of long batches are not held in memory.
+    """
+
+    def __init__(self, path, fields):
+        """
+        :param path: path of the output file, without extension
+        :param fields: columns of the output file, in order
+        """
+        try:
+            import pyarrow
+            import pyarrow.parquet
+            self.fmt = 'parquet'
+        except ImportError:
+            self.fmt = 'csv'
+        self.path = f'{path}.{self.fmt}'
+        self.fields = list(fields)
+        self._rows = []
+        self._writer = None
+        self._file = None
+        if self.fmt == 'parquet':
+            schema = pyarrow.schema([(field, pyarrow.string() if field in ['status', 'algorithm'] else
+                                      pyarrow.int64() if field == 'instance' else pyarrow.float64())
+                                     for field in self.fields])
+            self._writer = pyarrow.parquet.ParquetWriter(self.path, schema)
+        else:
+            self._file = open(self.path, 'w', newline='')
+            self._writer = csv.DictWriter(self._file, fieldnames=self.fields)
+            self._writer.writeheader()
+
+    def write(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= BATCH_WRITE_ROWS:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        if self.fmt == 'parquet':
+            import pyarrow
+
+            columns = {field: [row.get(field) for row in self._rows] for field in self.fields}
+            self._writer.write_table(pyarrow.table(columns, schema=self._writer.schema))
+        else:
+            self._writer.writerows({field: row.get(field) for field in self.fields} for row in self._rows)
+            self._file.flush()
+        self._rows = []
+
+    def close(self):
+        self.flush()
+        if self.fmt == 'parquet':
+            self._writer.close()
+        else:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def solve_instances(instances, df_mins, df_maxs, user_constraints, logic_constraints, objective_type, objective_var,
+                    out, enable_var_type=False, inst_descr=None, ml_trgt=None, algs=None, formulation='indicator',
+                    grid_encoding='unary', objective_linearization='mccormick', backend='cplex',
+                    snapshot_dir=cd.SNAPSHOT_DIR, n_workers=None, chunksize=8, log_level='quiet', solver_profile=None):
+    """
+    Solves the EML problem for each instance, with the instance features fixed to the values of the instance.
+    Each worker process holds one session on the base model, built once (or reloaded from its snapshot, which is
+    saved by this process beforehand), and only re-bounds the instance variables between instances. The results are
+    streamed to the output file in the order of the instances.
+
+    :param instances: pd.DataFrame with one row per instance and one column per instance feature (see load_instances)
+    :param out: path of the output file, without extension (see ResultWriter)
+    :param n_workers: number of worker processes (default: number of CPUs)
+    :param chunksize: number of instances sent to a worker at once
+    :param log_level: log level of the worker processes
+    The other parameters are those of build_and_solve_EML.
+
+    :return: path of the output file
+    """
+    session_kwargs = dict(df_mins=df_mins, df_maxs=df_maxs, logic_constraints=logic_constraints,
+                          enable_var_type=enable_var_type, inst_descr=inst_descr, ml_trgt=ml_trgt, algs=algs,
+                          formulation=formulation, grid_encoding=grid_encoding,
+                          objective_linearization=objective_linearization, backend=backend,
+                          snapshot_dir=snapshot_dir, solver_profile=solver_profile)
+    session_kwargs = prepare_snapshot(session_kwargs)
+
+    # Columns: instance, features, solver outcome and solution values, in the order of the model variables
+    variables = [f'y_{alg}_{var}' for var in ml_trgt for alg in algs] + \
+                [f'y_{var}' for var in inst_descr] + \
+                [f"y_{p['name']}" for alg in algs for p in algs[alg]['alg_params'].values()]
+    if enable_var_type:
+        variables += [f"y_{p['name']}_int" for alg in algs for p in algs[alg]['alg_params'].values()
+                      if p['type'] == int]
+    fields = ['instance'] + list(instances.columns) + ['status', 'objective_value', 'algorithm', 'solve_time'] + \
+        variables
+
+    tasks = ((instance_id, {var: float(v) for var, v in row.items()})
+             for instance_id, row in instances.iterrows())
+    n_solved = 0
+    start = time.perf_counter()
+    print_log(f'\n=== Solving {len(instances)} instances')
+    with ResultWriter(out, fields) as writer, \
+            ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                initargs=(session_kwargs, user_constraints, objective_type, objective_var,
+                                          log_level)) as executor:
+        for row in executor.map(_solve_instance, tasks, chunksize=chunksize):
+            writer.write(row)
+            n_solved += 1
+    elapsed = time.perf_counter() - start
+    print_log(f'{n_solved} instances solved in {elapsed:.2f} sec ({n_solved / max(elapsed, 1e-9):.1f} instances/sec)')
+    print_log(f'Results saved to: {writer.path}')
+    return writer.path
@@ -6,274 +6,795 @@ Created on Thu Mar 2 16:37:45 2023
 """
 
 import datetime
-import sys
+import os
 import time
+from concurrent.futures import Future
+
+import numpy as np
+
+import const_define as cd
+from utils.backends import BACKEND_FEATURES, BACKENDS, CplexModel, DocplexModel
+from utils.enumeration import (AUTO_ENUMERATION_MAX_INPUTS, AUTO_ENUMERATION_MAX_RULES, EnumerationSession,
+                               enumeration_support)
+from utils.formulations import PATCHABLE_FORMULATIONS, add_logic_rules, indicators_to_bigm, patch_rules
+from utils.instrumentation import RunMetrics, make_run_record, write_run_record
+from utils.model_io import (EXPORT_FORMATS, copy_cplex, get_export_executor, load_snapshot, rules_key,
+                            save_snapshot, snapshot_key, write_model)
+from utils.rule_index import check_solution
+from utils.rule_sets import align_rules, as_compiled_rules, diff_rules, index_rules, rule_keys
+from utils.session_base import SessionBase
+from utils.solver_params import load_tuned_profiles, select_solver_params
+from utils.util_functions import is_debug, print_log
+
+# Engines of build_and_solve_EML: the MIP model, the enumeration of the rules, or the cheapest applicable one
+ENGINES = ['auto', 'mip', 'enumeration']
+
+# Options of build_and_solve_EML that only affect the MIP model, with their defaults: with the 'auto' engine, setting
+# any of them selects the MIP model
+MIP_OPTIONS = {'formulation': 'indicator', 'grid_encoding': 'unary', 'objective_linearization': 'mccormick',
+               'backend': 'cplex', 'solver_profile': None}
+
+# The removed rules stay in the model, with their binary variables fixed to 0 (see utils.formulations.patch_rules):
+# above this ratio of removed rules among the encoded ones, EMLSession.update_rules rebuilds the model instead
+MAX_DEAD_RULES_RATIO = 0.5
+
+
+def user_rhs_shifts(algs, old_v, v, n_constraints):
+    """
+    Returns the change of the right-hand side of each linearized constraint of a user constraint, whose constraints
+    are stored by algorithm, in the order of algs, with the same number of constraints per algorithm.
+
+    :param algs: list of the algorithms
+    :param old_v: current right-hand side, or dict mapping each algorithm to its right-hand side
+    :param v: new right-hand side, or dict mapping each algorithm to its right-hand side
+    :param n_constraints: number of linearized constraints
+
+    :return: list with the change of each constraint
+    """
+    per_alg = n_constraints // len(algs)
+    shifts = []
+    for alg in algs:
+        old_v_alg = old_v[alg] if isinstance(old_v, dict) else old_v
+        v_alg = v[alg] if isinstance(v, dict) else v
+        shifts += [v_alg - old_v_alg] * per_alg
+    return shifts
+
+
+class EMLSession(SessionBase):
+    """
+    Persistent EML model: the variables and the logic rules are built once, while the user constraints and the
+    objective can be changed between solves (see utils.session_base.SessionBase). Each solve is warm-started from the previous incumbent.
+    The model is built with docplex, or reloaded directly into CPLEX from a snapshot of the same base model (see
+    utils.model_io); the session reaches it through a solver adapter (see utils.backends.DocplexModel and CplexModel).
+    """
+
+    def __init__(self, df_mins, df_maxs, logic_constraints, model_name=None,
+                 enable_var_type=False, inst_descr=None, ml_trgt=None, algs=None,
+                 formulation='indicator', grid_encoding='unary', objective_linearization='mccormick',
+                 backend='cplex', snapshot=None):
+        """
+        Builds the base model, i.e., the problem variables and the logic rules, or reloads it from a snapshot.
+
+        :param df_mins: dict with the lower bounds of the problem variables (see load_var_intervals)
+        :param df_maxs: dict with the upper bounds of the problem variables (see load_var_intervals)
+        :param logic_constraints: dict with the logic rules of each algorithm and ml model (see define_logic_rules)
+        :param model_name: name of the model
+        :param enable_var_type: if True, integer hyperparameters are forced to be integer
+        :param inst_descr: list of the instance features
+        :param ml_trgt: list of the ML targets
+        :param algs: dict with the information of the algorithms and ml models (see define_algs_dict)
+        :param formulation: encoding of the logic rules (see utils.formulations.add_logic_rules)
+        :param grid_encoding: encoding of the interval selection for the 'grid' formulation
+        :param objective_linearization: linearization of the objective products (see utils.formulations.add_product_var)
+        :param backend: solver backend, one of utils.backends.BACKENDS; the constraints the backend does not support
+            are translated: 'piecewise' rules are encoded as 'bigm', and indicator constraints as big-M constraints
+        :param snapshot: optional tuple (path, metadata) of the snapshot of the same base model (see
+            utils.model_io.load_snapshot), read directly into CPLEX instead of building the model with docplex
+        """
+        assert backend in BACKENDS, f"Unsupported backend '{backend}', choose among {BACKENDS}"
+        features = BACKEND_FEATURES[backend]
+        if formulation == 'piecewise' and not features['pwl']:
+            print_log(f"Backend {backend} does not support PWL constraints, using the 'bigm' formulation")
+            formulation = 'bigm'
+        if objective_linearization == 'indicator' and not features['indicators']:
+            print_log(f"Backend {backend} does not support indicator constraints, using the 'mccormick' linearization")
+            objective_linearization = 'mccormick'
+        if not model_name:
+            now = datetime.datetime.now()
+            dt_string = now.strftime("%d_%m_%Y-%H_%M_%S")
+            model_name = f"EML_model_{dt_string}"
+        self.model_name = model_name
+        self.algs = algs
+        self.objective_linearization = objective_linearization
+        self.backend = backend
+        self.from_snapshot = snapshot is not None
+        # Inputs of the base model, to rebuild it with new rules (see update_rules)
+        self._build_args = dict(df_mins=df_mins, df_maxs=df_maxs, logic_constraints=logic_constraints,
+                                enable_var_type=enable_var_type, inst_descr=inst_descr, ml_trgt=ml_trgt,
+                                formulation=formulation, grid_encoding=grid_encoding)
+        print_log(f' ------------------- MODEL {model_name} -------------------')
+
+        if snapshot is None:
+            self._build(**self._build_args)
+        else:
+            self._reload(*snapshot)
+
+        # User constraints, indexed by the handle returned by add_user_constraint
+        self._user_cts = {}
+        self._next_handle = 0
+        # Product variables w_{alg}_{var}, created once per objective variable
+        self._prod_vars = {}
+        self.objective_type = None
+        self.objective_var = None
+        self.last_solution = None
+        self.solve_details = None
+        # Original bounds of the variables fixed by fix_variables
+        self._fixed_bounds = {}
+        # Solver parameters, set by set_solver_params, and the name of their profile (see open_session)
+        self.solver_params = {}
+        self.solver_profile = 'default'
+
+    def _build(self, df_mins, df_maxs, logic_constraints, enable_var_type, inst_descr, ml_trgt, formulation,
+               grid_encoding):
+        """
+        Builds the base model with docplex (see __init__ for the parameters).
+        """
+        algs = self.algs
+        backend = self.backend
+        features = BACKEND_FEATURES[backend]
+
+        '''Section: Build & solve CPLEX Model'''
+        print_log('\n=== Building basic model')
+        # docplex is imported here, so that processes reloading a snapshot (see utils.model_io) never load it
+        import docplex.mp.model as cpx
+
+        EML_times = {}
+        EML_times['before_modelEM_time'] = time.time()
+
+        # Size of the model (constraints, variables) after each build phase, written by dump
+        build_sizes = {}
+        # Build a docplex model
+        mdl = cpx.Model()
+        build_sizes['model_creation'] = (mdl.number_of_constraints, mdl.number_of_variables)
+        ###### Define problem variables #####
+        # DT variables
+        DT_vars = []
+        DT_vars_int = []
+
+        # DT_vars_names = common_cols
+        DT_vars_names_in = inst_descr
+        DT_vars_names_out = ml_trgt
+        DT_vars_names_params = []
+
+        DT_vars_int_names = []
+        binary_vars_names = []
 
-import docplex.mp.model as cpx
-import regex
-from eml.backend import cplex_backend
-
-from utils.util_functions import print_log, get_linear_expression, write_logs
-
-
-def build_and_solve_EML(df_mins, df_maxs, user_constraints, logic_constraints,
-                        objective_type, objective_var,
-                        model_name=None, save_path='.',
-                        enable_var_type=False, inst_descr=None, ml_trgt=None, algs=None):
-    f = open('../vars_constr_num.txt', 'w')
-
-    if not model_name:
-        now = datetime.now()
-        dt_string = now.strftime("%d_%m_%Y-%H_%M_%S")
-        model_name = f"EML_model_{dt_string}"
-    print_log(f' ------------------- MODEL {model_name} -------------------')
-
-    '''Section: Build & solve CPLEX Model'''
-    print_log('\n=== Building basic model')
-    EML_times = {}
-    EML_times['before_modelEM_time'] = time.time()
-
-    # Build a backend object
-    bkd = cplex_backend.CplexBackend()
-    # Build a docplex model
-    mdl = cpx.Model()
-    f.write('MARKER 0:model_creation:{}:{}\n'.format(mdl.number_of_constraints,
-                                                     mdl.number_of_variables))
-    ###### Define problem variables #####
-    # DT variables
-    DT_vars = []
-    DT_vars_int = []
-
-    # DT_vars_names = common_cols
-    DT_vars_names_in = inst_descr
-    DT_vars_names_out = ml_trgt
-    DT_vars_names_params = []
-
-    DT_vars_int_names = []
-    binary_vars_names = []
-
-    for alg in algs.keys():
-        for var in algs[alg]['alg_params'].values():
-            DT_vars_names_params.append(var['name'])
-            if var['type'] == int:
-                DT_vars_int_names.append(var['name'])
-
-    bin_list = []
-    # Algorithm (ANTICIPATE or CONTINGENCY) is stored as a binary var
-    for alg in algs.keys():
-        bin_list.append(mdl.binary_var(f"b_{alg}"))
-        binary_vars_names.append(f"b_{alg}")
-
-    # The sum of the binary algorithm variables must be equal to 1, so only 1 algorithm can be chosen (ANT or CONT)
-    mdl.add_constraint(mdl.sum(bin_list) == 1)
-
-    # Insert continuous variables for ML targets (e.g., 'memAvg(MB)', 'time(sec)', 'sol(keuro)') indexed via the algorithm
-    # each variable is called 'y_{ALG_NAME}_{VAR_NAME}' and its upper and lower bound are stored
-    # NB: both the upper and lower bound are assumed to be greater than zero
-    print_log("DTs variables")
-    print_log("\tIndexed via alg")
-    for var in DT_vars_names_out:
-        print_log(f"\t* {var}")
         for alg in algs.keys():
-            print_log(f"\t\t* {alg}")
-            DT_vars.append(mdl.continuous_var(lb=df_mins[alg].loc[var],
-                                              ub=df_maxs[alg].loc[var], name=f"y_{alg}_{var}"))
-            print_log(f"\t\cstr_type * lb = {df_mins[alg].loc[var]}")
-            print_log(f"\t\cstr_type * ub = {df_maxs[alg].loc[var]}")
-
-    # Insert continuous variables for ML input features, which form the instance description (e.g., 'PV_mean', 'PV_std', 'Load_mean', 'Load_std')
-    # each variable is called 'y_{VAR_NAME}' and its upper and lower bound are stored
-    # NB: both the upper and lower bound are assumed to be greater than zero
-    print_log("\tInstance description")
-    for var in DT_vars_names_in:
-        print_log(f"\t* {var}")
-        DT_vars.append(mdl.continuous_var(lb=df_mins['glob'].loc[var],
-                                          ub=df_maxs['glob'].loc[var], name=f"y_{var}"))
-
-    # Insert continuous variables for algorithm hyperparameters (e.g., 'nScenarios' or 'nTraces')
-    # each variable is called 'y_{VAR_NAME}' and its upper and lower bound are stored
-    # NB: both the upper and lower bound are assumed to be greater than zero
-    #
-    print_log("\tHparams")
-    for var in DT_vars_names_params:
-        print_log(f"\t* {var}")
-        DT_vars.append(mdl.continuous_var(lb=df_mins['glob'].loc[var],
-                                          ub=df_maxs['glob'].loc[var], name=f"y_{var}"))
-        # TODO: for the moment, we do not force the continuous variable to be equal to the discrete one
-        # by setting enable_var_type = False in the function argument
-        if var in DT_vars_int_names and enable_var_type:
-            DT_vars_int.append(mdl.integer_var(lb=df_mins['glob'].loc[var],
-                                               ub=df_maxs['glob'].loc[var], name=f"y_{var}_int"))
-            mdl.add_constraint(mdl.get_var_by_name(f'y_{var}_int') ==
-                               mdl.get_var_by_name(f'y_{var}'))
-
-    f.write('MARKER 2:after_DT_vars:{}:{}\n'.format(mdl.number_of_constraints,
-                                                    mdl.number_of_variables))
-
-    # Insert logic rules as indicator constraints
-    print_log('\n=== Adding logic rules constraints')
-    print_log("Logic rules constraints:")
-
-    logicRules_vars = {}
-    # Loop on the algorithms
-    for alg in algs.keys():
-        print_log(f"\t* {alg}")
-        model = list(algs[alg]['ml_model'].keys())[0]
-        print_log(f"\t\t with model {model}")
-        logicRules_vars[alg] = []
-        # Loop on the associated logic rules
-        for i, lg_constr in enumerate(logic_constraints[alg][model]):
-            if_constraint = lg_constr['if']
-            then_constraint = lg_constr['then']
-            # Add binary variables and constraints for the IF statement
-            logicRules_vars[alg].append({'if': []})
-            # Loop on the IF components
-            for j in range(len(if_constraint['variable'])):
-                logicRules_vars[alg][i]['if'].append(mdl.binary_var(name=f"{alg}_LogRul_{i}_IF_z{j}"))
-                binary_vars_names.append(f"{alg}_LogRul_{i}_IF_z{j}")
-
-                var_name = if_constraint['variable'][j]
-                cstr_type = if_constraint['type'][j]
-                value = if_constraint['value'][j]
-                print_log(f'\t\t\t* IF {var_name} {cstr_type} {value}')
-
-                # In GridREx IF statement there are only range constraints,
-                # thus, we consider only this type of linear constraint
-                if cstr_type == 'range':
-                    var = mdl.get_var_by_name(name=var_name)
-                    range_lb, range_ub = value
-
-                    mdl.add_indicator(logicRules_vars[alg][i]['if'][j],
-                                      var >= range_lb)
-                    mdl.add_indicator(logicRules_vars[alg][i]['if'][j],
-                                      var <= range_ub)
-
-            # Add binary variables for the THEN statement
-            logicRules_vars[alg][i]['then'] = mdl.binary_var(name=f"{alg}_LogRul_{i}_THEN_z{j + 1}")
-            binary_vars_names.append(f"{alg}_LogRul_{i}_THEN_z{j + 1}")
-
-            # Add indicator constraint to link IF and THEN statements
-            # (If z_THEN == 1, then the binary variables of the IF statement are equal to 1)
-            mdl.add_indicator(logicRules_vars[alg][i]['then'], mdl.sum(logicRules_vars[alg][i]['if']) == j + 1)
-
-            # Loop on the THEN components
-            for k in range(len(then_constraint['variable'])):
-
-                var_name = then_constraint['variable'][k]
-                cstr_type = then_constraint['type'][k]
-                value = then_constraint['value'][k]
-                print_log(f'\t\t\t\t THEN {var_name} {cstr_type} {value}')
-
-                # In GridREx THEN statement there are only equality constraints,
-                # thus, we consider only this type of linear constraint
-                if cstr_type == '==':
-                    var = mdl.get_var_by_name(name=var_name)
-                    linear_expr = get_linear_expression(value)
-
-                    mdl.add_indicator(logicRules_vars[alg][i]['then'],
-                                      var == eval(linear_expr))
-
-        # Only one of the logic rules must be true
-        list_of_THEN_variables = [logicRules_vars[alg][i]['then'] for i in range(len(logicRules_vars[alg]))]
-        mdl.add_constraint(mdl.sum(list_of_THEN_variables) == 1)
+            for var in algs[alg]['alg_params'].values():
+                DT_vars_names_params.append(var['name'])
+                if var['type'] == int:
+                    DT_vars_int_names.append(var['name'])
 
-    ###### Define problem constraints & objective #####
-    print_log('\n=== Adding custom constraints & objective')
-
-    # Custom constraints
-    print_log("Custom constraints:")
-    for i in range(len(user_constraints['variable'])):
-        var_name = user_constraints['variable'][i]
-        cstr_type = user_constraints['type'][i]
-        v = user_constraints['value'][i]
+        bin_list = []
+        # Algorithm (ANTICIPATE or CONTINGENCY) is stored as a binary var
+        for alg in algs.keys():
+            bin_list.append(mdl.binary_var(f"b_{alg}"))
+            binary_vars_names.append(f"b_{alg}")
+
+        # The sum of the binary algorithm variables must be equal to 1, so only 1 algorithm can be chosen (ANT or CONT)
+        mdl.add_constraint(mdl.sum(bin_list) == 1)
+
+        # Insert continuous variables for ML targets (e.g., 'memAvg(MB)', 'time(sec)', 'sol(keuro)') indexed via the algorithm
+        # each variable is called 'y_{ALG_NAME}_{VAR_NAME}' and its upper and lower bound are stored
+        # NB: both the upper and lower bound are assumed to be greater than zero
+        print_log("DTs variables")
+        print_log("\tIndexed via alg")
+        for var in DT_vars_names_out:
+            print_log(f"\t* {var}")
+            for alg in algs.keys():
+                print_log(f"\t\t* {alg}")
+                DT_vars.append(mdl.continuous_var(lb=df_mins[alg].loc[var],
+                                                  ub=df_maxs[alg].loc[var], name=f"y_{alg}_{var}"))
+                print_log(f"\t\cstr_type * lb = {df_mins[alg].loc[var]}")
+                print_log(f"\t\cstr_type * ub = {df_maxs[alg].loc[var]}")
+
+        # Insert continuous variables for ML input features, which form the instance description (e.g., 'PV_mean', 'PV_std', 'Load_mean', 'Load_std')
+        # each variable is called 'y_{VAR_NAME}' and its upper and lower bound are stored
+        # NB: both the upper and lower bound are assumed to be greater than zero
+        print_log("\tInstance description")
+        for var in DT_vars_names_in:
+            print_log(f"\t* {var}")
+            DT_vars.append(mdl.continuous_var(lb=df_mins['glob'].loc[var],
+                                              ub=df_maxs['glob'].loc[var], name=f"y_{var}"))
+
+        # Insert continuous variables for algorithm hyperparameters (e.g., 'nScenarios' or 'nTraces')
+        # each variable is called 'y_{VAR_NAME}' and its upper and lower bound are stored
+        # NB: both the upper and lower bound are assumed to be greater than zero
+        #
+        print_log("\tHparams")
+        for var in DT_vars_names_params:
+            print_log(f"\t* {var}")
+            DT_vars.append(mdl.continuous_var(lb=df_mins['glob'].loc[var],
+                                              ub=df_maxs['glob'].loc[var], name=f"y_{var}"))
+            # TODO: for the moment, we do not force the continuous variable to be equal to the discrete one
+            # by setting enable_var_type = False in the function argument
+            if var in DT_vars_int_names and enable_var_type:
+                DT_vars_int.append(mdl.integer_var(lb=df_mins['glob'].loc[var],
+                                                   ub=df_maxs['glob'].loc[var], name=f"y_{var}_int"))
+                mdl.add_constraint(DT_vars_int[-1] == DT_vars[-1])
+
+        build_sizes['after_DT_vars'] = (mdl.number_of_constraints, mdl.number_of_variables)
+        EML_times['after_DT_vars_time'] = time.time()
+
+        # Index of the model variables by name, built once and used instead of mdl.get_var_by_name
+        var_index = {var.name: var for var in mdl.iter_variables()}
+
+        # Insert logic rules with the desired formulation (see utils.formulations)
+        print_log('\n=== Adding logic rules constraints')
+        print_log("Logic rules constraints:")
+
+        logicRules_vars = {}
+        # Variables and constraints of the encoded rules, to patch them (see update_rules)
+        encodings = {}
+        # Loop on the algorithms
+        for alg in algs.keys():
+            print_log(f"\t* {alg}")
+            model = list(algs[alg]['ml_model'].keys())[0]
+            print_log(f"\t\t with model {model}")
+            rules = as_compiled_rules(logic_constraints[alg][model])
+
+            print_log(f"\t\t {len(rules)} rules")
+            # Per-rule dump, only at debug level
+            if is_debug():
+                constrained = np.isfinite(rules.lb) | np.isfinite(rules.ub)
+                for i in range(len(rules)):
+                    for col in np.flatnonzero(constrained[i]):
+                        print_log(f'\t\t\t* IF {rules.inputs[col]} range '
+                                  f'{(float(rules.lb[i, col]), float(rules.ub[i, col]))}', level='debug')
+                    then_str = ' + '.join([f'{rules.intercept[i]}'] + [f'{rules.coef[i, col]} * {rules.inputs[col]}'
+                                                                      for col in np.flatnonzero(rules.coef[i])])
+                    print_log(f'\t\t\t\t THEN {rules.target} == {then_str}', level='debug')
+
+            used_formulation, rules_binary_names, then_vars = add_logic_rules(mdl, alg, rules, var_index,
+                                                                              formulation=formulation,
+                                                                              grid_encoding=grid_encoding,
+                                                                              times=EML_times,
+                                                                              encoding=encodings.setdefault(alg, {}))
+            if used_formulation != formulation:
+                print_log(f"\t\t rules not representable as '{formulation}', using '{used_formulation}'")
+            binary_vars_names.extend(rules_binary_names)
+            logicRules_vars[alg] = then_vars
+            EML_times[f'after_{alg}_logic_rules_time'] = time.time()
+
+        if not features['indicators']:
+            # Includes the rules encoded as indicators because not representable in the chosen formulation
+            n_indicators = indicators_to_bigm(mdl)
+            if n_indicators:
+                print_log(f"{n_indicators} indicator constraints translated to big-M constraints for {backend}")
+            EML_times['after_bigm_translation_time'] = time.time()
+
+        build_sizes['after_logic_rules'] = (mdl.number_of_constraints, mdl.number_of_variables)
+        for phase, (n_constraints, n_variables) in build_sizes.items():
+            print_log(f'\t* {phase}: {n_constraints} constraints, {n_variables} variables', level='debug')
+        self.model = DocplexModel(mdl, var_index, backend=backend)
+        self.build_sizes = build_sizes
+        self.DT_vars = [var.name for var in DT_vars]
+        self.DT_vars_int = [var.name for var in DT_vars_int]
+        self.binary_vars_names = binary_vars_names
+        self.logicRules_vars = {alg: [var.name for var in then_vars] for alg, then_vars in logicRules_vars.items()}
+        self.EML_times = EML_times
+        self._encodings = encodings
+        # Content index of the encoded rules of each algorithm, built at the first update_rules
+        self._rule_index = {}
+
+    def _reload(self, sav_path, meta):
+        """
+        Reads the base model saved by utils.model_io.save_snapshot directly into CPLEX, without docplex.
+
+        :param sav_path: path of the snapshot
+        :param meta: metadata of the snapshot
+        """
+        print_log(f'\n=== Reloading basic model from {sav_path}')
+        EML_times = {}
+        EML_times['before_modelEM_time'] = time.time()
+        self.model = CplexModel.read(sav_path, self.model_name)
+        EML_times['after_snapshot_load_time'] = time.time()
+
+        self.build_sizes = meta['build_sizes']
+        self.DT_vars = meta['DT_vars']
+        self.DT_vars_int = meta['DT_vars_int']
+        self.binary_vars_names = meta['binary_vars_names']
+        self.logicRules_vars = meta['logicRules_vars']
+        self.EML_times = EML_times
+        # The encoding of the rules is not saved in the snapshot
+        self._encodings = {}
+        self._rule_index = {}
+
+    def add_user_constraint(self, var_name, cstr_type, v):
+        """
+        Adds the user constraint y_{alg}_{var_name} {cstr_type} v for every algorithm.
+
+        :param var_name: ML target (e.g., 'time(sec)')
+        :param cstr_type: '<=', '>=' or '=='
+        :param v: right-hand side, or dict mapping each algorithm to its right-hand side (e.g., adjusted by the
+            confidence margins of utils.confidence)
+
+        :return: handle of the constraint, to be passed to remove_user_constraint
+        """
         print_log(f'\t* {var_name} {cstr_type} {v}')
 
+        rows = []
         # we linearize the quadratic constraints (see commented first formulation)
         # using the suggestion found here:
         # http://yetanothermathprogrammingconsultant.blogspot.com/2008/05/multiplication-of-continuous-and-binary.html.
         # We assume that x_lo and x_up (y_{alg}_{var_name}.lb and y_{alg}_{var_name}.ub) are
         # greater than zero
-        for alg in algs.keys():
-            print_log(f"\t* {alg}")
+        for alg in self.algs.keys():
+            print_log(f"\t* {alg}", level='debug')
+            y = f'y_{alg}_{var_name}'
+            b = f'b_{alg}'
+            lb, ub = self.model.bounds(y)
+            v_alg = v[alg] if isinstance(v, dict) else v
             if cstr_type == '<=':
-                # mdl.add_constraint(mdl.get_var_by_name(f'y_{alg}_{var_name}') *
-                #    mdl.get_var_by_name(f'b_{alg}') <= v)
-                mdl.add_constraint(mdl.get_var_by_name(f'y_{alg}_{var_name}') <= v)
-                mdl.add_constraint(mdl.get_var_by_name(f'y_{alg}_{var_name}').lb *
-                                   mdl.get_var_by_name(f'b_{alg}') <= v)
+                # mdl.add_constraint(y * b <= v)
+                rows.append(({y: 1.}, '<=', v_alg))
+                rows.append(({b: lb}, '<=', v_alg))
 
             elif cstr_type == '>=':
-                # mdl.add_constraint(mdl.get_var_by_name(f'y_{alg}_{var_name}') *
-                #    mdl.get_var_by_name(f'b_{alg}') >= v)
-                mdl.add_constraint(mdl.get_var_by_name(f'y_{alg}_{var_name}') >= v)
+                # mdl.add_constraint(y * b >= v)
+                rows.append(({y: 1.}, '>=', v_alg))
 
             elif cstr_type == '==':
-                mdl.add_constraint(mdl.get_var_by_name(f'y_{alg}_{var_name}').lb *
-                                   mdl.get_var_by_name(f'b_{alg}') <= v)
-                mdl.add_constraint(mdl.get_var_by_name(f'y_{alg}_{var_name}').ub *
-                                   mdl.get_var_by_name(f'b_{alg}') >= v)
-                mdl.add_constraint(mdl.get_var_by_name(f'y_{alg}_{var_name}') -
-                                   mdl.get_var_by_name(f'y_{alg}_{var_name}').ub *
-                                   (1 - mdl.get_var_by_name(f'b_{alg}')) <= v)
-                mdl.add_constraint(mdl.get_var_by_name(f'y_{alg}_{var_name}') -
-                                   mdl.get_var_by_name(f'y_{alg}_{var_name}').lb *
-                                   (1 - mdl.get_var_by_name(f'b_{alg}')) >= v)
+                rows.append(({b: lb}, '<=', v_alg))
+                rows.append(({b: ub}, '>=', v_alg))
+                # y - ub * (1 - b) <= v and y - lb * (1 - b) >= v
+                rows.append(({y: 1., b: ub}, '<=', v_alg + ub))
+                rows.append(({y: 1., b: lb}, '>=', v_alg + lb))
             else:
-                print('Unsupported constraint type, terminating..')
-                sys.exit()
+                raise ValueError(f'Unsupported constraint type {cstr_type}')
+
+        cts = self.model.add_constraints(rows)
+
+        handle = self._next_handle
+        self._next_handle += 1
+        self._user_cts[handle] = (var_name, cstr_type, v, cts)
+        return handle
+
+    def remove_user_constraint(self, handle):
+        """
+        Removes a user constraint added by add_user_constraint.
+
+        :param handle: handle of the constraint
+        """
+        _, _, _, cts = self._user_cts.pop(handle)
+        self.model.remove_constraints(cts)
+
+    def update_user_constraint(self, handle, v):
+        """
+        Changes the right-hand side of a user constraint added by add_user_constraint, in place: its constraints are
+        not rebuilt, so the solver keeps its model and the next solve can be warm-started.
+
+        :param handle: handle of the constraint
+        :param v: new right-hand side, or dict mapping each algorithm to its right-hand side
+        """
+        var_name, cstr_type, old_v, cts = self._user_cts[handle]
+        # The right-hand side of each linearized constraint is v plus a constant (see add_user_constraint), and the
+        # constraints of each algorithm are contiguous
+        self.model.shift_rhs(cts, user_rhs_shifts(list(self.algs.keys()), old_v, v, len(cts)))
+        self._user_cts[handle] = (var_name, cstr_type, v, cts)
+
+    def fix_variables(self, values):
+        """
+        Fixes problem variables (e.g., the instance features 'y_PV_mean') to the given values, releasing the variables
+        fixed by the previous call. Only the variable bounds change, so the model is not rebuilt.
+
+        :param values: dict mapping the variable names to their values; an empty dict releases all the variables
+
+        :raise ValueError: if a value lies outside the original bounds of its variable
+        """
+        self.model.set_bounds(self._fixed_bounds)
+        self._fixed_bounds = {}
+        for var_name, v in values.items():
+            lb, ub = self.model.bounds(var_name)
+            if not lb <= v <= ub:
+                raise ValueError(f'{var_name} = {v} is outside the bounds [{lb}, {ub}]')
+        self._fixed_bounds = {var_name: self.model.bounds(var_name) for var_name in values}
+        self.model.set_bounds({var_name: (v, v) for var_name, v in values.items()})
+
+    def update_rules(self, alg, rules):
+        """
+        Replaces the rules of an algorithm with retrained ones, patching only the rules that changed (see
+        utils.formulations.patch_rules). The new rules are compared by content with the encoded ones, so the model
+        changes grow with the number of changed rules, not with the size of the rule set.
+        The model is rebuilt instead, keeping the user constraints, the fixed variables, the objective and the solver
+        parameters, when the rules cannot be patched: in a model reloaded from a snapshot, with a formulation other than
+        utils.formulations.PATCHABLE_FORMULATIONS (or other than 'bigm' with a backend without indicator constraints),
+        or when the removed rules would exceed MAX_DEAD_RULES_RATIO of the encoded ones.
+
+        :param alg: algorithm of the rules
+        :param rules: new rules (CompiledRules object or list of rule dicts), on the inputs of the encoded ones
+
+        :return: dict with the number of 'unchanged', 'modified', 'removed' and 'added' rules
+
+        :raise ValueError: if the big-M constraints of the new rules involve unbounded variables
+        """
+        model = list(self.algs[alg]['ml_model'].keys())[0]
+        logic_constraints = self._build_args['logic_constraints']
+        old_rules = as_compiled_rules(logic_constraints[alg][model])
+        rules = align_rules(as_compiled_rules(rules), old_rules.target, old_rules.inputs)
+        if alg not in self._rule_index:
+            # At build time, the id of each rule is its position
+            boxes, thens = rule_keys(old_rules)
+            self._rule_index[alg] = index_rules(boxes, thens, range(len(old_rules)))
+        boxes, thens = rule_keys(rules)
+        ids, modified, removed, added = diff_rules(self._rule_index[alg], boxes, thens)
+        counts = {'unchanged': len(rules) - len(modified) - len(added), 'modified': len(modified),
+                  'removed': len(removed), 'added': len(added)}
+        logic_constraints = {**logic_constraints, alg: {**logic_constraints[alg], model: rules}}
+
+        rebuild = self._rebuild_reason(alg, n_rules=len(rules), n_added=len(added))
+        if rebuild is not None:
+            print_log(f'Rules of {alg} not patched ({rebuild}), rebuilding the model')
+            self._rebuild(logic_constraints)
+        else:
+            encoding = self._encodings[alg]
+            dead_names = {var.name for rule_id in removed
+                          for var in encoding['if_vars'][rule_id] + [encoding['then_vars'][rule_id]]}
+            # The big-M values are derived from the original bounds of the variables fixed by fix_variables
+            fixed = {var_name: self.model.bounds(var_name)[0] for var_name in self._fixed_bounds}
+            self.fix_variables({})
+            new_ids, names = patch_rules(self.model.mdl, alg, encoding, rules, self.model.var_index,
+                                         removed=removed, modified=modified, added=added)
+            self.fix_variables(fixed)
+            if removed or modified:
+                # The incumbent may violate the new rules: no warm start from it
+                self.last_solution = None
+
+            ids[added] = new_ids
+            ids = ids.tolist()
+            self._build_args['logic_constraints'] = logic_constraints
+            self._rule_index[alg] = index_rules(boxes, thens, ids)
+            # Only the binary variables of the live rules are listed
+            self.binary_vars_names = [var_name for var_name in self.binary_vars_names
+                                      if var_name not in dead_names] + names
+            self.logicRules_vars[alg] = [encoding['then_vars'][rule_id].name for rule_id in ids]
+        print_log(f"Rules of {alg} updated: {counts['unchanged']} unchanged, {counts['modified']} modified, "
+                  f"{counts['removed']} removed, {counts['added']} added")
+        return counts
+
+    def _rebuild_reason(self, alg, n_rules, n_added):
+        """
+        Returns the reason why the rules of an algorithm cannot be patched to n_rules rules, n_added of them new, or
+        None if they can.
+        """
+        if self.from_snapshot:
+            return 'model reloaded from a snapshot'
+        encoding = self._encodings[alg]
+        formulation = encoding['formulation']
+        if formulation not in PATCHABLE_FORMULATIONS or \
+                (not BACKEND_FEATURES[self.backend]['indicators'] and formulation != 'bigm'):
+            return f"encoded as '{formulation}' with backend {self.backend}"
+        n_encoded = len(encoding['then_vars']) + n_added
+        if n_encoded - n_rules > MAX_DEAD_RULES_RATIO * n_encoded:
+            return f'{n_encoded - n_rules} removed rules out of {n_encoded}'
+        return None
+
+    def _rebuild(self, logic_constraints):
+        """
+        Rebuilds the base model with new logic rules, then adds back the user constraints (with the same handles),
+        the fixed variables, the objective and the solver parameters of the session.
+        """
+        user_cts = list(self._user_cts.items())
+        fixed = {var_name: self.model.bounds(var_name)[0] for var_name in self._fixed_bounds}
+        self._build_args['logic_constraints'] = logic_constraints
+        self._build(**self._build_args)
+        self.from_snapshot = False
+
+        self._user_cts = {}
+        for handle, (var_name, cstr_type, v, _) in user_cts:
+            self._user_cts[handle] = self._user_cts.pop(self.add_user_constraint(var_name, cstr_type, v))
+        self._fixed_bounds = {}
+        self.fix_variables(fixed)
+        self._prod_vars = {}
+        if self.objective_type is not None:
+            self.set_objective(self.objective_type, self.objective_var)
+        self.model.set_params(self.solver_params)
+        self.last_solution = None
+
+    def set_objective(self, objective_type, objective_var):
+        """
+        Sets the objective min/max of sum_alg y_{alg}_{objective_var} * b_{alg}.
+
+        :param objective_type: 'min' or 'max'
+        :param objective_var: ML target to optimize (e.g., 'sol(keuro)')
+        """
+        print_log("Objective:")
+
+        # build a list of variables w_{alg} == y_{alg}_{objective_var} * b_{alg}, linearized so that the problem is
+        # a MILP. The variables are kept in the model when the objective changes, so that they are created only once
+        if objective_var not in self._prod_vars:
+            for alg in self.algs.keys():
+                self.model.add_product_var(f'y_{alg}_{objective_var}', f'b_{alg}', f'w_{alg}_{objective_var}',
+                                           linearization=self.objective_linearization)
+            self._prod_vars[objective_var] = [f'w_{alg}_{objective_var}' for alg in self.algs.keys()]
+        prod_list = self._prod_vars[objective_var]
+
+        print_log(f'\t* {objective_type}({objective_var})')
+        self.model.set_objective(objective_type, prod_list)
+        self.objective_type = objective_type
+        self.objective_var = objective_var
+
+    def set_solver_params(self, params):
+        """
+        Sets the parameters of the next solves, resetting the ones set by the previous call.
+
+        :param params: dict mapping the parameter names to their values (see utils.solver_params.SOLVER_PROFILES); with
+            a backend other than CPLEX, the parameters without an equivalent option are ignored
+        """
+        self.model.set_params(params)
+        self.solver_params = dict(params)
+
+    def solve(self, time_limit=20000):
+        """
+        Solves the model, warm-started from the previous solution (if any).
+
+        :param time_limit: time limit of the solver (sec)
+
+        :return: docplex solution (SnapshotSolution if the model is reloaded from a snapshot or solved by a backend
+            other than CPLEX), or None if no solution is found
+        """
+        sol, self.solve_details = self.model.solve(time_limit=time_limit, warm_start=self.last_solution)
+        if sol is not None:
+            self.last_solution = sol
+        return sol
+
+    def statistics(self):
+        """
+        Returns the size of the model, read from the counters of the solver without scanning the model.
+        """
+        statistics = self.model.statistics()
+        return {'variables': statistics.pop('variables'), 'binary_variables': len(self.binary_vars_names),
+                **statistics}
+
+    def dump(self, path):
+        """
+        Writes the size of the model after each build phase, and its variables and constraints, to a text file.
+
+        :param path: path of the dump
+
+        :return: path of the dump
+        """
+        with open(path, 'w') as f:
+            for phase, (n_constraints, n_variables) in self.build_sizes.items():
+                f.write(f'BUILD PHASE {phase}: {n_constraints} constraints, {n_variables} variables\n')
+            self.model.dump(f)
+        return path
+
+    def export(self, path, fmt='sav', compress=False, background=True):
+        """
+        Exports the model to a file. The model is copied by CPLEX on the calling thread, so it can be modified and
+        solved while the copy is written (and compressed) in background.
+
+        :param path: path of the file, without extension
+        :param fmt: format of the file, one of EXPORT_FORMATS
+        :param compress: if True, the file is compressed with gzip
+        :param background: if True, the export runs in a background thread
+
+        :return: future holding the path of the written file
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f'Unsupported export format {fmt}, expected one of {EXPORT_FORMATS}')
+        path = f'{path}.{fmt}'
+        cpx_copy = copy_cplex(self.model.get_cplex())
+        if background:
+            return get_export_executor().submit(write_model, cpx_copy, path, fmt, compress)
+        future = Future()
+        future.set_result(write_model(cpx_copy, path, fmt, compress))
+        return future
+
+
+def open_session(df_mins, df_maxs, logic_constraints, model_name=None, enable_var_type=False, inst_descr=None,
+                 ml_trgt=None, algs=None, formulation='indicator', grid_encoding='unary',
+                 objective_linearization='mccormick', backend='cplex', snapshot_dir=cd.SNAPSHOT_DIR, key=None,
+                 metrics=None, solver_profile=None, profile_key=None):
+    """
+    Returns an EMLSession on the base model: reloaded from its snapshot if there is one, otherwise built (and saved as
+    a snapshot). The arguments are those of EMLSession.
+
+    :param snapshot_dir: directory of the base model snapshots (see utils.model_io); if None, snapshots are disabled.
+        The snapshots are CPLEX files, so they are used only with the 'cplex' backend
+    :param key: snapshot key of the base model (see utils.model_io.snapshot_key); if None, it is computed
+    :param metrics: optional RunMetrics where the snapshot phases are measured
+    :param solver_profile: solver parameters of the session: name of a profile of utils.solver_params.SOLVER_PROFILES,
+        dict of parameters, or None for the profile tuned for the model and backend (see utils.tuning), if any
+    :param profile_key: key of the tuned profiles of the model (see utils.model_io.rules_key); if None, it is
+        computed from logic_constraints. Pass the key of the rules before the presolve, which depends on the user
+        constraints, so that the tuned profile is found whatever the user constraints
+
+    :return: EMLSession
+    """
+    if metrics is None:
+        metrics = RunMetrics()
+    if backend != 'cplex':
+        snapshot_dir = None
+    if snapshot_dir is not None and key is None:
+        key = snapshot_key(df_mins=df_mins, df_maxs=df_maxs, logic_constraints=logic_constraints, algs=algs,
+                           inst_descr=inst_descr, ml_trgt=ml_trgt, enable_var_type=enable_var_type,
+                           formulation=formulation, grid_encoding=grid_encoding)
+    if solver_profile is None and profile_key is None and os.path.exists(cd.SOLVER_PROFILES_FILE):
+        profile_key = rules_key(logic_constraints=logic_constraints, algs=algs, inst_descr=inst_descr,
+                                ml_trgt=ml_trgt, enable_var_type=enable_var_type, formulation=formulation,
+                                grid_encoding=grid_encoding)
+    session_kwargs = dict(df_mins=df_mins, df_maxs=df_maxs, logic_constraints=logic_constraints,
+                          model_name=model_name, enable_var_type=enable_var_type, inst_descr=inst_descr,
+                          ml_trgt=ml_trgt, algs=algs, formulation=formulation, grid_encoding=grid_encoding,
+                          objective_linearization=objective_linearization, backend=backend)
+    snapshot = load_snapshot(key, snapshot_dir) if snapshot_dir is not None else None
+    if snapshot is not None:
+        with metrics.phase('snapshot_load'):
+            session = EMLSession(**session_kwargs, snapshot=snapshot)
+    else:
+        session = EMLSession(**session_kwargs)
+        if snapshot_dir is not None:
+            with metrics.phase('snapshot_save'):
+                snapshot_path = save_snapshot(session, key, snapshot_dir)
+            print_log(f'Snapshot of the basic model saved to: {snapshot_path}', level='debug')
+
+    profile_name, params = select_solver_params(solver_profile, model_key=profile_key, backend=backend,
+                                                profiles_file=cd.SOLVER_PROFILES_FILE)
+    session.set_solver_params(params)
+    session.solver_profile = profile_name
+    print_log(f'Solver profile: {profile_name} {params}', level='debug')
+    return session
+
+
+def prepare_snapshot(session_kwargs):
+    """
+    Saves the snapshot of the base model, if missing, before worker processes open their sessions with
+    session_kwargs, so that the model is built once by the calling process rather than once per worker.
+
+    :param session_kwargs: dict of the arguments of open_session
+
+    :return: copy of session_kwargs, with the snapshot key of the base model (when the snapshots are used), so that the
+        workers do not hash the rules again
+    """
+    session_kwargs = dict(session_kwargs)
+    snapshot_dir = session_kwargs.get('snapshot_dir', cd.SNAPSHOT_DIR)
+    if session_kwargs.get('backend', 'cplex') != 'cplex' or snapshot_dir is None:
+        return session_kwargs
+    if session_kwargs.get('key') is None:
+        session_kwargs['key'] = snapshot_key(
+            df_mins=session_kwargs['df_mins'], df_maxs=session_kwargs['df_maxs'],
+            logic_constraints=session_kwargs['logic_constraints'], algs=session_kwargs.get('algs'),
+            inst_descr=session_kwargs.get('inst_descr'), ml_trgt=session_kwargs.get('ml_trgt'),
+            enable_var_type=session_kwargs.get('enable_var_type', False),
+            formulation=session_kwargs.get('formulation', 'indicator'),
+            grid_encoding=session_kwargs.get('grid_encoding', 'unary'))
+    if load_snapshot(session_kwargs['key'], snapshot_dir) is None:
+        print_log('\n=== Preparing the snapshot of the basic model')
+        open_session(**session_kwargs)
+    return session_kwargs
 
-    # Objective
-    print_log("Objective:")
 
-    # build a list of expressions y_{alg}_cost * b_{alg}
-    prod_list = []
-    for alg in algs.keys():
-        prod_list.append(mdl.get_var_by_name(f'y_{alg}_sol(keuro)') *
-                         mdl.get_var_by_name(f'b_{alg}'))
+def build_and_solve_EML(df_mins, df_maxs, user_constraints, logic_constraints,
+                        objective_type, objective_var,
+                        model_name=None, save_path='.',
+                        enable_var_type=False, inst_descr=None, ml_trgt=None, algs=None,
+                        formulation='indicator', grid_encoding='unary', objective_linearization='mccormick',
+                        export=None, export_compress=False, snapshot_dir=cd.SNAPSHOT_DIR,
+                        runs_log=cd.RUNS_LOG, metrics=None, engine='auto', backend='cplex', solver_profile=None,
+                        profile_key=None):
+    """
+    Builds and solves the EML model once. See EMLSession to solve several queries on the same logic rules.
+
+    :param export: if not None, format of the model file written to save_path (one of EXPORT_FORMATS); the export
+        runs in a background thread while the model is solved
+    :param export_compress: if True, the exported model is compressed with gzip
+    :param snapshot_dir: directory of the base model snapshots (see utils.model_io); if a snapshot built from the same
+        rules, bounds and options exists, it is reloaded directly into CPLEX. If None, snapshots are disabled
+    :param runs_log: JSON-lines file, relative to save_path, where the record of the run is appended (see
+        utils.instrumentation.make_run_record); if None, the record is not written
+    :param metrics: RunMetrics holding the phases measured before the call (e.g., bounds loading); if None, a new one
+        is created
+    :param engine: 'mip' (CPLEX), 'enumeration' (exact enumeration of the rules, see utils.enumeration) or 'auto'
+        (enumeration whenever the problem supports it, the rule sets are within AUTO_ENUMERATION_MAX_RULES and
+        AUTO_ENUMERATION_MAX_INPUTS, no export is requested, the options of MIP_OPTIONS are left to their defaults
+        and no solver profile has been tuned for the model)
+    :param backend: solver of the MIP model, one of utils.backends.BACKENDS; the snapshots are CPLEX files, so they
+        are used only with the 'cplex' backend
+    :param solver_profile: solver parameters of the MIP model (see open_session); by default, the profile tuned for
+        the model and backend by utils.tuning, if any
+    :param profile_key: key of the tuned profiles of the model (see open_session); pass the key of the rules before the
+        presolve, so that the tuned profile is found whatever the user constraints
+
+    :return: docplex solution (SnapshotSolution if the model is reloaded from a snapshot, solved by enumeration or by a
+        backend other than CPLEX), or None if no solution is found
+    """
+    assert engine in ENGINES, f"Unsupported engine '{engine}', choose among {ENGINES}"
+    assert backend in BACKENDS, f"Unsupported backend '{backend}', choose among {BACKENDS}"
+    if metrics is None:
+        metrics = RunMetrics()
+
+    # Hash of the inputs of the base model, used as snapshot key and to identify the model version in the run records
+    with metrics.phase('model_key'):
+        key = snapshot_key(df_mins=df_mins, df_maxs=df_maxs, logic_constraints=logic_constraints, algs=algs,
+                           inst_descr=inst_descr, ml_trgt=ml_trgt, enable_var_type=enable_var_type,
+                           formulation=formulation, grid_encoding=grid_encoding)
+    if solver_profile is None and profile_key is None and os.path.exists(cd.SOLVER_PROFILES_FILE):
+        profile_key = rules_key(logic_constraints=logic_constraints, algs=algs, inst_descr=inst_descr, ml_trgt=ml_trgt,
+                                enable_var_type=enable_var_type, formulation=formulation, grid_encoding=grid_encoding)
+    session = None
+    if engine == 'auto':
+        options = dict(formulation=formulation, grid_encoding=grid_encoding,
+                       objective_linearization=objective_linearization, backend=backend, solver_profile=solver_profile)
+        explicit = [name for name, default in MIP_OPTIONS.items() if options[name] != default]
+        if explicit:
+            print_log(f'Options of the MIP model set ({", ".join(explicit)}), building the MIP model')
+            engine = 'mip'
+        elif backend in load_tuned_profiles(cd.SOLVER_PROFILES_FILE).get(profile_key, {}):
+            # A profile tuned offline for the MIP model is meant to be used
+            print_log('Solver profile tuned for the model, building the MIP model')
+            engine = 'mip'
+    if engine != 'mip':
+        # With 'auto', the MIP model is preferred for the largest rule sets
+        limits = dict(max_rules=AUTO_ENUMERATION_MAX_RULES, max_inputs=AUTO_ENUMERATION_MAX_INPUTS) \
+            if engine == 'auto' else {}
+        reason = 'export requested' if export is not None else \
+            enumeration_support(df_mins=df_mins, df_maxs=df_maxs, logic_constraints=logic_constraints, algs=algs,
+                                inst_descr=inst_descr, ml_trgt=ml_trgt, enable_var_type=enable_var_type, **limits)
+        if reason is None:
+            with metrics.phase('enumeration_setup'):
+                session = EnumerationSession(df_mins=df_mins, df_maxs=df_maxs, logic_constraints=logic_constraints,
+                                             model_name=model_name, inst_descr=inst_descr, ml_trgt=ml_trgt,
+                                             algs=algs)
+        elif engine == 'enumeration':
+            raise ValueError(f'The problem cannot be solved by enumeration: {reason}')
+        else:
+            print_log(f'Enumeration not applicable ({reason}), building the MIP model', level='debug')
+    if session is None:
+        session = open_session(df_mins=df_mins, df_maxs=df_maxs, logic_constraints=logic_constraints,
+                               model_name=model_name, enable_var_type=enable_var_type, inst_descr=inst_descr,
+                               ml_trgt=ml_trgt, algs=algs, formulation=formulation, grid_encoding=grid_encoding,
+                               objective_linearization=objective_linearization, backend=backend,
+                               snapshot_dir=snapshot_dir, key=key, metrics=metrics, solver_profile=solver_profile,
+                               profile_key=profile_key)
+    model_name = session.model_name
+    EML_times = session.EML_times
 
-    print_log(f'\t* {objective_type}')
-    if objective_type == 'min':
-        mdl.minimize(mdl.sum(prod_list))
-    else:
-        mdl.maximize(mdl.sum(prod_list))
+    ###### Define problem constraints & objective #####
+    print_log('\n=== Adding custom constraints & objective')
+
+    # Custom constraints
+    EML_times['after_logic_rules_time'] = time.time()
+    if 'after_DT_vars_time' in EML_times:
+        metrics.add_phase('variables', EML_times['after_DT_vars_time'] - EML_times['before_modelEM_time'])
+        metrics.add_phase('rules', EML_times['after_logic_rules_time'] - EML_times['after_DT_vars_time'])
+    with metrics.phase('user_constraints'):
+        session.set_user_constraints(user_constraints)
+
+    # Objective
+    with metrics.phase('objective'):
+        session.set_objective(objective_type, objective_var)
 
     EML_times['after_settings_time'] = time.time()
 
-    '''
-    with open('obtained_model.txt', "w") as output_file:
-        output_file.write(mdl.export_as_lp_string())
-    '''
     ##### Print info & save EML model #####
     print_log('\n=== Print info & save')
-    vars = mdl.find_re_matching_vars(regex.compile(r'.*'))
-    print_log(f'{len(vars)} VARIABLES')
-    for var in mdl.find_re_matching_vars(regex.compile(r'^((?!DT).)*$')):
-        print_log(f"\t* {var}")
-
-    ntot = 0
-    for _ in mdl.generate_user_linear_constraints():
-        ntot = ntot + 1
-    print_log(f'{ntot} LINEAR CONSTRAINTS')
-    for i, obj in enumerate(mdl.generate_user_linear_constraints()):
-        string = f"\t* {obj}"
-        if "DT" not in string:
-            print_log(string)
-
-    ntot = 0
-    for _ in mdl.iter_indicator_constraints():
-        ntot = ntot + 1
-    print_log(f'{ntot} INDICATOR CONSTRAINTS')
-    for i, obj in enumerate(mdl.iter_indicator_constraints()):
-        string = f"\t* {obj}"
-        if "DT" not in string:
-            print_log(string)
+    # Model statistics from the docplex counters; the full dump is written to a separate file at debug level only
+    statistics = session.statistics()
+    for label, value in statistics.items():
+        print_log(f'{value} {label.upper().replace("_", " ")}')
+    if is_debug():
+        dump_path = session.dump(f'{save_path}/{model_name}_dump.txt')
+        print_log(f"Model dump saved to: {dump_path}", level='debug')
 
     EML_times['after_print_time'] = time.time()
 
-    # save model to be reused
-    model_path = f'{save_path}/{model_name}'
-    mdl.export_as_sav(model_path)
-    print_log(f"\nModel saved to: {model_path}")
+    # save model to be reused (in background, off the critical path)
+    export_future = None
+    if export is not None:
+        with metrics.phase('export'):
+            export_future = session.export(f'{save_path}/{model_name}', fmt=export, compress=export_compress)
 
     EML_times['after_save_time'] = time.time()
 
@@ -281,45 +802,50 @@ def build_and_solve_EML(df_mins, df_maxs, user_constraints, logic_constraints,
     EML_times['after_modelEM_time'] = time.time()
     tot_time = EML_times['after_modelEM_time'] - EML_times['before_modelEM_time']
     print_log(f"\nTotal time needed to create MP model {tot_time}")
+    # Cumulative time and time spent in each phase
+    prev_time = EML_times['before_modelEM_time']
     for time_label in EML_times:
         t_time = EML_times[time_label] - EML_times['before_modelEM_time']
-        print_log(f"* {time_label}: {t_time}")
+        print_log(f"* {time_label}: {t_time} (phase: {EML_times[time_label] - prev_time})")
+        prev_time = EML_times[time_label]
 
     ################################ Solve ################################
     print_log('\n=== Starting the solution process')
-    mdl.set_time_limit(20000)
-    sol = mdl.solve()
+    with metrics.phase('solve'):
+        sol = session.solve()
+    EML_times['after_solve_time'] = time.time()
 
     # Print solution
-    if sol is None:
-        print_log('No solution found')
-    else:
-        print_log('SOLUTION DATA')
-        print_log('Solution time: {:.2f} (sec)'.format(mdl.solve_details.time))
-        print_log('Solver status: {}'.format(sol.solve_details.status))
-
-        print_log(f'\t*CONT VARIABLES')
-        for var in DT_vars:
-            print_log(f'\t\t* {var}: {sol[var]}')
-
-        print_log(f'\t*INT VARIABLES')
-        for var in DT_vars_int:
-            print_log(f'\t\t* {var}: {sol[var]}')
-
-        print_log(f'\t*BINARY VARIABLES')
-        for var in binary_vars_names:
-            print_log(f'\t\t* {var}: {sol[var]}')
-
-    # Log
-    DT_vars = DT_vars + DT_vars_int
-    write_logs(EML_times=EML_times,
-               sol=sol,
-               mdl=mdl,
-               DT_vars=DT_vars,
-               user_constraints=user_constraints,
-               objective_type=objective_type,
-               objective_var=objective_var,
-               model_name=model_name,
-               log_path=save_path)
+    session.print_solution(sol)
+    if is_debug() and sol is not None:
+        # Evaluate the rules at the solution, outside the model
+        for alg, (rule, predicted, actual, ok) in check_solution(sol, logic_constraints, algs).items():
+            print_log(f'Rule check {alg}: rule {rule} predicts {predicted}, solution {actual}'
+                      f'{"" if ok else " (MISMATCH)"}', level='debug')
+
+    if export_future is not None:
+        # Time spent waiting for the background export after the solve
+        with metrics.phase('export'):
+            export_path = export_future.result()
+        print_log(f"\nModel saved to: {export_path}")
+
+    # Log one record per run
+    if runs_log is not None:
+        record = make_run_record(model_name=model_name, model_key=key,
+                                 options={'formulation': formulation, 'grid_encoding': grid_encoding,
+                                          'objective_linearization': objective_linearization,
+                                          'enable_var_type': enable_var_type,
+                                          'from_snapshot': getattr(session, 'from_snapshot', False),
+                                          'engine': 'enumeration' if isinstance(session, EnumerationSession)
+                                          else 'mip',
+                                          'backend': backend,
+                                          'solver_profile': session.solver_profile},
+                                 objective=f'{objective_type}({objective_var})', user_constraints=user_constraints,
+                                 metrics=metrics, statistics=statistics, solve_details=session.solve_details,
+                                 sol=sol, variables=session.DT_vars + session.DT_vars_int)
+        write_run_record(record, os.path.join(save_path, runs_log))
+    metrics.stop()
 
     print_log(f'----------------------------------------------------------')
+
+    return sol
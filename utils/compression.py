@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:16:52 2026
+
+Compression of the logic rules: the rules not reached by the training data are dropped, and adjacent hypercubes are
+merged when a single THEN expression stays close to the original rules over their whole hypercubes.
+"""
+
+import numpy as np
+
+from utils.rule_index import RuleIndex
+from utils.rule_sets import CompiledRules, as_compiled_rules
+from utils.util_functions import load_train_dataset, print_log
+
+
+def _adjacent_pairs(lb, ub, alive, tol):
+    """
+    Returns the pairs (i, j) of alive hypercubes sharing a face, such that their union is a hypercube: the upper bound
+    of i equals the lower bound of j on one input, and their ranges are equal on the other inputs.
+    """
+    ids = np.flatnonzero(alive)
+    pairs = set()
+    # Bounds rounded to the tolerance, so that equal bounds have equal keys
+    scale = 1. / max(tol, 1e-12)
+    lb_key = np.round(lb[ids] * scale)
+    ub_key = np.round(ub[ids] * scale)
+    for col in range(lb.shape[1]):
+        others = np.concatenate([np.delete(lb_key, col, axis=1), np.delete(ub_key, col, axis=1)], axis=1)
+        ends = {}
+        for k, (row, end) in enumerate(zip(map(bytes, others), ub_key[:, col])):
+            if np.isfinite(end):
+                ends.setdefault((row, end), []).append(ids[k])
+        for k, (row, start) in enumerate(zip(map(bytes, others), lb_key[:, col])):
+            for i in ends.get((row, start), ()):
+                pairs.add((i, ids[k]))
+    return sorted(pairs)
+
+
+def _max_deviation(intercept, coef, ref_intercept, ref_coef, lb, ub):
+    """
+    Returns the maximum absolute deviation of the expression (intercept, coef) from the expressions of some rules
+    (ref_intercept, ref_coef) over their hypercubes (lb, ub). The deviation from each rule is linear in the inputs, so
+    it is largest at a corner of the hypercube; it is infinite if the coefficients differ on an unbounded input.
+    """
+    diff = coef - ref_coef
+    with np.errstate(invalid='ignore'):
+        high = np.where(diff > 0, diff * ub, diff * lb)
+        low = np.where(diff > 0, diff * lb, diff * ub)
+    # Inputs with the same coefficient do not contribute, even if unbounded
+    high = np.where(diff == 0, 0., high).sum(axis=1)
+    low = np.where(diff == 0, 0., low).sum(axis=1)
+    shift = intercept - ref_intercept
+    return float(np.max(np.maximum(np.abs(shift + high), np.abs(shift + low))))
+
+
+def _best_expression(X, reference, candidates, ref_intercept, ref_coef, lb, ub):
+    """
+    Returns the expression (intercept, coefficients) among the candidates and the least-squares fit of the reference
+    values at the points X that deviates the least from the rules (ref_intercept, ref_coef) over their hypercubes
+    (lb, ub), with its maximum deviation (see _max_deviation).
+    """
+    candidates = list(candidates)
+    if len(X) > 0:
+        # Least-squares fit on the inputs used by the candidates
+        cols = np.flatnonzero(np.any([coef != 0 for _, coef in candidates], axis=0))
+        A = np.column_stack([np.ones(len(X)), X[:, cols]])
+        solution = np.linalg.lstsq(A, reference, rcond=None)[0]
+        fitted = np.zeros(X.shape[1])
+        fitted[cols] = solution[1:]
+        candidates.append((solution[0], fitted))
+    best = None
+    for intercept, coef in candidates:
+        deviation = _max_deviation(intercept, coef, ref_intercept, ref_coef, lb, ub)
+        if best is None or deviation < best[2]:
+            best = (intercept, coef, deviation)
+    return best
+
+
+def compress_rules(rules, X, y=None, tol=0.1, drop_unreached=True, input_tol=1e-9, domain=None):
+    """
+    Compresses a rule set on a dataset:
+        * the rules whose hypercube contains no point of the dataset are dropped (if drop_unreached)
+        * two adjacent rules, whose hypercubes form a hypercube, are merged when a single THEN expression (one of the
+          two, or the least-squares fit of the rules on their points) deviates by at most tol from each original
+          rule it replaces, anywhere in the hypercube of that rule (not only at the points); the merges are applied
+          greedily, from the smallest deviation, until no pair can be merged
+    Dropping the unreached rules restricts the domain of the inputs to the hypercubes reached by the data.
+
+    :param rules: CompiledRules object (or list of rule dicts)
+    :param X: points of the dataset (see RuleIndex.as_matrix), e.g., the training dataset of the ML model
+    :param y: optional values of the target at the points, to measure the prediction error of the rules
+    :param tol: maximum deviation of the compressed rules from the original ones, anywhere in the hypercubes of the
+        original rules (clipped to domain), in the unit of the target
+    :param drop_unreached: if True, the rules that contain no point are dropped
+    :param input_tol: tolerance on the hypercube bounds
+    :param domain: optional tuple (lb, ub) with the bounds of the inputs, in the order of rules.inputs, clipping the
+        hypercubes where the deviation is measured; without it, two expressions differing on an input unbounded in a
+        hypercube are never merged
+
+    :return: tuple (CompiledRules object, report); the report contains the number of rules before and after the
+        compression ('rules'), of unreached rules ('unreached') and of merges ('merged'), the maximum deviation from the
+        original rules over their hypercubes ('max_deviation') and, if y is given, the maximum absolute error of the
+        original and of the compressed rules with respect to y ('max_error'); unlike max_deviation, max_error is only
+        measured at the points of the dataset
+    """
+    rules = as_compiled_rules(rules)
+    index = RuleIndex(rules, tol=input_tol)
+    X = index.as_matrix(X)
+    located = index.locate(X)
+    reference = index.predict(X, located=located)
+    inside = located >= 0
+    X, reference, located = X[inside], reference[inside], located[inside]
+
+    # Points of each rule
+    order = np.argsort(located, kind='stable')
+    counts = np.bincount(located, minlength=len(rules))
+    points = np.split(order, np.cumsum(counts)[:-1])
+    alive = counts > 0 if drop_unreached else np.ones(len(rules), dtype=bool)
+    lb, ub = rules.lb.copy(), rules.ub.copy()
+    intercept, coef = rules.intercept.copy(), rules.coef.copy()
+    # Hypercubes of the original rules where the deviations are measured, and original rules merged into each rule
+    box_lb, box_ub = rules.lb, rules.ub
+    if domain is not None:
+        box_lb = np.maximum(box_lb, np.asarray(domain[0], dtype=float))
+        box_ub = np.minimum(box_ub, np.asarray(domain[1], dtype=float))
+    members = [[i] for i in range(len(rules))]
+    deviation = np.zeros(len(rules))
+    n_merged = 0
+
+    while True:
+        merges = []
+        for i, j in _adjacent_pairs(lb, ub, alive, input_tol):
+            union = np.concatenate([points[i], points[j]])
+            originals = members[i] + members[j]
+            e_intercept, e_coef, e_deviation = _best_expression(X[union], reference[union],
+                                                                [(intercept[i], coef[i]), (intercept[j], coef[j])],
+                                                                rules.intercept[originals], rules.coef[originals],
+                                                                box_lb[originals], box_ub[originals])
+            if e_deviation <= tol:
+                merges.append((e_deviation, i, j, e_intercept, e_coef))
+        merges.sort(key=lambda merge: merge[0])
+        done = set()
+        for e_deviation, i, j, e_intercept, e_coef in merges:
+            if i in done or j in done:
+                continue
+            # j is merged into i
+            lb[i], ub[i] = np.minimum(lb[i], lb[j]), np.maximum(ub[i], ub[j])
+            intercept[i], coef[i] = e_intercept, e_coef
+            points[i] = np.concatenate([points[i], points[j]])
+            members[i] = members[i] + members[j]
+            deviation[i] = e_deviation
+            alive[j] = False
+            done.update((i, j))
+            n_merged += 1
+        if not done:
+            break
+
+    compressed = CompiledRules(rules.target, rules.inputs, lb[alive], ub[alive], intercept[alive], coef[alive])
+    report = {'rules': (len(rules), len(compressed)), 'unreached': int(np.sum(counts == 0)) if drop_unreached else 0,
+              'merged': n_merged, 'max_deviation': float(deviation[alive].max()) if alive.any() else 0.}
+    if y is not None:
+        y = np.asarray(y, dtype=float)[inside]
+        prediction = RuleIndex(compressed, tol=input_tol).predict(X)
+        report['max_error'] = (float(np.max(np.abs(reference - y))) if len(y) else 0.,
+                               float(np.nanmax(np.abs(prediction - y))) if len(y) else 0.)
+    return compressed, report
+
+
+def _input_domain(inputs, df_mins, df_maxs):
+    """
+    Returns the bounds (lb, ub) of the inputs of the rules (instance features and hyperparameters) in the global bounds
+    of the problem variables, infinite for the inputs without bounds.
+    """
+    lb, ub = np.full(len(inputs), -np.inf), np.full(len(inputs), np.inf)
+    for k, var_name in enumerate(inputs):
+        if var_name[2:] in df_mins['glob'].index:
+            lb[k], ub[k] = float(df_mins['glob'].loc[var_name[2:]]), float(df_maxs['glob'].loc[var_name[2:]])
+    return lb, ub
+
+
+def compress_logic_rules(logic_constraints, algs, tol=0.1, drop_unreached=True, df_mins=None, df_maxs=None):
+    """
+    Compresses the rules of each algorithm on its training dataset (see compress_rules), before the model is built.
+
+    :param logic_constraints: dict with the logic rules of each algorithm and ml model (see define_logic_rules)
+    :param algs: dict with the information of the algorithms and ml models (see define_algs_dict)
+    :param tol: maximum deviation of the compressed rules from the original ones over their hypercubes (see
+        compress_rules)
+    :param drop_unreached: if True, the rules that contain no training sample are dropped
+    :param df_mins: optional dict with the lower bounds of the problem variables (see load_var_intervals), clipping the
+        hypercubes where the deviation from the original rules is measured
+    :param df_maxs: optional dict with the upper bounds of the problem variables
+
+    :return: tuple (logic_constraints, report); the input is not modified. The report maps each algorithm to the
+        report of compress_rules
+    """
+    logic_constraints = {alg: dict(models) for alg, models in logic_constraints.items()}
+    report = {}
+    for alg in algs.keys():
+        model = list(algs[alg]['ml_model'].keys())[0]
+        rules = as_compiled_rules(logic_constraints[alg][model])
+        data = load_train_dataset(alg, algs[alg]['alg_params'])
+        # Target 'y_{alg}_{var}', stored in the column var
+        target = rules.target[len(alg) + 3:]
+        domain = _input_domain(rules.inputs, df_mins, df_maxs) if df_mins is not None else None
+        compressed, report[alg] = compress_rules(rules, data, y=data[target] if target in data else None, tol=tol,
+                                                 drop_unreached=drop_unreached, domain=domain)
+        logic_constraints[alg][model] = compressed
+
+        alg_report = report[alg]
+        print_log(f"Compression: {alg} rules {alg_report['rules'][0]} -> {alg_report['rules'][1]} "
+                  f"({alg_report['unreached']} unreached, {alg_report['merged']} merged), "
+                  f"max deviation over the hypercubes {alg_report['max_deviation']:.4g}")
+        if 'max_error' in alg_report:
+            print_log(f"\t* max error at the training samples: {alg_report['max_error'][0]:.4g} -> "
+                      f"{alg_report['max_error'][1]:.4g}")
+    return logic_constraints, report
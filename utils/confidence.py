@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:04:37 2026
+
+Confidence margins of the ML targets, applied to the user constraints of a single model for several confidence levels.
+"""
+
+import os
+import re
+import time
+
+import numpy as np
+
+import const_define as cd
+from utils.build_model_symbolic import open_session
+from utils.util_functions import print_log
+
+# Margin files: {ALG}_coefficients_{k}_{confidence}[_pruned].csv, with one column per ML target (cd.MARGIN_TARGETS)
+MARGIN_FILE = re.compile(r'^(?P<alg>\w+?)_coefficients_(?P<k>\d+)_(?P<conf>\d+)(?P<pruned>_pruned)?\.csv$')
+# Rows of the margin files: the first one scales with k and does not depend on the confidence level, the second one
+# grows with the confidence level and does not depend on k. 'max' takes the largest of the two
+MARGIN_ROWS = ['spread', 'quantile']
+MARGIN_SELECTION = MARGIN_ROWS + ['max']
+
+# Tables already parsed, by directory
+_tables = {}
+
+
+class MarginTable:
+    """
+    Margins of the ML targets of all the margin files of a directory, in a single array indexed by
+    (algorithm, k, confidence level, pruned, row, target). The combinations without a file are NaN.
+    """
+
+    def __init__(self, algs, ks, confs, targets, values):
+        """
+        :param algs: list of the algorithms
+        :param ks: sorted int array of the values of k
+        :param confs: sorted int array of the confidence levels (percent)
+        :param targets: list of the ML targets
+        :param values: float array of shape (len(algs), len(ks), len(confs), 2, len(MARGIN_ROWS), len(targets))
+        """
+        self.algs = list(algs)
+        self.ks = np.asarray(ks, dtype=int)
+        self.confs = np.asarray(confs, dtype=int)
+        self.targets = list(targets)
+        self.values = values
+
+    @classmethod
+    def from_dir(cls, coefficients_dir=cd.COEFFICIENTS_DIR):
+        """
+        Parses the margin files of a directory.
+
+        :param coefficients_dir: directory of the margin files
+
+        :return: MarginTable
+        """
+        files = []
+        for file_name in sorted(os.listdir(coefficients_dir)):
+            match = MARGIN_FILE.match(file_name)
+            if match is not None:
+                files.append((match['alg'], int(match['k']), int(match['conf']), match['pruned'] is not None,
+                              os.path.join(coefficients_dir, file_name)))
+        if not files:
+            raise FileNotFoundError(f'No margin file in {coefficients_dir}')
+        algs = sorted({alg for alg, _, _, _, _ in files})
+        ks = sorted({k for _, k, _, _, _ in files})
+        confs = sorted({conf for _, _, conf, _, _ in files})
+        targets = list(cd.MARGIN_TARGETS.values())
+        values = np.full((len(algs), len(ks), len(confs), 2, len(MARGIN_ROWS), len(targets)), np.nan)
+        for alg, k, conf, pruned, path in files:
+            with open(path) as f:
+                header = f.readline().strip().split(',')
+                rows = np.loadtxt(f, delimiter=',', ndmin=2)
+            if rows.shape != (len(MARGIN_ROWS), len(header)):
+                raise ValueError(f'{path}: expected {len(MARGIN_ROWS)} rows of {len(header)} margins')
+            columns = [header.index(column) for column in cd.MARGIN_TARGETS]
+            values[algs.index(alg), ks.index(k), confs.index(conf), int(pruned)] = rows[:, columns]
+        return cls(algs, ks, confs, targets, values)
+
+    def available_confs(self, algs, k=1, pruned=False):
+        """
+        Returns the confidence levels with a margin file for every algorithm in algs, for the given k and pruning.
+        """
+        alg_ids = [self.algs.index(alg) for alg in algs if alg in self.algs]
+        if len(alg_ids) < len(algs) or k not in self.ks:
+            return []
+        k_id = int(np.searchsorted(self.ks, k))
+        found = ~np.isnan(self.values[alg_ids, k_id, :, int(pruned)]).any(axis=(0, 2, 3))
+        return [int(conf) for conf in self.confs[found]]
+
+    def margins(self, algs, target, confs, k=1, pruned=False, row='max'):
+        """
+        Returns the margins of an ML target, for several confidence levels at once.
+
+        :param algs: list of the algorithms
+        :param target: ML target (e.g., 'time(sec)')
+        :param confs: list of the confidence levels (percent)
+        :param k: multiplier of the margin files
+        :param pruned: if True, the margins of the pruned files
+        :param row: one of MARGIN_SELECTION
+
+        :return: float array of shape (len(confs), len(algs))
+
+        :raise ValueError: if a margin is missing
+        """
+        assert row in MARGIN_SELECTION, f"Unsupported margin row '{row}', choose among {MARGIN_SELECTION}"
+        missing = [alg for alg in algs if alg not in self.algs]
+        if missing or target not in self.targets or k not in self.ks or not set(confs) <= set(self.confs.tolist()):
+            raise ValueError(f'No margin of {target} for algorithms {list(algs)}, k = {k}, confidence levels {confs}')
+        alg_ids = [self.algs.index(alg) for alg in algs]
+        k_id = int(np.searchsorted(self.ks, k))
+        conf_ids = np.searchsorted(self.confs, confs)
+        # (algs, confs, rows) -> (confs, algs, rows)
+        values = self.values[alg_ids, k_id, :, int(pruned), :, self.targets.index(target)][:, conf_ids]
+        values = values.transpose(1, 0, 2)
+        margins = values.max(axis=2) if row == 'max' else values[:, :, MARGIN_ROWS.index(row)]
+        if np.isnan(margins).any():
+            conf = confs[int(np.flatnonzero(np.isnan(margins).any(axis=1))[0])]
+            raise ValueError(f"No margin file for k = {k}, confidence level {conf}{', pruned' if pruned else ''}")
+        return margins
+
+
+def load_margin_table(coefficients_dir=cd.COEFFICIENTS_DIR):
+    """
+    Returns the MarginTable of a directory, parsed only once per process.
+    """
+    coefficients_dir = os.path.abspath(coefficients_dir)
+    if coefficients_dir not in _tables:
+        _tables[coefficients_dir] = MarginTable.from_dir(coefficients_dir)
+    return _tables[coefficients_dir]
+
+
+def adjusted_rhs(table, algs, user_constraints, confs, k=1, pruned=False, row='max'):
+    """
+    Right-hand sides of the user constraints adjusted by the confidence margins: y_{alg}_{var} + margin <= v becomes
+    y_{alg}_{var} <= v - margin, and y_{alg}_{var} - margin >= v becomes y_{alg}_{var} >= v + margin, so that the
+    constraint holds at the confidence level despite the error of the ML model. Equality constraints are not adjusted.
+
+    :param table: MarginTable
+    :param algs: list of the algorithms
+    :param user_constraints: dict {'variable': [...], 'type': [...], 'value': [...]}
+    :param confs: list of the confidence levels (percent)
+
+    :return: list with one float array of shape (len(confs), len(algs)) per user constraint
+    """
+    rhs = []
+    for var_name, cstr_type, v in zip(user_constraints['variable'], user_constraints['type'],
+                                      user_constraints['value']):
+        if cstr_type == '==':
+            rhs.append(np.full((len(confs), len(algs)), float(v)))
+            continue
+        margins = table.margins(algs, var_name, confs, k=k, pruned=pruned, row=row)
+        rhs.append(v - margins if cstr_type == '<=' else v + margins)
+    return rhs
+
+
+def _level_point(session, sol, conf, ml_trgt):
+    """
+    Returns the record of the solution at a confidence level: the confidence level, followed by the record of the
+    solution (see SessionBase.solution_point).
+    """
+    return {'confidence': conf, **session.solution_point(sol, ml_trgt)}
+
+
+def solve_levels(session, user_constraints, objective_type, objective_var, confs, table, k=1, pruned=False,
+                 row='max', ml_trgt=cd.ML_TARGETS, time_limit=20000):
+    """
+    Solves the problem at several confidence levels on a session (EMLSession or EnumerationSession): the user
+    constraints are added once, with one right-hand side per algorithm, and only their right-hand sides change between
+    the levels. The margins grow with the confidence level, so the levels are solved from the highest to the lowest,
+    and the solution of each level is feasible for the next one and warm starts it.
+
+    :param session: session with the base model, without user constraints
+    :param user_constraints: dict {'variable': [...], 'type': [...], 'value': [...]}, before the margins
+    :param confs: list of the confidence levels (percent)
+    :param table: MarginTable
+    The other parameters are those of MarginTable.margins and build_and_solve_EML.
+
+    :return: list with one dict per confidence level (see _level_point), in the order of confs
+    """
+    algs = list(session.algs.keys())
+    # Right-hand sides of all the constraints at all the levels, computed at once
+    rhs = adjusted_rhs(table, algs, user_constraints, confs, k=k, pruned=pruned, row=row)
+    order = sorted(range(len(confs)), key=lambda i: confs[i], reverse=True)
+    if not order:
+        return []
+    session.set_objective(objective_type, objective_var)
+    print_log("Custom constraints:")
+    handles = [session.add_user_constraint(var_name, cstr_type, dict(zip(algs, cstr_rhs[order[0]].tolist())))
+               for var_name, cstr_type, cstr_rhs in zip(user_constraints['variable'], user_constraints['type'], rhs)]
+    points = [None] * len(confs)
+    try:
+        for i in order:
+            for handle, cstr_rhs in zip(handles, rhs):
+                session.update_user_constraint(handle, dict(zip(algs, cstr_rhs[i].tolist())))
+            sol = session.solve(time_limit=time_limit)
+            points[i] = _level_point(session, sol, confs[i], ml_trgt)
+    finally:
+        for handle in handles:
+            session.remove_user_constraint(handle)
+    return points
+
+
+def solve_confidence_levels(df_mins, df_maxs, user_constraints, logic_constraints, objective_type, objective_var,
+                            confs=None, k=1, pruned=False, row='max', coefficients_dir=cd.COEFFICIENTS_DIR,
+                            enable_var_type=False, inst_descr=None, ml_trgt=None, algs=None,
+                            formulation='indicator', grid_encoding='unary', objective_linearization='mccormick',
+                            backend='cplex', snapshot_dir=cd.SNAPSHOT_DIR, time_limit=20000, solver_profile=None):
+    """
+    Solves the problem with the user constraints adjusted by the confidence margins of the files in coefficients_dir,
+    for all the confidence levels in a single run: the model is built (or reloaded from its snapshot) once.
+
+    :param confs: list of the confidence levels (percent); if None, all the levels with a margin file for every
+        algorithm, for the given k and pruning
+    :param k: multiplier of the margin files
+    :param pruned: if True, the margins of the pruned files
+    :param row: margin row, one of MARGIN_SELECTION
+    :param coefficients_dir: directory of the margin files
+    The other parameters are those of build_and_solve_EML.
+
+    :return: list with one dict per confidence level (see _level_point)
+    """
+    table = load_margin_table(coefficients_dir)
+    if confs is None:
+        confs = table.available_confs(list(algs.keys()), k=k, pruned=pruned)
+    session = open_session(df_mins=df_mins, df_maxs=df_maxs, logic_constraints=logic_constraints,
+                           enable_var_type=enable_var_type, inst_descr=inst_descr, ml_trgt=ml_trgt, algs=algs,
+                           formulation=formulation, grid_encoding=grid_encoding,
+                           objective_linearization=objective_linearization, backend=backend,
+                           snapshot_dir=snapshot_dir, solver_profile=solver_profile)
+
+    print_log(f"\n=== Solving {objective_type}({objective_var}) at confidence levels {confs} "
+              f"(k = {k}{', pruned' if pruned else ''}, {row} margins)")
+    start = time.perf_counter()
+    points = solve_levels(session, user_constraints, objective_type, objective_var, confs, table, k=k,
+                          pruned=pruned, row=row, ml_trgt=ml_trgt, time_limit=time_limit)
+    print_log(f'{len(points)} levels solved in {time.perf_counter() - start:.2f} sec')
+    for point in points:
+        print_log(f"\t* {point['confidence']}%: {point['status']}, {objective_var} = {point['objective_value']} "
+                  f"({point['algorithm']})")
+    return points
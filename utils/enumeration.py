@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 09:26:51 2026
+
+Exact solution of the EML problem by enumeration of the logic rules, without building a MIP model.
+"""
+
+import time
+
+import numpy as np
+
+from utils.model_io import SnapshotSolution, SolveDetails
+from utils.rule_sets import as_compiled_rules
+from utils.session_base import SessionBase
+from utils.util_functions import print_log
+
+# Above this number of rules (times inputs) the arrays of the enumeration are not worth their memory
+ENUMERATION_MAX_CELLS = 10 ** 7
+
+# Largest rule set (number of rules and of inputs of the rules of an algorithm) solved by enumeration with
+# engine='auto': above either one, build_and_solve_EML builds the MIP model instead
+AUTO_ENUMERATION_MAX_RULES = 10 ** 5
+AUTO_ENUMERATION_MAX_INPUTS = 16
+
+
+def enumeration_support(df_mins, df_maxs, logic_constraints, algs, inst_descr, ml_trgt, enable_var_type,
+                        max_rules=None, max_inputs=None):
+    """
+    Checks whether the problem can be solved by EnumerationSession.
+
+    :param max_rules: if not None, maximum number of rules of each algorithm (e.g., AUTO_ENUMERATION_MAX_RULES)
+    :param max_inputs: if not None, maximum number of inputs of the rules of each algorithm (e.g.,
+        AUTO_ENUMERATION_MAX_INPUTS)
+
+    :return: None if the problem is supported, otherwise a string with the reason why it is not
+    """
+    if enable_var_type and any(p['type'] == int for alg in algs for p in algs[alg]['alg_params'].values()):
+        return 'integer hyperparameters'
+    seen_inputs = set()
+    cells = 0
+    for alg in algs:
+        model = list(algs[alg]['ml_model'].keys())[0]
+        rules = as_compiled_rules(logic_constraints[alg][model])
+        if rules.target not in [f'y_{alg}_{var}' for var in ml_trgt]:
+            return f'rules of {alg} predict {rules.target}'
+        for var_name in rules.inputs:
+            if var_name[2:] not in df_mins['glob'].index or var_name[2:] in ml_trgt:
+                return f'input {var_name} is not an instance feature or a hyperparameter'
+        bounds = np.array([[df_mins['glob'].loc[var_name[2:]], df_maxs['glob'].loc[var_name[2:]]]
+                           for var_name in rules.inputs], dtype=float)
+        if not np.all(np.isfinite(bounds)):
+            return f'unbounded inputs of {alg}'
+        if max_rules is not None and len(rules) > max_rules:
+            return f'{len(rules)} rules of {alg}, above {max_rules}'
+        if max_inputs is not None and len(rules.inputs) > max_inputs:
+            return f'{len(rules.inputs)} inputs of the rules of {alg}, above {max_inputs}'
+        # Inputs shared by the rules of two algorithms couple the choice of their active rules
+        if seen_inputs & set(rules.inputs):
+            return 'inputs shared across algorithms'
+        seen_inputs |= set(rules.inputs)
+        cells += len(rules) * max(len(rules.inputs), 1)
+    if cells > ENUMERATION_MAX_CELLS:
+        return 'too many rules'
+    return None
+
+
+class EnumerationSession(SessionBase):
+    """
+    Solves the EML problem by enumerating the logic rules, with the same inputs and semantics as EMLSession.
+    In the model exactly one rule of each algorithm is active, and the THEN expression of a rule is linear over its
+    hypercube, so its range is the interval between its values at two opposite corners. Each query is thus solved in
+    closed form: for the chosen algorithm, the best rule is the one whose range, clipped to the domain of the target,
+    has the best end point; the other algorithms only need one rule compatible with the user constraints.
+    Only problems accepted by enumeration_support are supported.
+    """
+
+    def __init__(self, df_mins, df_maxs, logic_constraints, model_name=None, inst_descr=None, ml_trgt=None,
+                 algs=None):
+        if not model_name:
+            model_name = f"EML_model_{time.strftime('%d_%m_%Y-%H_%M_%S')}"
+        self.model_name = model_name
+        self.algs = algs
+        self.ml_trgt = list(ml_trgt)
+        print_log(f' ------------------- MODEL {model_name} -------------------')
+        print_log('\n=== Enumerating the logic rules')
+        EML_times = {}
+        EML_times['before_modelEM_time'] = time.time()
+
+        # Variables, named and ordered as in EMLSession
+        self.bounds = {}
+        for var in self.ml_trgt:
+            for alg in algs:
+                self.bounds[f'y_{alg}_{var}'] = (float(df_mins[alg].loc[var]), float(df_maxs[alg].loc[var]))
+        for var in list(inst_descr) + [p['name'] for alg in algs for p in algs[alg]['alg_params'].values()]:
+            self.bounds[f'y_{var}'] = (float(df_mins['glob'].loc[var]), float(df_maxs['glob'].loc[var]))
+        self.DT_vars = list(self.bounds)
+        self.DT_vars_int = []
+        self.binary_vars_names = [f'b_{alg}' for alg in algs]
+        # Original bounds of the variables fixed by fix_variables
+        self._fixed_bounds = {}
+
+        self.rules = {}
+        self._cubes = {}
+        for alg in algs:
+            model = list(algs[alg]['ml_model'].keys())[0]
+            self.rules[alg] = as_compiled_rules(logic_constraints[alg][model])
+        self._clip_rules()
+        EML_times['after_enumeration_setup_time'] = time.time()
+        self.EML_times = EML_times
+
+        self._user_cts = {}
+        self._next_handle = 0
+        self.objective_type = None
+        self.objective_var = None
+        self.last_solution = None
+        self.solve_details = None
+        self.solver_params = {}
+        self.solver_profile = 'default'
+
+    def _clip_rules(self, algs=None):
+        """
+        Clips the hypercubes of the rules of algs (default: all the algorithms) to the current bounds of their inputs,
+        and computes the corners where the THEN expressions are minimum and maximum.
+        """
+        for alg in self.algs if algs is None else algs:
+            rules = self.rules[alg]
+            lbs = np.array([self.bounds[var_name][0] for var_name in rules.inputs])
+            ubs = np.array([self.bounds[var_name][1] for var_name in rules.inputs])
+            lo = np.maximum(rules.lb, lbs)
+            hi = np.minimum(rules.ub, ubs)
+            valid = np.all(lo <= hi, axis=1)
+            x_min = np.where(rules.coef > 0, lo, hi)
+            x_max = np.where(rules.coef > 0, hi, lo)
+            y_min = rules.intercept + np.sum(rules.coef * x_min, axis=1)
+            y_max = rules.intercept + np.sum(rules.coef * x_max, axis=1)
+            self._cubes[alg] = (valid, x_min, x_max, y_min, y_max)
+
+    def fix_variables(self, values):
+        """
+        Fixes problem variables (e.g., the instance features 'y_PV_mean') to the given values, releasing the variables
+        fixed by the previous call, as EMLSession.fix_variables. Only the rules with a fixed input are clipped again.
+
+        :param values: dict mapping the variable names to their values; an empty dict releases all the variables
+
+        :raise ValueError: if a value lies outside the original bounds of its variable
+        """
+        changed = set(self._fixed_bounds) | set(values)
+        self.bounds.update(self._fixed_bounds)
+        self._fixed_bounds = {}
+        for var_name, v in values.items():
+            lb, ub = self.bounds[var_name]
+            if not lb <= v <= ub:
+                raise ValueError(f'{var_name} = {v} is outside the bounds [{lb}, {ub}]')
+        self._fixed_bounds = {var_name: self.bounds[var_name] for var_name in values}
+        self.bounds.update({var_name: (float(v), float(v)) for var_name, v in values.items()})
+        self._clip_rules([alg for alg, rules in self.rules.items() if changed & set(rules.inputs)])
+
+    def add_user_constraint(self, var_name, cstr_type, v):
+        """
+        Adds the user constraint y_{alg}_{var_name} {cstr_type} v for every algorithm.
+
+        :return: handle of the constraint, to be passed to remove_user_constraint
+        """
+        print_log(f'\t* {var_name} {cstr_type} {v}')
+        if cstr_type not in ['<=', '>=', '==']:
+            raise ValueError(f'Unsupported constraint type {cstr_type}')
+        handle = self._next_handle
+        self._next_handle += 1
+        self._user_cts[handle] = (var_name, cstr_type, v, None)
+        return handle
+
+    def remove_user_constraint(self, handle):
+        """
+        Removes a user constraint added by add_user_constraint.
+        """
+        self._user_cts.pop(handle)
+
+    def update_user_constraint(self, handle, v):
+        """
+        Changes the right-hand side of a user constraint added by add_user_constraint.
+        """
+        var_name, cstr_type, _, _ = self._user_cts[handle]
+        self._user_cts[handle] = (var_name, cstr_type, v, None)
+
+    def set_objective(self, objective_type, objective_var):
+        """
+        Sets the objective min/max of y_{alg}_{objective_var} of the chosen algorithm.
+        """
+        print_log("Objective:")
+        print_log(f'\t* {objective_type}({objective_var})')
+        self.objective_type = objective_type
+        self.objective_var = objective_var
+
+    def _domain(self, alg, var, chosen):
+        """
+        Returns the domain (lb, ub) of y_{alg}_{var} under the user constraints, linearized as in
+        EMLSession.add_user_constraint, or None if the constraints cannot hold with b_{alg} == chosen.
+        """
+        var_lb, var_ub = self.bounds[f'y_{alg}_{var}']
+        lb, ub = var_lb, var_ub
+        for cstr_var, cstr_type, v, _ in self._user_cts.values():
+            if cstr_var != var:
+                continue
+            if isinstance(v, dict):
+                v = v[alg]
+            if cstr_type == '<=':
+                # y <= v and y.lb * b <= v
+                ub = min(ub, v)
+                if (var_lb if chosen else 0.) > v:
+                    return None
+            elif cstr_type == '>=':
+                lb = max(lb, v)
+            elif chosen:
+                # y == v and y.lb <= v <= y.ub
+                if not var_lb <= v <= var_ub:
+                    return None
+                lb, ub = max(lb, v), min(ub, v)
+            elif v != 0:
+                # y.lb * b <= v and y.ub * b >= v, with b == 0
+                return None
+        return (lb, ub) if lb <= ub else None
+
+    def _feasible_rules(self, alg, chosen):
+        """
+        Returns the mask of the rules of alg compatible with the domain of their target, and the domain itself.
+        """
+        domain = self._domain(alg, self.rules[alg].target[len(alg) + 3:], chosen)
+        if domain is None:
+            return None, None
+        valid, _, _, y_min, y_max = self._cubes[alg]
+        return valid & (y_max >= domain[0]) & (y_min <= domain[1]), domain
+
+    def _point(self, alg, i, value):
+        """
+        Returns the inputs of rule i of alg at which its THEN expression equals value, on the segment between the
+        corners of minimum and maximum.
+        """
+        _, x_min, x_max, y_min, y_max = self._cubes[alg]
+        t = 0. if y_max[i] <= y_min[i] else min(max((value - y_min[i]) / (y_max[i] - y_min[i]), 0.), 1.)
+        return x_min[i] + t * (x_max[i] - x_min[i])
+
+    def set_solver_params(self, params):
+        """
+        Accepted for compatibility with EMLSession: the enumeration uses no solver.
+        """
+        self.solver_params = dict(params)
+
+    def solve(self, time_limit=None):
+        """
+        Solves the problem by enumeration. time_limit is accepted for compatibility with EMLSession and ignored.
+
+        :return: SnapshotSolution, or None if the problem is infeasible
+        """
+        start = time.perf_counter()
+        sign = 1. if self.objective_type == 'min' else -1.
+        best = None
+        for chosen_alg in self.algs:
+            assignment = {}
+            for alg in self.algs:
+                chosen = alg == chosen_alg
+                # Domains of the targets not predicted by the rules
+                domains = {var: self._domain(alg, var, chosen) for var in self.ml_trgt}
+                feasible, target_domain = self._feasible_rules(alg, chosen)
+                if feasible is None or not feasible.any() or any(domains[var] is None for var in self.ml_trgt):
+                    assignment = None
+                    break
+
+                rules = self.rules[alg]
+                target = rules.target[len(alg) + 3:]
+                _, _, _, y_min, y_max = self._cubes[alg]
+                # Best end point of the ranges clipped to the domain of the target (any end point if not optimized)
+                if chosen and target == self.objective_var and sign > 0:
+                    values = np.maximum(y_min, target_domain[0])
+                elif chosen and target == self.objective_var:
+                    values = np.minimum(y_max, target_domain[1])
+                else:
+                    values = np.maximum(y_min, target_domain[0])
+                i = int(np.argmin(np.where(feasible, sign * values, np.inf)))
+                assignment[f'y_{alg}_{target}'] = float(values[i])
+                for var_name, x in zip(rules.inputs, self._point(alg, i, values[i])):
+                    assignment[var_name] = float(x)
+                for var in self.ml_trgt:
+                    if var != target:
+                        optimize_ub = chosen and var == self.objective_var and sign < 0
+                        assignment[f'y_{alg}_{var}'] = domains[var][1] if optimize_ub else domains[var][0]
+                assignment[f'b_{alg}'] = 1. if chosen else 0.
+
+            if assignment is None:
+                continue
+            objective_value = assignment[f'y_{chosen_alg}_{self.objective_var}']
+            if best is None or sign * objective_value < sign * best[0]:
+                best = (objective_value, assignment)
+
+        solve_time = time.perf_counter() - start
+        if best is None:
+            self.solve_details = SolveDetails(status='infeasible', time=solve_time, nb_nodes_processed=0,
+                                              nb_iterations=0, mip_relative_gap=None, best_bound=None)
+            return None
+
+        objective_value, assignment = best
+        values = {var_name: bounds[0] for var_name, bounds in self.bounds.items()}
+        values.update(assignment)
+        for alg in self.algs:
+            values[f'w_{alg}_{self.objective_var}'] = values[f'y_{alg}_{self.objective_var}'] * values[f'b_{alg}']
+        self.solve_details = SolveDetails(status='optimal (enumeration)', time=solve_time, nb_nodes_processed=0,
+                                          nb_iterations=0, mip_relative_gap=0., best_bound=objective_value)
+        sol = SnapshotSolution(values, objective_value, self.solve_details)
+        self.last_solution = sol
+        return sol
+
+    def statistics(self):
+        """
+        Returns the size of the problem: there are no constraints, the rules are enumerated.
+        """
+        return {'variables': len(self.DT_vars) + len(self.binary_vars_names),
+                'binary_variables': len(self.binary_vars_names),
+                'linear_constraints': 0,
+                'indicator_constraints': 0,
+                'pwl_constraints': 0,
+                'rules': sum(len(rules) for rules in self.rules.values())}
+
+    def dump(self, path):
+        """
+        Writes the enumerated rules to a text file.
+
+        :return: path of the dump
+        """
+        with open(path, 'w') as f:
+            for alg, rules in self.rules.items():
+                valid, _, _, y_min, y_max = self._cubes[alg]
+                f.write(f'{alg}: {len(rules)} RULES\n')
+                for i in range(len(rules)):
+                    f.write(f'\t* {i}: {rules.target} in [{y_min[i]}, {y_max[i]}]{"" if valid[i] else " (empty)"}\n')
+        return path
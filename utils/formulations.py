@@ -0,0 +1,551 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 14 15:21:40 2026
+
+Encodings of the GridREx logic rules in a docplex model.
+"""
+
+import time
+
+import numpy as np
+
+FORMULATIONS = ['indicator', 'bigm', 'piecewise', 'grid']
+# Formulations with per-rule variables and constraints, whose rules can be patched in a built model
+PATCHABLE_FORMULATIONS = ['indicator', 'bigm']
+GRID_ENCODINGS = ['unary', 'log']
+LINEARIZATIONS = ['mccormick', 'indicator']
+
+
+def _if_components(rules):
+    """
+    Returns the flattened IF components of the rules: rule if_rows[k] constrains input if_cols[k] and it is its
+    if_pos[k]-th IF component. Also returns the number of IF components and the position of the first one per rule.
+    """
+    # In GridREx IF statement there are only range constraints, one for each bounded input
+    constrained = np.isfinite(rules.lb) | np.isfinite(rules.ub)
+    if_rows, if_cols = np.nonzero(constrained)
+    n_if = constrained.sum(axis=1)
+    if_starts = np.cumsum(n_if) - n_if
+    if_pos = np.arange(len(if_rows)) - np.repeat(if_starts, n_if)
+    return if_rows, if_cols, if_pos, n_if, if_starts
+
+
+def _then_expressions(mdl, rules, input_vars):
+    """
+    Returns the linear expressions of the THEN statements, built directly from the compiled coefficients.
+    """
+    then_exprs = []
+    for i in range(len(rules)):
+        nz = np.flatnonzero(rules.coef[i])
+        then_exprs.append(mdl.scal_prod([input_vars[col] for col in nz], rules.coef[i, nz]) + rules.intercept[i])
+    return then_exprs
+
+
+def _add_rule_binaries(mdl, alg, rules, if_rows, if_pos, n_if, first_id=0):
+    """
+    Adds the IF and THEN binary variables of the rules in two batches. Rule i is named after its id first_id + i.
+    """
+    if_names = [f"{alg}_LogRul_{first_id + i}_IF_z{j}" for i, j in zip(if_rows, if_pos)]
+    then_names = [f"{alg}_LogRul_{first_id + i}_THEN_z{n_if[i]}" for i in range(len(rules))]
+    if_vars = mdl.binary_var_list(len(if_names), name=if_names)
+    then_vars = mdl.binary_var_list(len(then_names), name=then_names)
+    return if_vars, then_vars, if_names + then_names
+
+
+def _by_rule(n_rules, rows, items):
+    """
+    Groups the items by rule: items[k] belongs to rule rows[k].
+    """
+    groups = [[] for _ in range(n_rules)]
+    for i, item in zip(rows, items):
+        groups[i].append(item)
+    return groups
+
+
+def _record_rules(encoding, if_vars, then_vars, if_cts, then_cts):
+    """
+    Appends the variables and constraints of each new rule to an encoding (see add_logic_rules); the position of a
+    rule in the lists is its id.
+    """
+    for key, items in [('if_vars', if_vars), ('then_vars', then_vars), ('if_cts', if_cts), ('then_cts', then_cts)]:
+        encoding.setdefault(key, []).extend(items)
+
+
+def _then_indicators(mdl, rules, input_vars, target_var, then_vars):
+    """
+    Adds the THEN statements as indicator constraints.
+
+    :return: list with the constraints of each rule
+    """
+    cts = mdl.add_indicators(then_vars, [target_var == expr for expr in _then_expressions(mdl, rules, input_vars)])
+    return [[ct] for ct in cts]
+
+
+def _then_bigm(mdl, rules, input_vars, target_var, then_vars, x_lb, x_ub, y_lb, y_ub):
+    """
+    Adds the THEN statements as big-M constraints, with the M values derived from the bounds of the THEN expressions
+    over the variable domain.
+
+    :return: list with the constraints of each rule
+    """
+    expr_min = rules.intercept + np.minimum(rules.coef * x_lb, rules.coef * x_ub).sum(axis=1)
+    expr_max = rules.intercept + np.maximum(rules.coef * x_lb, rules.coef * x_ub).sum(axis=1)
+    then_cts = []
+    for expr, z, m_up, m_down in zip(_then_expressions(mdl, rules, input_vars), then_vars,
+                                     y_ub - expr_min, expr_max - y_lb):
+        then_cts.append(target_var - expr <= max(m_up, 0) * (1 - z))
+        then_cts.append(expr - target_var <= max(m_down, 0) * (1 - z))
+    then_cts = mdl.add_constraints(then_cts)
+    return [then_cts[2 * i:2 * i + 2] for i in range(len(rules))]
+
+
+def add_rules_indicator(mdl, alg, rules, var_index, times=None, first_id=0, encoding=None):
+    """
+    Encodes the rules as indicator constraints:
+        if z_IF == 1 then the input lies in the range (one z_IF for each IF component)
+        if z_THEN == 1 then all the z_IF of the rule are equal to 1
+        if z_THEN == 1 then the THEN equation holds
+
+    :param mdl: docplex model
+    :param alg: algorithm the rules refer to
+    :param rules: CompiledRules object
+    :param var_index: dict mapping the variable names to the model variables
+    :param times: optional dict where the time stamps of the encoding phases are stored
+    :param first_id: id of the first rule, used in the variable names
+    :param encoding: optional dict where the variables and constraints of each rule are appended (see add_logic_rules)
+
+    :return: tuple (list of the binary variable names, list of the THEN binary variables)
+    """
+    target_var = var_index[rules.target]
+    input_vars = [var_index[var_name] for var_name in rules.inputs]
+    if_rows, if_cols, if_pos, n_if, if_starts = _if_components(rules)
+
+    if_vars, then_vars, binary_vars_names = _add_rule_binaries(mdl, alg, rules, if_rows, if_pos, n_if,
+                                                               first_id=first_id)
+    if times is not None:
+        times[f'after_{alg}_rule_vars_time'] = time.time()
+
+    # IF statement
+    range_cts = [input_vars[col] >= rules.lb[i, col] for i, col in zip(if_rows, if_cols)]
+    range_cts += [input_vars[col] <= rules.ub[i, col] for i, col in zip(if_rows, if_cols)]
+    range_cts = mdl.add_indicators(if_vars + if_vars, range_cts)
+
+    # Link between IF and THEN statements
+    linked = np.flatnonzero(n_if)
+    link_cts = mdl.add_indicators([then_vars[i] for i in linked],
+                                  [mdl.sum(if_vars[if_starts[i]:if_starts[i] + n_if[i]]) == n_if[i] for i in linked])
+
+    # THEN statement
+    then_cts = _then_indicators(mdl, rules, input_vars, target_var, then_vars)
+
+    if encoding is not None:
+        if_cts = _by_rule(len(rules), np.concatenate([if_rows, if_rows, linked]).astype(int),
+                          list(range_cts) + list(link_cts))
+        _record_rules(encoding, _by_rule(len(rules), if_rows, if_vars), then_vars, if_cts, then_cts)
+
+    return binary_vars_names, then_vars
+
+
+def _finite_bounds(mdl, dvars):
+    """
+    Returns the bounds of the variables as arrays, or None if some bound is infinite.
+    """
+    lbs = np.array([var.lb for var in dvars], dtype=float)
+    ubs = np.array([var.ub for var in dvars], dtype=float)
+    if np.any(np.abs(lbs) >= mdl.infinity) or np.any(np.abs(ubs) >= mdl.infinity):
+        return None
+    return lbs, ubs
+
+
+def add_rules_bigm(mdl, alg, rules, var_index, times=None, first_id=0, encoding=None):
+    """
+    Encodes the rules with big-M constraints, using the same binary variables of add_rules_indicator:
+        x >= lb - (lb - x.lb) * (1 - z_IF) and x <= ub + (x.ub - ub) * (1 - z_IF)
+        z_THEN <= z_IF
+        |y - THEN expression| <= M * (1 - z_THEN)
+    The big-M values are derived from the variable bounds.
+
+    :param mdl: docplex model
+    :param alg: algorithm the rules refer to
+    :param rules: CompiledRules object
+    :param var_index: dict mapping the variable names to the model variables
+    :param times: optional dict where the time stamps of the encoding phases are stored
+    :param first_id: id of the first rule, used in the variable names
+    :param encoding: optional dict where the variables and constraints of each rule are appended (see add_logic_rules)
+
+    :return: tuple (list of the binary variable names, list of the THEN binary variables),
+        or None if some of the involved variables is unbounded
+    """
+    target_var = var_index[rules.target]
+    input_vars = [var_index[var_name] for var_name in rules.inputs]
+    bounds = _finite_bounds(mdl, input_vars + [target_var])
+    if bounds is None:
+        return None
+    x_lb, x_ub = bounds[0][:-1], bounds[1][:-1]
+    y_lb, y_ub = bounds[0][-1], bounds[1][-1]
+    if_rows, if_cols, if_pos, n_if, if_starts = _if_components(rules)
+
+    if_vars, then_vars, binary_vars_names = _add_rule_binaries(mdl, alg, rules, if_rows, if_pos, n_if,
+                                                               first_id=first_id)
+    if times is not None:
+        times[f'after_{alg}_rule_vars_time'] = time.time()
+
+    # IF statement (ranges that do not cut the variable domain need no constraint)
+    range_lb, range_ub = rules.lb[if_rows, if_cols], rules.ub[if_rows, if_cols]
+    m_lb = range_lb - x_lb[if_cols]
+    m_ub = x_ub[if_cols] - range_ub
+    range_cts = [input_vars[col] >= lb - m * (1 - z)
+                 for col, lb, m, z in zip(if_cols, range_lb, m_lb, if_vars) if m > 0]
+    range_cts += [input_vars[col] <= ub + m * (1 - z)
+                  for col, ub, m, z in zip(if_cols, range_ub, m_ub, if_vars) if m > 0]
+    range_cts = mdl.add_constraints(range_cts)
+
+    # Link between IF and THEN statements
+    link_cts = mdl.add_constraints([then_vars[i] <= z for i, z in zip(if_rows, if_vars)])
+
+    # THEN statement
+    then_cts = _then_bigm(mdl, rules, input_vars, target_var, then_vars, x_lb, x_ub, y_lb, y_ub)
+
+    if encoding is not None:
+        range_rows = np.concatenate([if_rows[m_lb > 0], if_rows[m_ub > 0], if_rows]).astype(int)
+        if_cts = _by_rule(len(rules), range_rows, list(range_cts) + list(link_cts))
+        _record_rules(encoding, _by_rule(len(rules), if_rows, if_vars), then_vars, if_cts, then_cts)
+
+    return binary_vars_names, then_vars
+
+
+def add_rules_piecewise(mdl, alg, rules, var_index, times=None):
+    """
+    Encodes 1-D rules, whose ranges are contiguous, as a piecewise linear function y == f(x).
+    The input domain is restricted to the union of the ranges, as in the other formulations.
+    NB: at a discontinuity, f can take the value of either adjacent rule, as in the indicator formulation.
+
+    :param mdl: docplex model
+    :param alg: algorithm the rules refer to
+    :param rules: CompiledRules object
+    :param var_index: dict mapping the variable names to the model variables
+    :param times: optional dict where the time stamps of the encoding phases are stored
+
+    :return: tuple (list of the binary variable names, list of the THEN binary variables), both empty,
+        or None if the rules are not representable
+    """
+    constrained = np.isfinite(rules.lb) | np.isfinite(rules.ub)
+    cols = np.flatnonzero(constrained.any(axis=0) | (rules.coef != 0).any(axis=0))
+    if len(rules) == 0 or len(cols) != 1 or not constrained[:, cols[0]].all():
+        return None
+    col = cols[0]
+
+    order = np.argsort(rules.lb[:, col], kind='stable')
+    lb, ub = rules.lb[order, col], rules.ub[order, col]
+    if not np.allclose(ub[:-1], lb[1:]) or np.any(ub < lb):
+        return None
+    f_lb = rules.intercept[order] + rules.coef[order, col] * lb
+    f_ub = rules.intercept[order] + rules.coef[order, col] * ub
+
+    breaks = []
+    for x_l, y_l, x_u, y_u in zip(lb, f_lb, ub, f_ub):
+        if not breaks or breaks[-1] != (x_l, y_l):
+            breaks.append((x_l, y_l))
+        breaks.append((x_u, y_u))
+
+    x = var_index[rules.inputs[col]]
+    x.lb = max(x.lb, lb[0])
+    x.ub = min(x.ub, ub[-1])
+    pwl = mdl.piecewise(0, [(float(bx), float(by)) for bx, by in breaks], 0, name=f"{alg}_LogRul_pwl")
+    if times is not None:
+        times[f'after_{alg}_rule_vars_time'] = time.time()
+    mdl.add_constraint(var_index[rules.target] == pwl(x))
+
+    return [], []
+
+
+def grid_intervals(rules, tol=1e-9):
+    """
+    Detects the grid structure of the rules: for each constrained input, the distinct ranges of the rules must be
+    disjoint (apart from their end points), as in the hypercubes of GridREx.
+
+    :param rules: CompiledRules object
+    :param tol: tolerance on the overlap of the ranges
+
+    :return: dict mapping each constrained input column to the tuple (interval lower bounds, interval upper bounds,
+        interval index of each rule, -1 if the rule does not constrain the input), or None if the rules are not
+        grid-structured
+    """
+    constrained = np.isfinite(rules.lb) | np.isfinite(rules.ub)
+    intervals = {}
+    for col in np.flatnonzero(constrained.any(axis=0)):
+        rows = np.flatnonzero(constrained[:, col])
+        pairs = np.stack([rules.lb[rows, col], rules.ub[rows, col]], axis=1)
+        # np.unique sorts the intervals by lower bound
+        uniq, inverse = np.unique(pairs, axis=0, return_inverse=True)
+        if np.any(uniq[1:, 0] < uniq[:-1, 1] - tol):
+            return None
+        idx = np.full(len(rules), -1)
+        idx[rows] = inverse.ravel()
+        intervals[col] = (uniq[:, 0], uniq[:, 1], idx)
+    return intervals
+
+
+def add_rules_grid(mdl, alg, rules, var_index, grid_encoding='unary', times=None):
+    """
+    Encodes grid-structured rules with one selection variable per (input, interval), shared by all the rules:
+        if z_I == 1 then the input lies in the interval (one z_I for each interval of each input)
+        z_THEN <= z_I for each interval of the rule
+        if z_THEN == 1 then the THEN equation holds
+    When every rule constrains every input, exactly one interval per input is selected and z_THEN is forced to 1 when
+    all its intervals are selected. In this case, grid_encoding='log' selects the K intervals of an input with
+    ceil(log2(K)) binary variables and continuous interval variables, and the range is enforced as
+    sum_k lb_k * z_I_k <= x <= sum_k ub_k * z_I_k.
+
+    :param mdl: docplex model
+    :param alg: algorithm the rules refer to
+    :param rules: CompiledRules object
+    :param var_index: dict mapping the variable names to the model variables
+    :param grid_encoding: 'unary' or 'log'
+    :param times: optional dict where the time stamps of the encoding phases are stored
+
+    :return: tuple (list of the binary variable names, list of the THEN binary variables),
+        or None if the rules are not grid-structured
+    """
+    assert grid_encoding in GRID_ENCODINGS, f"Unsupported grid encoding '{grid_encoding}', choose among {GRID_ENCODINGS}"
+    intervals = grid_intervals(rules)
+    if intervals is None:
+        return None
+    target_var = var_index[rules.target]
+    input_vars = [var_index[var_name] for var_name in rules.inputs]
+    n_if = (np.isfinite(rules.lb) | np.isfinite(rules.ub)).sum(axis=1)
+
+    then_names = [f"{alg}_LogRul_{i}_THEN_z{n_if[i]}" for i in range(len(rules))]
+    then_vars = mdl.binary_var_list(len(then_names), name=then_names)
+    binary_vars_names = list(then_names)
+
+    # Interval selection variables
+    selection = {}
+    full_grid = True
+    for col, (interval_lb, interval_ub, idx) in intervals.items():
+        x = input_vars[col]
+        n_intervals = len(interval_lb)
+        full = bool(np.all(idx >= 0))
+        full_grid = full_grid and full
+        names = [f"{alg}_Grid_{x.name}_I{k}" for k in range(n_intervals)]
+        if grid_encoding == 'log' and full:
+            n_bits = int(np.ceil(np.log2(n_intervals))) if n_intervals > 1 else 0
+            bit_names = [f"{alg}_Grid_{x.name}_w{b}" for b in range(n_bits)]
+            z = mdl.continuous_var_list(n_intervals, lb=0, ub=1, name=names)
+            bits = mdl.binary_var_list(n_bits, name=bit_names)
+            codes = np.arange(n_intervals)
+            cts = [mdl.sum(z) == 1]
+            cts += [mdl.sum(z[k] for k in np.flatnonzero((codes >> b) & 1)) == bits[b] for b in range(n_bits)]
+            cts += [x >= mdl.scal_prod(z, interval_lb), x <= mdl.scal_prod(z, interval_ub)]
+            mdl.add_constraints(cts)
+            binary_vars_names.extend(bit_names)
+        else:
+            z = mdl.binary_var_list(n_intervals, name=names)
+            mdl.add_indicators(z + z, [x >= lb for lb in interval_lb] + [x <= ub for ub in interval_ub])
+            if full:
+                mdl.add_constraint(mdl.sum(z) == 1)
+            binary_vars_names.extend(names)
+        selection[col] = (z, idx)
+    if times is not None:
+        times[f'after_{alg}_rule_vars_time'] = time.time()
+
+    # Link between the intervals and the THEN statements
+    link_cts = []
+    for z, idx in selection.values():
+        link_cts += [then_vars[i] <= z[idx[i]] for i in np.flatnonzero(idx >= 0)]
+    cells = np.stack([idx for _, idx in selection.values()], axis=1) if selection else np.zeros((len(rules), 0))
+    if full_grid and len(np.unique(cells, axis=0)) == len(rules):
+        # Each cell is a single rule: selecting all its intervals activates it
+        link_cts += [then_vars[i] >= mdl.sum(z[idx[i]] for z, idx in selection.values()) - (len(selection) - 1)
+                     for i in range(len(rules))]
+    mdl.add_constraints(link_cts)
+
+    # THEN statement
+    mdl.add_indicators(then_vars, [target_var == expr for expr in _then_expressions(mdl, rules, input_vars)])
+
+    return binary_vars_names, then_vars
+
+
+def add_logic_rules(mdl, alg, rules, var_index, formulation='indicator', grid_encoding='unary', times=None,
+                    encoding=None):
+    """
+    Encodes the rules of an algorithm with the desired formulation, falling back to indicator constraints when the
+    rules are not representable in it.
+
+    :param mdl: docplex model
+    :param alg: algorithm the rules refer to
+    :param rules: CompiledRules object
+    :param var_index: dict mapping the variable names to the model variables
+    :param formulation: 'indicator', 'bigm', 'piecewise' or 'grid'
+    :param grid_encoding: encoding of the interval selection for the 'grid' formulation, 'unary' or 'log'
+    :param times: optional dict where the time stamps of the encoding phases are stored
+    :param encoding: optional dict where the encoding is recorded, to patch the rules later (see patch_rules):
+        'formulation' and 'one_rule' (the constraint sum of z_THEN == 1) and, with PATCHABLE_FORMULATIONS, the lists
+        'if_vars', 'then_vars', 'if_cts' and 'then_cts' with the variables and constraints of each rule
+
+    :return: tuple (formulation actually used, list of the binary variable names, list of the THEN binary variables)
+    """
+    assert formulation in FORMULATIONS, f"Unsupported formulation '{formulation}', choose among {FORMULATIONS}"
+
+    encoded = None
+    if formulation == 'bigm':
+        encoded = add_rules_bigm(mdl, alg, rules, var_index, times=times, encoding=encoding)
+    elif formulation == 'piecewise':
+        encoded = add_rules_piecewise(mdl, alg, rules, var_index, times=times)
+    elif formulation == 'grid':
+        encoded = add_rules_grid(mdl, alg, rules, var_index, grid_encoding=grid_encoding, times=times)
+    if encoded is None:
+        formulation = 'indicator'
+        encoded = add_rules_indicator(mdl, alg, rules, var_index, times=times, encoding=encoding)
+
+    binary_vars_names, then_vars = encoded
+    # Only one of the logic rules must be true
+    one_rule = mdl.add_constraint(mdl.sum(then_vars) == 1) if then_vars else None
+    if encoding is not None:
+        encoding['formulation'] = formulation
+        encoding['one_rule'] = one_rule
+
+    return formulation, binary_vars_names, then_vars
+
+
+def patch_rules(mdl, alg, encoding, rules, var_index, removed=(), modified=(), added=()):
+    """
+    Patches the rules of an algorithm encoded with one of PATCHABLE_FORMULATIONS, touching only the changed rules
+    (docplex still scans its constraints once to remove the old ones):
+        * removed rules: their constraints are removed and their binary variables fixed to 0 (docplex cannot remove
+          variables), and their z_THEN is removed from the constraint sum of z_THEN == 1
+        * modified rules (same hypercube, new THEN expression): only their THEN constraints are replaced
+        * added rules: encoded as in the original formulation, with new ids, and their z_THEN added to the sum
+    The big-M values of the new constraints are derived from the current variable bounds.
+
+    :param mdl: docplex model
+    :param alg: algorithm the rules refer to
+    :param encoding: encoding of the rules, recorded by add_logic_rules
+    :param rules: CompiledRules object with the new rules, with the inputs of the encoded ones
+    :param var_index: dict mapping the variable names to the model variables
+    :param removed: ids of the removed rules
+    :param modified: pairs (id of the rule, index of its new version in rules)
+    :param added: indices of the added rules in rules
+
+    :return: tuple (ids of the added rules, list of the names of their binary variables)
+    """
+    formulation = encoding['formulation']
+    assert formulation in PATCHABLE_FORMULATIONS, f"Rules encoded as '{formulation}' cannot be patched"
+    target_var = var_index[rules.target]
+    input_vars = [var_index[var_name] for var_name in rules.inputs]
+    one_rule = encoding['one_rule']
+    then_vars = encoding['then_vars']
+
+    # Removed rules
+    removed_cts = []
+    for rule_id in removed:
+        removed_cts += encoding['if_cts'][rule_id] + encoding['then_cts'][rule_id]
+        for var in encoding['if_vars'][rule_id] + [then_vars[rule_id]]:
+            var.ub = 0
+        for key in ['if_vars', 'if_cts', 'then_cts']:
+            encoding[key][rule_id] = []
+
+    # Modified rules: new THEN constraints on the same z_THEN
+    modified = list(modified)
+    if modified:
+        ids = [rule_id for rule_id, _ in modified]
+        removed_cts += [ct for rule_id in ids for ct in encoding['then_cts'][rule_id]]
+        new_rules = rules.take([i for _, i in modified])
+        if formulation == 'indicator':
+            then_cts = _then_indicators(mdl, new_rules, input_vars, target_var, [then_vars[i] for i in ids])
+        else:
+            bounds = _finite_bounds(mdl, input_vars + [target_var])
+            if bounds is None:
+                raise ValueError(f'Big-M constraints of the rules of {alg} require finite bounds on their variables')
+            then_cts = _then_bigm(mdl, new_rules, input_vars, target_var, [then_vars[i] for i in ids],
+                                  bounds[0][:-1], bounds[1][:-1], bounds[0][-1], bounds[1][-1])
+        for rule_id, cts in zip(ids, then_cts):
+            encoding['then_cts'][rule_id] = cts
+    mdl.remove_constraints(removed_cts)
+
+    # Added rules, appended to the encoding
+    added = list(added)
+    first_id = len(then_vars)
+    binary_vars_names, new_then_vars = [], []
+    if added:
+        add_rules = add_rules_indicator if formulation == 'indicator' else add_rules_bigm
+        encoded = add_rules(mdl, alg, rules.take(added), var_index, first_id=first_id, encoding=encoding)
+        if encoded is None:
+            raise ValueError(f'Big-M constraints of the rules of {alg} require finite bounds on their variables')
+        binary_vars_names, new_then_vars = encoded
+
+    # Sum of z_THEN == 1, changed in a single update (each change of its expression is sent to the solver)
+    if one_rule is None:
+        if new_then_vars:
+            encoding['one_rule'] = mdl.add_constraint(mdl.sum(new_then_vars) == 1)
+    elif removed or new_then_vars:
+        one_rule.left_expr.add(mdl.sum(new_then_vars) - mdl.sum([then_vars[rule_id] for rule_id in removed]))
+    return list(range(first_id, first_id + len(added))), binary_vars_names
+
+
+def indicators_to_bigm(mdl):
+    """
+    Replaces the indicator constraints of the model with big-M constraints, for the solvers without indicators:
+        if z == 1 then expr <= rhs   becomes   expr <= rhs + (max(expr) - rhs) * (1 - z)
+        if z == 1 then expr >= rhs   becomes   expr >= rhs - (rhs - min(expr)) * (1 - z)
+    and equalities become both inequalities (z instead of 1 - z for the indicators active when z == 0). The big-M
+    values are derived from the variable bounds.
+
+    :param mdl: docplex model
+
+    :return: number of indicator constraints replaced
+
+    :raise ValueError: if the linear constraint of an indicator involves an unbounded variable
+    """
+    indicators = list(mdl.iter_indicator_constraints())
+    cts = []
+    for ind in indicators:
+        lc = ind.linear_constraint
+        coefs = list(lc.iter_net_linear_coefs())
+        dvars = [var for var, _ in coefs]
+        if _finite_bounds(mdl, dvars) is None:
+            raise ValueError(f'Big-M translation of {ind} requires finite bounds on its variables')
+        c = np.array([coef for _, coef in coefs], dtype=float)
+        lbs = np.array([var.lb for var in dvars], dtype=float)
+        ubs = np.array([var.ub for var in dvars], dtype=float)
+        expr_min = float(np.minimum(c * lbs, c * ubs).sum())
+        expr_max = float(np.maximum(c * lbs, c * ubs).sum())
+        rhs = lc.cplex_num_rhs()
+        expr = mdl.scal_prod(dvars, c)
+        z = ind.binary_var
+        # Zero when the indicator is active
+        off = (1 - z) if ind.active_value == 1 else z
+        if lc.sense.name in ['LE', 'EQ']:
+            cts.append(expr <= rhs + max(expr_max - rhs, 0) * off)
+        if lc.sense.name in ['GE', 'EQ']:
+            cts.append(expr >= rhs - max(rhs - expr_min, 0) * off)
+    mdl.remove_constraints(indicators)
+    mdl.add_constraints(cts)
+    return len(indicators)
+
+
+def add_product_var(mdl, y, b, name, linearization='mccormick'):
+    """
+    Adds a continuous variable w equal to the product y * b of a bounded continuous variable and a binary variable,
+    so that the product can be used in a linear objective. The product is linearized with
+        'mccormick': w >= y.lb * b, w <= y.ub * b, w <= y - y.lb * (1 - b), w >= y - y.ub * (1 - b)
+        'indicator': if b == 1 then w == y, if b == 0 then w == 0
+
+    :param mdl: docplex model
+    :param y: continuous variable
+    :param b: binary variable
+    :param name: name of the product variable
+    :param linearization: 'mccormick' or 'indicator'
+
+    :return: the product variable
+    """
+    assert linearization in LINEARIZATIONS, f"Unsupported linearization '{linearization}', choose among {LINEARIZATIONS}"
+    w = mdl.continuous_var(lb=min(y.lb, 0), ub=max(y.ub, 0), name=name)
+    if linearization == 'mccormick':
+        if abs(y.lb) >= mdl.infinity or abs(y.ub) >= mdl.infinity:
+            raise ValueError(f'McCormick linearization requires finite bounds on {y.name}')
+        mdl.add_constraints([w >= y.lb * b, w <= y.ub * b,
+                             w <= y - y.lb * (1 - b), w >= y - y.ub * (1 - b)])
+    else:
+        mdl.add_indicators([b, b], [w == y, w == 0], true_values=[1, 0])
+    return w
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 16 11:20:54 2026
+
+Per-phase timing, peak memory and solver statistics of the EML runs, written as one JSON-lines record per run.
+"""
+
+import contextlib
+import datetime
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows: the peak RSS is not recorded
+    resource = None
+
+
+class RunMetrics:
+    """
+    Durations of the phases of a run (e.g., bounds loading, variable creation, rule encoding, solve) and peak memory.
+    A RunMetrics object can be created before the bounds are loaded and passed to build_and_solve_EML, so that the
+    record of the run covers the whole pipeline.
+    """
+
+    def __init__(self, trace_memory=False):
+        """
+        :param trace_memory: if True, the peak of the Python allocations is traced with tracemalloc (this slows down
+            the allocations, so it is disabled by default). The peak RSS of the process is always recorded
+        """
+        self.phases = {}
+        self._own_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self._own_tracing:
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Context manager adding the duration of its body to the phase name.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def add_phase(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.) + seconds
+
+    def memory(self):
+        """
+        Returns the peak memory of the process (MB): RSS and, if traced, Python allocations.
+        """
+        memory = {}
+        if resource is not None:
+            peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is in bytes on macOS and in KB elsewhere
+            memory['peak_rss_mb'] = peak_rss / (1 << 20) if sys.platform == 'darwin' else peak_rss / (1 << 10)
+        if tracemalloc.is_tracing():
+            memory['peak_traced_mb'] = tracemalloc.get_traced_memory()[1] / (1 << 20)
+        return memory
+
+    def stop(self):
+        """
+        Stops tracemalloc, if it was started by this object.
+        """
+        if self._own_tracing:
+            tracemalloc.stop()
+            self._own_tracing = False
+
+
+def _finite_or_none(x):
+    try:
+        x = float(x)
+    except (TypeError, ValueError):
+        return None
+    return x if math.isfinite(x) else None
+
+
+def solver_statistics(solve_details, sol):
+    """
+    Returns the details of the last solve: status, time, nodes, iterations, MIP gap, best bound and objective value.
+
+    :param solve_details: solve details of a docplex model, or utils.model_io.SolveDetails
+    :param sol: solution, or None if no solution was found
+    """
+    if solve_details is None:
+        return {}
+    return {'status': str(solve_details.status),
+            'time': _finite_or_none(solve_details.time),
+            'nodes': getattr(solve_details, 'nb_nodes_processed', None),
+            'iterations': getattr(solve_details, 'nb_iterations', None),
+            'mip_gap': _finite_or_none(getattr(solve_details, 'mip_relative_gap', None)),
+            'best_bound': _finite_or_none(getattr(solve_details, 'best_bound', None)),
+            'objective_value': None if sol is None else _finite_or_none(sol.objective_value)}
+
+
+def make_run_record(model_name, model_key, options, objective, user_constraints, metrics, statistics,
+                    solve_details, sol, variables):
+    """
+    Returns the record of a run.
+
+    :param model_name: name of the model
+    :param model_key: hash of the inputs of the base model (see utils.model_io.snapshot_key), identifying the model
+        version across runs
+    :param options: dict of the formulation options
+    :param objective: objective string (e.g., 'min(sol(keuro))')
+    :param user_constraints: dict {'variable': [...], 'type': [...], 'value': [...]}
+    :param metrics: RunMetrics of the run
+    :param statistics: size of the model (see EMLSession.statistics)
+    :param solve_details: solve details of the last solve
+    :param sol: solution, or None if no solution was found
+    :param variables: names of the variables whose value is recorded
+
+    :return: dict
+    """
+    return {'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'model_name': model_name,
+            'model_key': model_key,
+            'options': options,
+            'objective': objective,
+            'constraints': [f'{var_name}{cstr_type}{v}' for var_name, cstr_type, v in
+                            zip(user_constraints['variable'], user_constraints['type'], user_constraints['value'])],
+            'phases': metrics.phases,
+            'memory': metrics.memory(),
+            'model': statistics,
+            'solver': solver_statistics(solve_details, sol),
+            'solution': None if sol is None else {str(var): _finite_or_none(sol[var]) for var in variables}}
+
+
+def write_run_record(record, path):
+    """
+    Appends a record to a JSON-lines file.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(record) + '\n')
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 15 09:41:27 2026
+
+Export of the EML models and on-disk snapshots of the base model, reloaded directly into CPLEX.
+"""
+
+import collections
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils.rule_sets import as_compiled_rules
+
+# Supported formats of the model export
+EXPORT_FORMATS = ['sav', 'lp', 'mps']
+
+# Bump when the content of the snapshots changes, so that stale snapshots are ignored
+SNAPSHOT_VERSION = 2
+
+# Exports run one at a time in a background thread, so that they never delay the solve
+_export_executor = None
+
+
+def get_export_executor():
+    """
+    Returns the executor running the background exports.
+    """
+    global _export_executor
+    if _export_executor is None:
+        _export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='eml_export')
+    return _export_executor
+
+
+def _finalize_export(tmp_path, path, compress):
+    """
+    Moves the temporary file tmp_path to path, compressing it with gzip if required.
+
+    :return: path of the written file
+    """
+    if compress:
+        path = f'{path}.gz'
+        gz_tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'rb') as f_in, gzip.open(gz_tmp_path, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(tmp_path)
+        tmp_path = gz_tmp_path
+    os.replace(tmp_path, path)
+    return path
+
+
+def copy_cplex(cpx_model):
+    """
+    Returns a copy of a cplex.Cplex object, with its output streams silenced (e.g., the warning about the default
+    names of the indicator constraints printed by the LP and MPS writers).
+    """
+    import cplex
+
+    cpx_copy = cplex.Cplex(cpx_model)
+    cpx_copy.set_results_stream(None)
+    cpx_copy.set_log_stream(None)
+    cpx_copy.set_warning_stream(None)
+    return cpx_copy
+
+
+def write_model(cpx_copy, path, fmt, compress):
+    """
+    Writes a copy of the model (see copy_cplex) to path in the desired format, and releases the copy. The copy is
+    written with the native CPLEX writers, so that the model being solved is never touched.
+
+    :return: path of the written file
+    """
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        cpx_copy.write(tmp_path, fmt)
+    finally:
+        cpx_copy.end()
+    return _finalize_export(tmp_path, path, compress)
+
+
+def _model_header(algs, inst_descr, ml_trgt, enable_var_type, formulation, grid_encoding):
+    """
+    Returns the options of the model hashed by snapshot_key and profile_key.
+    """
+    return {'version': SNAPSHOT_VERSION,
+            'inst_descr': list(inst_descr),
+            'ml_trgt': list(ml_trgt),
+            'enable_var_type': bool(enable_var_type),
+            'formulation': formulation,
+            'grid_encoding': grid_encoding,
+            'algs': [(alg,
+                      [(p['name'], p['type'].__name__) for p in algs[alg]['alg_params'].values()],
+                      list(algs[alg]['ml_model'].keys())[0])
+                     for alg in algs]}
+
+
+def _hash_rules(key, logic_constraints, algs):
+    """
+    Adds the logic rules of the ML model used for each algorithm to the hash key.
+    """
+    for alg in algs:
+        model = list(algs[alg]['ml_model'].keys())[0]
+        rules = as_compiled_rules(logic_constraints[alg][model])
+        key.update(json.dumps([rules.target] + rules.inputs).encode())
+        for array in [rules.lb, rules.ub, rules.intercept, rules.coef]:
+            key.update(np.ascontiguousarray(array).tobytes())
+
+
+def snapshot_key(df_mins, df_maxs, logic_constraints, algs, inst_descr, ml_trgt, enable_var_type,
+                 formulation, grid_encoding):
+    """
+    Returns the hash of everything the base model depends on, i.e., the arguments of EMLSession except the model name
+    and the objective linearization (which only affects the objective).
+
+    :return: hexadecimal string
+    """
+    key = hashlib.sha256()
+    header = _model_header(algs=algs, inst_descr=inst_descr, ml_trgt=ml_trgt, enable_var_type=enable_var_type,
+                           formulation=formulation, grid_encoding=grid_encoding)
+    key.update(json.dumps(header).encode())
+
+    # Bounds of the variables
+    for name in list(algs) + ['glob']:
+        for bounds in [df_mins[name], df_maxs[name]]:
+            key.update(json.dumps([name] + [str(label) for label in bounds.index]).encode())
+            key.update(np.asarray(bounds, dtype=float).tobytes())
+
+    _hash_rules(key, logic_constraints=logic_constraints, algs=algs)
+    return key.hexdigest()
+
+
+def rules_key(logic_constraints, algs, inst_descr, ml_trgt, enable_var_type, formulation, grid_encoding):
+    """
+    Returns the key of the tuned solver profiles of a model (see utils.solver_params): the hash of the rules and of the
+    options of the model, without the bounds. It is meant to be computed on the rules before the presolve, which
+    depends on the user constraints, so that the same profile serves the queries with any user constraints.
+
+    :return: hexadecimal string
+    """
+    key = hashlib.sha256()
+    header = _model_header(algs=algs, inst_descr=inst_descr, ml_trgt=ml_trgt, enable_var_type=enable_var_type,
+                           formulation=formulation, grid_encoding=grid_encoding)
+    key.update(json.dumps(dict(header, key='profile')).encode())
+    _hash_rules(key, logic_constraints=logic_constraints, algs=algs)
+    return key.hexdigest()
+
+
+def save_snapshot(session, key, snapshot_dir):
+    """
+    Saves the base model of an EMLSession (before any user constraint or objective is added) as
+    {snapshot_dir}/{key}.sav, together with the metadata {snapshot_dir}/{key}.json needed to reload it.
+
+    :return: path of the snapshot
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    path = os.path.join(snapshot_dir, key)
+    # No solve is running at this point, so the engine of the model can write the file directly
+    tmp_path = f'{path}.sav.{os.getpid()}.tmp'
+    session.model.get_cplex().write(tmp_path, 'sav')
+    os.replace(tmp_path, f'{path}.sav')
+
+    meta = {'version': SNAPSHOT_VERSION,
+            'DT_vars': session.DT_vars,
+            'DT_vars_int': session.DT_vars_int,
+            'binary_vars_names': session.binary_vars_names,
+            'logicRules_vars': session.logicRules_vars,
+            'build_sizes': session.build_sizes}
+    # The metadata is written last: a snapshot is complete only when its metadata exists
+    tmp_path = f'{path}.json.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, f'{path}.json')
+    return f'{path}.sav'
+
+
+def load_snapshot(key, snapshot_dir):
+    """
+    Looks for the snapshot of a base model saved by save_snapshot. The model itself is read directly into CPLEX by
+    EMLSession (see utils.backends.CplexModel).
+
+    :return: tuple (path of the snapshot, metadata), or None if there is no snapshot for key
+    """
+    path = os.path.join(snapshot_dir, key)
+    if not os.path.exists(f'{path}.json'):
+        return None
+    with open(f'{path}.json') as f:
+        meta = json.load(f)
+    if meta['version'] != SNAPSHOT_VERSION:
+        return None
+    return f'{path}.sav', meta
+
+
+# Same attribute names as the docplex solve details
+SolveDetails = collections.namedtuple('SolveDetails', ['status', 'time', 'nb_nodes_processed', 'nb_iterations',
+                                                       'mip_relative_gap', 'best_bound'])
+
+
+class SnapshotSolution:
+    """
+    Solution of a solve not run through docplex (a model reloaded from a snapshot, the HiGHS backend or the
+    enumeration), indexed by variable name like a docplex solution.
+    """
+
+    def __init__(self, values, objective_value, solve_details):
+        self._values = values
+        self.objective_value = objective_value
+        self.solve_details = solve_details
+
+    def __getitem__(self, var):
+        return self._values[getattr(var, 'name', var)]
+
+    def get_value(self, var):
+        return self[var]
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:32:19 2026
+
+Pareto front between two ML targets by epsilon-constraint sweeps on a single model.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import const_define as cd
+from utils.build_model_symbolic import open_session, prepare_snapshot
+from utils.util_functions import print_log, setup_logging
+
+
+def _sweep_point(session, sol, epsilon, ml_trgt):
+    """
+    Returns the record of a point of the sweep: the value of epsilon, followed by the record of the solution (see
+    SessionBase.solution_point).
+    """
+    return {'epsilon': float(epsilon), **session.solution_point(sol, ml_trgt)}
+
+
+def sweep(session, objective_type, objective_var, sweep_var, values, sweep_type='<=', ml_trgt=cd.ML_TARGETS,
+          time_limit=20000):
+    """
+    Epsilon-constraint sweep on a session (EMLSession or EnumerationSession): the user constraint
+    'sweep_var sweep_type epsilon' is added once, and only its right-hand side changes between the points. The values
+    are solved from the tightest to the loosest, so the solution of each point is feasible for the next one and warm
+    starts it.
+
+    :param session: session with the base model and the other user constraints
+    :param objective_type: 'min' or 'max'
+    :param objective_var: ML target to optimize
+    :param sweep_var: ML target bounded by the sweep constraint
+    :param values: right-hand sides of the sweep constraint
+    :param sweep_type: '<=' (sweep_var is minimized along the front) or '>='
+    :param ml_trgt: list of the ML targets
+    :param time_limit: time limit of each solve (sec)
+
+    :return: list with one dict per value (see _sweep_point), in the order of the sweep
+    """
+    assert sweep_type in ['<=', '>='], f"Unsupported sweep constraint type '{sweep_type}'"
+    order = sorted(values, reverse=sweep_type == '>=')
+    if not order:
+        return []
+    session.set_objective(objective_type, objective_var)
+    handle = session.add_user_constraint(sweep_var, sweep_type, order[0])
+    points = []
+    try:
+        for epsilon in order:
+            session.update_user_constraint(handle, epsilon)
+            sol = session.solve(time_limit=time_limit)
+            points.append(_sweep_point(session, sol, epsilon, ml_trgt))
+    finally:
+        session.remove_user_constraint(handle)
+    return points
+
+
+def pareto_front(points, objective_type, objective_var, sweep_var, sweep_type='<='):
+    """
+    Returns the non-dominated points of a sweep, with respect to objective_var (minimized or maximized, according to
+    objective_type) and sweep_var (minimized if sweep_type is '<=', maximized otherwise) of the chosen algorithm.
+    Of equal points, only the first one is kept.
+
+    :return: list of the non-dominated points, sorted by sweep_var
+    """
+    solved = [point for point in points if point['algorithm'] is not None]
+    if not solved:
+        return []
+    signs = np.array([1. if objective_type == 'min' else -1., 1. if sweep_type == '<=' else -1.])
+    z = np.array([[point['targets'][objective_var], point['targets'][sweep_var]] for point in solved]) * signs
+    # dominated[i, j]: point j dominates point i (or equals it and comes first)
+    no_worse = np.all(z[None, :, :] <= z[:, None, :], axis=2)
+    better = np.any(z[None, :, :] < z[:, None, :], axis=2)
+    equal_first = np.all(z[None, :, :] == z[:, None, :], axis=2) & np.tri(len(z), k=-1, dtype=bool)
+    dominated = np.any((no_worse & better) | equal_first, axis=1)
+    front = [point for point, d in zip(solved, dominated) if not d]
+    return sorted(front, key=lambda point: point['targets'][sweep_var])
+
+
+def _sweep_worker(session_kwargs, user_constraints, objective_type, objective_var, sweep_var, values, sweep_type,
+                  time_limit, log_level):
+    """
+    Sweeps a part of the values in a worker process, on its own session.
+    """
+    setup_logging(level=log_level, log_file=os.devnull)
+    session = open_session(**session_kwargs)
+    session.set_user_constraints(user_constraints)
+    return sweep(session, objective_type, objective_var, sweep_var, values, sweep_type=sweep_type,
+                 ml_trgt=session_kwargs['ml_trgt'], time_limit=time_limit)
+
+
+def pareto_sweep(df_mins, df_maxs, user_constraints, logic_constraints, objective_type, objective_var, sweep_var,
+                 sweep_type='<=', values=None, n_points=10, n_workers=1, enable_var_type=False, inst_descr=None,
+                 ml_trgt=None, algs=None, formulation='indicator', grid_encoding='unary',
+                 objective_linearization='mccormick', backend='cplex', snapshot_dir=cd.SNAPSHOT_DIR,
+                 time_limit=20000, log_level='quiet', solver_profile=None):
+    """
+    Computes the Pareto front between objective_var and sweep_var by an epsilon-constraint sweep on sweep_var. The
+    model is built once (per worker), and only the right-hand side of the sweep constraint changes between points.
+
+    :param sweep_var: ML target bounded by the sweep constraint (e.g., 'time(sec)')
+    :param sweep_type: '<=' or '>=' (see sweep)
+    :param values: right-hand sides of the sweep constraint; if None, n_points values spanning the bounds of
+        y_{alg}_{sweep_var} over the algorithms
+    :param n_points: number of points of the sweep when values is None
+    :param n_workers: number of worker processes; the sweep range is split in n_workers contiguous parts, each one
+        swept by a worker on its own session (reloaded from the snapshot of the base model, saved by this process)
+    :param log_level: log level of the worker processes
+    The other parameters are those of build_and_solve_EML.
+
+    :return: list of the non-dominated points (see pareto_front)
+    """
+    if values is None:
+        lb = min(float(df_mins[alg].loc[sweep_var]) for alg in algs)
+        ub = max(float(df_maxs[alg].loc[sweep_var]) for alg in algs)
+        values = np.linspace(lb, ub, n_points)
+    order = sorted(float(v) for v in values)
+    if sweep_type == '>=':
+        order = order[::-1]
+    session_kwargs = dict(df_mins=df_mins, df_maxs=df_maxs, logic_constraints=logic_constraints,
+                          enable_var_type=enable_var_type, inst_descr=inst_descr, ml_trgt=ml_trgt, algs=algs,
+                          formulation=formulation, grid_encoding=grid_encoding,
+                          objective_linearization=objective_linearization, backend=backend,
+                          snapshot_dir=snapshot_dir, solver_profile=solver_profile)
+
+    print_log(f'\n=== Sweeping {objective_type}({objective_var}) with {sweep_var} {sweep_type} epsilon, '
+              f'{len(order)} points')
+    start = time.perf_counter()
+    if n_workers <= 1:
+        session = open_session(**session_kwargs)
+        session.set_user_constraints(user_constraints)
+        points = sweep(session, objective_type, objective_var, sweep_var, order, sweep_type=sweep_type,
+                       ml_trgt=ml_trgt, time_limit=time_limit)
+    else:
+        session_kwargs = prepare_snapshot(session_kwargs)
+        parts = [list(part) for part in np.array_split(order, n_workers) if len(part)]
+        with ProcessPoolExecutor(max_workers=len(parts)) as executor:
+            futures = [executor.submit(_sweep_worker, session_kwargs, user_constraints, objective_type, objective_var,
+                                       sweep_var, part, sweep_type, time_limit, log_level) for part in parts]
+            points = [point for future in futures for point in future.result()]
+
+    front = pareto_front(points, objective_type, objective_var, sweep_var, sweep_type=sweep_type)
+    print_log(f'{len(points)} points solved in {time.perf_counter() - start:.2f} sec, {len(front)} non-dominated')
+    for point in front:
+        print_log(f"\t* {sweep_var} = {point['targets'][sweep_var]}, {objective_var} = "
+                  f"{point['targets'][objective_var]} ({point['algorithm']})")
+    return front
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 15:12:40 2026
+
+Presolve of the logic rules: pruning of the rules that cannot be active and tightening of the variable bounds.
+"""
+
+import numpy as np
+
+from utils.rule_sets import as_compiled_rules
+from utils.util_functions import print_log
+
+
+def rule_images(rules, lbs, ubs):
+    """
+    Returns the range of the THEN expression of each rule over its hypercube, intersected with the bounds of the
+    inputs. Since the expressions are linear, the extremes are attained at the corners of the hypercubes and are
+    computed by interval arithmetic, one input at a time.
+
+    :param rules: CompiledRules object
+    :param lbs: lower bounds of rules.inputs
+    :param ubs: upper bounds of rules.inputs
+
+    :return: tuple (minimum of each rule, maximum of each rule, boolean mask of the rules with an empty hypercube)
+    """
+    lo = np.maximum(rules.lb, lbs)
+    hi = np.minimum(rules.ub, ubs)
+    empty = np.any(lo > hi, axis=1)
+    coef = rules.coef
+    # 0 * inf is 0: inputs with a null coefficient do not contribute, even if unbounded
+    with np.errstate(invalid='ignore'):
+        term_lo = np.where(coef == 0, 0., np.where(coef > 0, coef * lo, coef * hi))
+        term_hi = np.where(coef == 0, 0., np.where(coef > 0, coef * hi, coef * lo))
+    return rules.intercept + term_lo.sum(axis=1), rules.intercept + term_hi.sum(axis=1), empty
+
+
+def _bounds_key(var_name, algs, ml_trgt):
+    """
+    Returns the entry of df_mins/df_maxs holding the bounds of a model variable, i.e., (alg, var) for the ML targets
+    'y_{alg}_{var}' and ('glob', var) for the other variables 'y_{var}'.
+    """
+    for alg in algs:
+        if var_name[2:].startswith(f'{alg}_') and var_name[len(alg) + 3:] in ml_trgt:
+            return alg, var_name[len(alg) + 3:]
+    return 'glob', var_name[2:]
+
+
+def presolve(df_mins, df_maxs, logic_constraints, user_constraints, algs, ml_trgt, max_rounds=10, tol=1e-9):
+    """
+    Prunes the rules that cannot be active under the user constraints and tightens the variable bounds, before the
+    model is built. In the model, exactly one rule of each algorithm is active whichever algorithm is chosen, and the
+    user constraints '<=' and '>=' hold for every algorithm (see EMLSession.add_user_constraint), so:
+        * a user constraint 'var <= v' ('>= v') caps (raises) the upper (lower) bound of y_{alg}_{var}; with
+          'var == v' and v != 0 the algorithm must be chosen, so y_{alg}_{var} is fixed to v
+        * a rule whose hypercube misses the bounds of its inputs, or whose THEN range misses the bounds of its target,
+          is dropped
+        * the bounds of the target and of the inputs are tightened to the union of the THEN ranges and of the
+          hypercubes of the remaining rules
+    The last two steps are repeated until no bound changes, or for max_rounds rounds.
+
+    :param df_mins: dict with the lower bounds of the problem variables (see load_var_intervals)
+    :param df_maxs: dict with the upper bounds of the problem variables (see load_var_intervals)
+    :param logic_constraints: dict with the logic rules of each algorithm and ml model (see define_logic_rules)
+    :param user_constraints: dict {'variable': [...], 'type': [...], 'value': [...]}
+    :param algs: dict with the information of the algorithms and ml models (see define_algs_dict)
+    :param ml_trgt: list of the ML targets
+    :param max_rounds: maximum number of pruning and tightening rounds
+    :param tol: tolerance on the comparisons
+
+    :return: tuple (df_mins, df_maxs, logic_constraints, report); the inputs are not modified. The report maps each
+        algorithm to the number of rules before and after the presolve, and 'bounds' to the tightened bounds
+    """
+    df_mins = {key: bounds.copy() for key, bounds in df_mins.items()}
+    df_maxs = {key: bounds.copy() for key, bounds in df_maxs.items()}
+    logic_constraints = {alg: dict(models) for alg, models in logic_constraints.items()}
+    original_bounds = {}
+
+    def get_bounds(var_name):
+        key, label = _bounds_key(var_name, algs, ml_trgt)
+        return float(df_mins[key].loc[label]), float(df_maxs[key].loc[label])
+
+    def set_bounds(var_name, lb, ub):
+        old_lb, old_ub = get_bounds(var_name)
+        lb, ub = max(lb, old_lb), min(ub, old_ub)
+        if lb > ub + tol:
+            print_log(f'Presolve: empty domain for {var_name} ({lb} > {ub}), bounds left unchanged', level='warning')
+            return False
+        if lb <= old_lb + tol and ub >= old_ub - tol:
+            return False
+        original_bounds.setdefault(var_name, (old_lb, old_ub))
+        key, label = _bounds_key(var_name, algs, ml_trgt)
+        df_mins[key].loc[label], df_maxs[key].loc[label] = lb, ub
+        return True
+
+    # Bounds implied by the user constraints
+    for var_name, cstr_type, v in zip(user_constraints['variable'], user_constraints['type'],
+                                      user_constraints['value']):
+        for alg in algs.keys():
+            if cstr_type == '<=':
+                set_bounds(f'y_{alg}_{var_name}', -np.inf, v)
+            elif cstr_type == '>=':
+                set_bounds(f'y_{alg}_{var_name}', v, np.inf)
+            elif cstr_type == '==' and v != 0:
+                set_bounds(f'y_{alg}_{var_name}', v, v)
+
+    rules_count = {}
+    infeasible = set()
+    for _ in range(max_rounds):
+        changed = False
+        for alg in algs.keys():
+            model = list(algs[alg]['ml_model'].keys())[0]
+            rules = as_compiled_rules(logic_constraints[alg][model])
+            rules_count.setdefault(alg, len(rules))
+            if alg in infeasible or len(rules) == 0:
+                continue
+
+            input_bounds = np.array([get_bounds(var_name) for var_name in rules.inputs]).reshape(-1, 2)
+            lbs, ubs = input_bounds[:, 0], input_bounds[:, 1]
+            target_lb, target_ub = get_bounds(rules.target)
+            y_min, y_max, empty = rule_images(rules, lbs - tol, ubs + tol)
+            keep = ~empty & (y_max >= target_lb - tol) & (y_min <= target_ub + tol)
+            if not keep.any():
+                # The model is infeasible: keep the rules, so that the solver reports it
+                print_log(f'Presolve: no rule of {alg} is compatible with the bounds, rules left unchanged',
+                          level='warning')
+                infeasible.add(alg)
+                continue
+            if not keep.all():
+                rules = rules.take(keep)
+                logic_constraints[alg][model] = rules
+                y_min, y_max = y_min[keep], y_max[keep]
+                changed = True
+
+            changed |= set_bounds(rules.target, float(y_min.min()), float(y_max.max()))
+            lo = np.maximum(rules.lb, lbs)
+            hi = np.minimum(rules.ub, ubs)
+            for j, var_name in enumerate(rules.inputs):
+                changed |= set_bounds(var_name, float(lo[:, j].min()), float(hi[:, j].max()))
+        if not changed:
+            break
+
+    report = {alg: (rules_count[alg], len(as_compiled_rules(logic_constraints[alg][list(algs[alg]['ml_model'])[0]])))
+              for alg in algs.keys()}
+    report['bounds'] = {var_name: (old, get_bounds(var_name)) for var_name, old in original_bounds.items()}
+
+    for alg in algs.keys():
+        print_log(f'Presolve: {alg} rules {report[alg][0]} -> {report[alg][1]}')
+    for var_name, (old, new) in report['bounds'].items():
+        print_log(f'\t* {var_name}: [{old[0]}, {old[1]}] -> [{new[0]}, {new[1]}]', level='debug')
+
+    return df_mins, df_maxs, logic_constraints, report
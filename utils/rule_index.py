@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:05:44 2026
+
+Vectorized evaluation of the GridREx rules as a predictor, without building a model.
+"""
+
+import numpy as np
+
+from utils.formulations import grid_intervals
+from utils.rule_sets import as_compiled_rules
+
+# Number of rows located at once, to bound the memory of the intermediate arrays
+LOCATE_CHUNK_ROWS = 1 << 16
+# Maximum number of rules in a leaf, and maximum depth, of the interval tree of irregular rule sets
+INDEX_LEAF_RULES = 4
+INDEX_MAX_DEPTH = 64
+
+
+class RuleIndex:
+    """
+    Index of the hypercubes of a CompiledRules object, locating the rule whose hypercube contains each point.
+        * 'grid': when the rules form a grid (see utils.formulations.grid_intervals), the interval of each input is
+          found by np.searchsorted on its sorted cut points, and the rule by the key of its cell
+        * 'interval': otherwise, a k-d interval tree splits the hypercubes at the end points of their ranges; a point
+          descends the tree and is checked against the few rules of its leaf only
+    NB: on a face shared by two hypercubes, either adjacent rule can be returned, as in the MIP model.
+    """
+
+    def __init__(self, rules, tol=1e-9):
+        """
+        :param rules: CompiledRules object (or list of rule dicts)
+        :param tol: tolerance on the ranges
+        """
+        self.rules = as_compiled_rules(rules)
+        self.tol = tol
+        self.kind = 'grid' if self._build_grid() else 'interval'
+        if self.kind == 'interval':
+            self._build_interval_index()
+
+    def _build_grid(self):
+        """
+        Builds the grid index: sorted interval bounds of each constrained input and sorted cell keys of the rules.
+
+        :return: False if the rules are not a grid with one rule per cell
+        """
+        rules = self.rules
+        intervals = grid_intervals(rules, tol=self.tol)
+        if not intervals or len(rules) == 0 or any(np.any(idx < 0) for _, _, idx in intervals.values()):
+            return False
+        shape = [len(interval_lb) for interval_lb, _, _ in intervals.values()]
+        if np.prod(np.array(shape, dtype=float)) >= 2 ** 62:
+            return False
+        keys = np.ravel_multi_index([idx for _, _, idx in intervals.values()], shape)
+        order = np.argsort(keys, kind='stable')
+        if np.any(np.diff(keys[order]) == 0):
+            return False
+        self._grid = [(col, interval_lb, interval_ub) for col, (interval_lb, interval_ub, _) in intervals.items()]
+        self._grid_shape = shape
+        self._grid_keys = keys[order]
+        self._grid_rules = order
+        return True
+
+    def _build_interval_index(self):
+        """
+        Builds a k-d interval tree on the hypercubes: each node splits its rules at a cut point of an input, the rules
+        whose range contains the cut point going to both children, until a leaf has at most INDEX_LEAF_RULES rules or
+        no cut separates them. The nodes are stored in arrays, and the rules of the leaves in CSR format.
+        """
+        rules = self.rules
+        dims, cuts, children, leaves = [], [], [], []
+        # Stack of (rules of the node, region of the node, depth, parent node, side of the node in the parent)
+        n_inputs = len(rules.inputs)
+        stack = [(np.arange(len(rules)), np.full(n_inputs, -np.inf), np.full(n_inputs, np.inf), 0, -1, 0)]
+        while stack:
+            ids, region_lb, region_ub, depth, parent, side = stack.pop()
+            node = len(dims)
+            if parent >= 0:
+                children[parent][side] = node
+            split = None
+            if len(ids) > INDEX_LEAF_RULES and depth < INDEX_MAX_DEPTH:
+                for col in range(n_inputs):
+                    lb, ub = rules.lb[ids, col], rules.ub[ids, col]
+                    # Cut points strictly inside the region of the node
+                    points = np.unique(np.concatenate([lb, ub]))
+                    points = points[(points > region_lb[col]) & (points < region_ub[col])]
+                    if len(points) == 0:
+                        continue
+                    cut = points[len(points) // 2]
+                    # Points x <= cut go left, the other ones go right. The rules ending at the cut go left only, so
+                    # that adjacent hypercubes are separated (points within tol beyond the cut are then not matched
+                    # to them, but to the adjacent rule)
+                    go_left = lb <= cut
+                    go_right = ub > cut
+                    size = max(go_left.sum(), go_right.sum())
+                    if size < len(ids) and (split is None or size < split[0]):
+                        split = (size, col, cut, ids[go_left], ids[go_right])
+            if split is None:
+                dims.append(-1)
+                cuts.append(0.)
+                children.append([-1, -1])
+                leaves.append((node, np.sort(ids)))
+                continue
+            _, col, cut, left_ids, right_ids = split
+            dims.append(col)
+            cuts.append(cut)
+            children.append([-1, -1])
+            left_ub, right_lb = region_ub.copy(), region_lb.copy()
+            left_ub[col], right_lb[col] = cut, cut
+            stack.append((right_ids, right_lb, region_ub, depth + 1, node, 1))
+            stack.append((left_ids, region_lb, left_ub, depth + 1, node, 0))
+
+        self._dims = np.array(dims, dtype=int)
+        self._cuts = np.array(cuts, dtype=float)
+        self._children = np.array(children, dtype=int).reshape(-1, 2)
+        counts = np.zeros(len(dims), dtype=int)
+        counts[[node for node, _ in leaves]] = [len(ids) for _, ids in leaves]
+        self._offsets = np.concatenate([[0], np.cumsum(counts)])
+        candidates = np.zeros(counts.sum(), dtype=int)
+        for node, ids in leaves:
+            candidates[self._offsets[node]:self._offsets[node + 1]] = ids
+        self._candidates = candidates
+
+    def as_matrix(self, X):
+        """
+        Returns the points as a float matrix with one column per input of the rules. X is either an array with the
+        columns in the order of rules.inputs, or a mapping (e.g., a pd.DataFrame) from the input names to the columns;
+        the names can omit the 'y_' prefix of the model variables (e.g., 'nScenarios' for 'y_nScenarios').
+        """
+        if hasattr(X, 'keys'):
+            columns = [X[var_name] if var_name in X else X[var_name[2:]] for var_name in self.rules.inputs]
+            return np.column_stack([np.asarray(column, dtype=float) for column in columns])
+        X = np.asarray(X, dtype=float)
+        return X.reshape(-1, len(self.rules.inputs))
+
+    def _locate_grid(self, X):
+        # Intervals of each input containing each point: the last one starting before it and the first one ending after
+        # it, which differ on the end point shared by two intervals
+        lows, highs = [], []
+        inside = np.ones(len(X), dtype=bool)
+        for col, interval_lb, interval_ub in self._grid:
+            x = X[:, col]
+            high = np.searchsorted(interval_lb - self.tol, x, side='right') - 1
+            low = np.searchsorted(interval_ub + self.tol, x, side='left')
+            inside &= (high >= 0) & (low <= high)
+            lows.append(low)
+            highs.append(np.maximum(high, 0))
+        lows, highs = np.array(lows).reshape(-1, len(X)), np.array(highs).reshape(-1, len(X))
+        located = np.where(inside, self._find_cells(highs), -1)
+
+        # On a face shared by two cells, the upper cell can be missing (e.g., a rule dropped by the presolve): the
+        # other cells of the point are tried, one pair (point, cell) per combination of its intervals
+        points = np.flatnonzero(inside & (located < 0) & np.any(lows < highs, axis=0))
+        if len(points):
+            cells = highs[:, points]
+            for d in range(len(self._grid)):
+                shared = lows[d, points] < highs[d, points]
+                lower = cells[:, shared]
+                lower[d] = lows[d, points[shared]]
+                points = np.concatenate([points, points[shared]])
+                cells = np.concatenate([cells, lower], axis=1)
+            found = self._find_cells(cells)
+            match = found >= 0
+            # Reversed, so that the first matching cell of each point is written last
+            located[points[match][::-1]] = found[match][::-1]
+        return located
+
+    def _find_cells(self, cells):
+        """
+        Returns the index of the rule of each grid cell (one column of interval indices per cell), -1 if no rule covers
+        the cell.
+        """
+        keys = np.ravel_multi_index(cells, self._grid_shape)
+        pos = np.minimum(np.searchsorted(self._grid_keys, keys), len(self._grid_keys) - 1)
+        return np.where(self._grid_keys[pos] == keys, self._grid_rules[pos], -1)
+
+    def _locate_interval(self, X):
+        rules = self.rules
+        # Descend the tree, one level at a time for all the points
+        nodes = np.zeros(len(X), dtype=int)
+        inner = np.flatnonzero(self._dims[nodes] >= 0)
+        while len(inner):
+            current = nodes[inner]
+            go_right = X[inner, self._dims[current]] > self._cuts[current]
+            nodes[inner] = self._children[current, go_right.astype(int)]
+            inner = inner[self._dims[nodes[inner]] >= 0]
+        starts = self._offsets[nodes]
+        counts = self._offsets[nodes + 1] - starts
+        # One pair (point, candidate rule) per rule of the leaf of each point
+        points = np.repeat(np.arange(len(X)), counts)
+        candidates = self._candidates[np.repeat(starts, counts) + np.arange(counts.sum())
+                                      - np.repeat(np.cumsum(counts) - counts, counts)]
+        x = X[points]
+        match = np.all((x >= rules.lb[candidates] - self.tol) & (x <= rules.ub[candidates] + self.tol), axis=1)
+        located = np.full(len(X), -1)
+        # Reversed, so that the first matching rule of each point is written last
+        located[points[match][::-1]] = candidates[match][::-1]
+        return located
+
+    def locate(self, X):
+        """
+        Returns the index of the rule whose hypercube contains each point.
+
+        :param X: points (see as_matrix)
+
+        :return: int array with the index of the rule of each point, -1 if no hypercube contains the point
+        """
+        X = self.as_matrix(X)
+        locate = self._locate_grid if self.kind == 'grid' else self._locate_interval
+        if len(X) <= LOCATE_CHUNK_ROWS:
+            return locate(X)
+        return np.concatenate([locate(X[i:i + LOCATE_CHUNK_ROWS]) for i in range(0, len(X), LOCATE_CHUNK_ROWS)])
+
+    def predict(self, X, located=None):
+        """
+        Evaluates the THEN expression of the active rule at each point.
+
+        :param X: points (see as_matrix)
+        :param located: optional result of locate on the same points
+
+        :return: float array with the prediction of each point, NaN if no hypercube contains the point
+        """
+        X = self.as_matrix(X)
+        if located is None:
+            located = self.locate(X)
+        rules = self.rules
+        found = located >= 0
+        rows = np.maximum(located, 0)
+        prediction = rules.intercept[rows] + np.einsum('ij,ij->i', rules.coef[rows], X)
+        return np.where(found, prediction, np.nan)
+
+
+def check_solution(sol, logic_constraints, algs, tol=1e-6):
+    """
+    Checks a solution of the EML model against the rules: for each algorithm, the rules whose hypercube contains the
+    values of their inputs in the solution are evaluated and compared with the value of their target. On a face shared
+    by two hypercubes, the solution can follow either rule.
+
+    :param sol: solution of EMLSession or EnumerationSession
+    :param logic_constraints: dict with the logic rules of each algorithm and ml model (see define_logic_rules)
+    :param algs: dict with the information of the algorithms and ml models (see define_algs_dict)
+    :param tol: tolerance on the target values
+
+    :return: dict mapping each algorithm to the tuple (rule index, predicted target, target in the solution,
+        True if the prediction matches the solution)
+    """
+    checks = {}
+    for alg in algs:
+        model = list(algs[alg]['ml_model'].keys())[0]
+        rules = as_compiled_rules(logic_constraints[alg][model])
+        x = np.array([sol[var_name] for var_name in rules.inputs], dtype=float)
+        actual = float(sol[rules.target])
+        # A single point: the containing rules are found directly on the compiled arrays
+        containing = np.flatnonzero(np.all((x >= rules.lb - tol) & (x <= rules.ub + tol), axis=1))
+        if len(containing) == 0:
+            checks[alg] = (-1, float('nan'), actual, False)
+            continue
+        predictions = rules.intercept[containing] + rules.coef[containing] @ x
+        best = int(np.argmin(np.abs(predictions - actual)))
+        checks[alg] = (int(containing[best]), float(predictions[best]), actual,
+                       bool(abs(predictions[best] - actual) <= tol * max(1., abs(actual))))
+    return checks
@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 12 10:02:11 2026
+
+Loading and compilation of the logic rules extracted by GridREx.
+"""
+
+import hashlib
+import os
+import re
+
+import numpy as np
+
+import const_define as cd
+
+# Bump when the compiled format changes, so that stale cache files are ignored
+RULES_FORMAT_VERSION = 1
+
+_RULE_RE = re.compile(r'\bIF\b(.*?)\bTHEN\b(.*?)(?=\bIF\b|\Z)', re.DOTALL)
+_RANGE_RE = re.compile(r'^\s*(\S+)\s+in\s+[\(\[]\s*(\S+?)\s*,\s*(\S+?)\s*[\)\]]\s*$')
+_THEN_RE = re.compile(r'^\s*(\S+)\s*==\s*(.+?)\s*$', re.DOTALL)
+
+
+def parse_linear_expression(s: str):
+    """
+    Parses a linear expression such as '66.20 + 4.02 * y_nScenarios'.
+    As in the GridREx exports, tokens (numbers, variable names and the '+', '-', '*' operators) are separated by spaces.
+
+    :param s: string containing the linear expression
+
+    :return: tuple (constant, dict mapping each variable name to its coefficient)
+    """
+    constant = 0.
+    coefs = {}
+    sign = 1.
+    expect_term = True
+    tokens = s.split()
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if expect_term and token in ['+', '-']:
+            # Unary sign
+            sign = sign if token == '+' else -sign
+            i += 1
+            continue
+        if not expect_term:
+            if token not in ['+', '-']:
+                raise ValueError(f"Expected '+' or '-' in linear expression '{s}', found '{token}'")
+            sign = 1. if token == '+' else -1.
+            expect_term = True
+            i += 1
+            continue
+
+        # Parse a term, i.e., a product of numbers and at most one variable
+        factor = sign
+        var_name = None
+        while True:
+            try:
+                factor *= float(tokens[i])
+            except ValueError:
+                if var_name is not None:
+                    raise ValueError(f"Non-linear term in linear expression '{s}'")
+                var_name = tokens[i]
+            i += 1
+            if i < len(tokens) and tokens[i] == '*':
+                i += 1
+                if i == len(tokens):
+                    raise ValueError(f"Dangling '*' in linear expression '{s}'")
+            else:
+                break
+
+        if var_name is None:
+            constant += factor
+        else:
+            coefs[var_name] = coefs.get(var_name, 0.) + factor
+        sign = 1.
+        expect_term = False
+
+    if expect_term:
+        raise ValueError(f"Incomplete linear expression '{s}'")
+
+    return constant, coefs
+
+
+def _model_var_name(name, alg):
+    """
+    Maps a dataset column name to the name of the corresponding model variable ('y_{VAR}' or 'y_{ALG}_{VAR}').
+    """
+    if name.startswith('y_'):
+        return name
+    if name in cd.ML_TARGETS:
+        return f'y_{alg}_{name}'
+    return f'y_{name}'
+
+
+def parse_gridrex_rules(text, alg):
+    """
+    Parses the textual export of GridREx, where each rule has the form
+
+        IF x1 in (0.99, 20.79) AND x2 in (33.1, 78.4)
+        THEN y == 66.20 + 4.02 * x1 + 3.48 * x2
+
+    Lines starting with '#' are comments. Variable names are mapped to the model variable names.
+
+    :param text: content of the export file
+    :param alg: algorithm the rules refer to
+
+    :return: list of tuples (dict {var: (lb, ub)}, target variable, constant, dict {var: coefficient})
+    """
+    text = '\n'.join(line for line in text.splitlines() if not line.lstrip().startswith('#'))
+    rules = []
+    for if_str, then_str in _RULE_RE.findall(text):
+        ranges = {}
+        for condition in re.split(r'\bAND\b', if_str):
+            match = _RANGE_RE.match(condition)
+            if match is None:
+                raise ValueError(f"Unsupported IF condition '{condition.strip()}'")
+            var_name, range_lb, range_ub = match.groups()
+            ranges[_model_var_name(var_name, alg)] = (float(range_lb), float(range_ub))
+
+        match = _THEN_RE.match(then_str)
+        if match is None:
+            raise ValueError(f"Unsupported THEN statement '{then_str.strip()}'")
+        target, expr = match.groups()
+        constant, coefs = parse_linear_expression(expr)
+        coefs = {_model_var_name(var_name, alg): coef for var_name, coef in coefs.items()}
+        rules.append((ranges, _model_var_name(target, alg), constant, coefs))
+
+    return rules
+
+
+class CompiledRules:
+    """
+    Array-backed representation of the GridREx rules of a single ML model.
+    Rule i is
+        IF lb[i, j] <= inputs[j] <= ub[i, j] for each j
+        THEN target == intercept[i] + sum_j coef[i, j] * inputs[j]
+    Unconstrained dimensions have infinite bounds.
+    """
+
+    def __init__(self, target, inputs, lb, ub, intercept, coef):
+        self.target = str(target)
+        self.inputs = [str(var_name) for var_name in inputs]
+        self.lb = np.asarray(lb, dtype=float).reshape(-1, len(self.inputs))
+        self.ub = np.asarray(ub, dtype=float).reshape(-1, len(self.inputs))
+        self.intercept = np.asarray(intercept, dtype=float)
+        self.coef = np.asarray(coef, dtype=float).reshape(-1, len(self.inputs))
+
+    @classmethod
+    def from_rules(cls, rules):
+        """
+        Compiles the rules returned by parse_gridrex_rules.
+        """
+        targets = {target for _, target, _, _ in rules}
+        if len(targets) != 1:
+            raise ValueError(f'Rules of a single ML model must share the target variable, found {sorted(targets)}')
+
+        # Column order: first appearance in the rules
+        inputs = []
+        for ranges, _, _, coefs in rules:
+            for var_name in list(ranges) + list(coefs):
+                if var_name not in inputs:
+                    inputs.append(var_name)
+        col = {var_name: j for j, var_name in enumerate(inputs)}
+
+        n, d = len(rules), len(inputs)
+        lb = np.full((n, d), -np.inf)
+        ub = np.full((n, d), np.inf)
+        intercept = np.zeros(n)
+        coef = np.zeros((n, d))
+        for i, (ranges, _, constant, coefs) in enumerate(rules):
+            for var_name, (range_lb, range_ub) in ranges.items():
+                lb[i, col[var_name]] = range_lb
+                ub[i, col[var_name]] = range_ub
+            intercept[i] = constant
+            for var_name, c in coefs.items():
+                coef[i, col[var_name]] = c
+
+        return cls(targets.pop(), inputs, lb, ub, intercept, coef)
+
+    @classmethod
+    def from_rule_dicts(cls, rule_dicts):
+        """
+        Compiles rules given in the dict format {'if': {...}, 'then': {...}} used by build_and_solve_EML.
+        """
+        rules = []
+        for rule in rule_dicts:
+            if_constraint, then_constraint = rule['if'], rule['then']
+            if any(cstr_type != 'range' for cstr_type in if_constraint['type']):
+                raise ValueError("Only 'range' constraints are supported in the IF statement")
+            if list(then_constraint['type']) != ['==']:
+                raise ValueError("Only a single '==' constraint is supported in the THEN statement")
+            ranges = dict(zip(if_constraint['variable'], if_constraint['value']))
+            constant, coefs = parse_linear_expression(then_constraint['value'][0])
+            rules.append((ranges, then_constraint['variable'][0], constant, coefs))
+        return cls.from_rules(rules)
+
+    def __len__(self):
+        return len(self.intercept)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.to_dict(i)
+
+    def take(self, indices):
+        """
+        Returns the rules at the given indices (or boolean mask) as a new CompiledRules object.
+        """
+        return CompiledRules(self.target, self.inputs, self.lb[indices], self.ub[indices], self.intercept[indices],
+                             self.coef[indices])
+
+    def to_dict(self, i):
+        """
+        Returns rule i in the dict format {'if': {...}, 'then': {...}} used by build_and_solve_EML.
+        """
+        constrained = np.isfinite(self.lb[i]) | np.isfinite(self.ub[i])
+        if_vars = [var_name for var_name, c in zip(self.inputs, constrained) if c]
+        expr = [repr(float(self.intercept[i]))]
+        for var_name, c in zip(self.inputs, self.coef[i]):
+            if c != 0:
+                expr.append(f'+ {float(c)!r} * {var_name}')
+        return {
+            'if': {
+                'variable': if_vars,
+                'type': ['range'] * len(if_vars),
+                'value': [(float(self.lb[i, j]), float(self.ub[i, j])) for j in np.flatnonzero(constrained)]
+            },
+            'then': {
+                'variable': [self.target],
+                'type': ['=='],
+                'value': [' '.join(expr)]
+            }
+        }
+
+    def save(self, path):
+        """
+        Saves the compiled rules to a .npz file.
+        """
+        # Write to a temporary file first, so that concurrent readers never see a partial file
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, version=RULES_FORMAT_VERSION, target=self.target, inputs=np.array(self.inputs, dtype=str),
+                     lb=self.lb, ub=self.ub, intercept=self.intercept, coef=self.coef)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads the compiled rules from a .npz file written by save.
+        """
+        with np.load(path) as data:
+            if int(data['version']) != RULES_FORMAT_VERSION:
+                raise ValueError(f'Unsupported compiled rules version in {path}')
+            return cls(target=data['target'][()], inputs=data['inputs'].tolist(), lb=data['lb'], ub=data['ub'],
+                       intercept=data['intercept'], coef=data['coef'])
+
+
+def as_compiled_rules(rules):
+    """
+    Returns the rules as a CompiledRules object, compiling them if they are given as a list of rule dicts.
+    """
+    if isinstance(rules, CompiledRules):
+        return rules
+    return CompiledRules.from_rule_dicts(rules)
+
+
+def align_rules(rules, target, inputs):
+    """
+    Returns the rules with their columns in the order of inputs, unconstrained and with zero coefficient on the inputs
+    they do not use.
+
+    :raise ValueError: if the rules predict another target or use an input not in inputs
+    """
+    if rules.target != target:
+        raise ValueError(f'Rules predict {rules.target}, expected {target}')
+    extra = [var_name for var_name in rules.inputs if var_name not in inputs]
+    if extra:
+        raise ValueError(f'Rules use inputs {extra} not in {list(inputs)}')
+    if rules.inputs == list(inputs):
+        return rules
+    cols = [rules.inputs.index(var_name) if var_name in rules.inputs else -1 for var_name in inputs]
+    n, d = len(rules), len(inputs)
+    lb, ub, coef = np.full((n, d), -np.inf), np.full((n, d), np.inf), np.zeros((n, d))
+    for j, col in enumerate(cols):
+        if col >= 0:
+            lb[:, j], ub[:, j], coef[:, j] = rules.lb[:, col], rules.ub[:, col], rules.coef[:, col]
+    return CompiledRules(target, inputs, lb, ub, rules.intercept, coef)
+
+
+def rule_keys(rules):
+    """
+    Returns the content keys of the rules: the bytes of the bounds of the hypercube of each rule, and the bytes of
+    the coefficients of its THEN expression (-0.0 is normalized to 0.0, so that equal rules have equal keys).
+    """
+    keys = []
+    for rows in [np.concatenate([rules.lb, rules.ub], axis=1), np.column_stack([rules.intercept, rules.coef])]:
+        rows = np.ascontiguousarray(rows + 0., dtype=float)
+        # One bytes object per row, without a Python loop
+        keys.append(rows.view(np.dtype((np.void, rows.shape[1] * rows.itemsize))).ravel().tolist())
+    return keys[0], keys[1]
+
+
+def index_rules(boxes, thens, ids):
+    """
+    Returns the index of a rule set by content, used by diff_rules: dict mapping the key of each hypercube to the
+    list of pairs (key of the THEN expression, id) of its rules.
+    """
+    index = {}
+    for box, then, rule_id in zip(boxes, thens, ids):
+        index.setdefault(box, []).append((then, rule_id))
+    return index
+
+
+def diff_rules(index, boxes, thens):
+    """
+    Compares a new rule set with the rules of an index (see index_rules), by content. A new rule is unchanged if an
+    indexed rule has the same hypercube and THEN expression, modified if an indexed rule has the same hypercube only,
+    and added otherwise; the indexed rules not matched are removed.
+
+    :param index: index of the current rules
+    :param boxes: hypercube keys of the new rules (see rule_keys)
+    :param thens: THEN keys of the new rules
+
+    :return: tuple (ids of the new rules, -1 for the added ones; pairs (id, index of the new rule) of the modified
+        rules; ids of the removed rules; indices of the added rules)
+    """
+    ids = np.full(len(boxes), -1)
+    matched = set()
+    pending = []
+    for i, (box, then) in enumerate(zip(boxes, thens)):
+        rule_id = next((rule_id for old_then, rule_id in index.get(box, ())
+                        if old_then == then and rule_id not in matched), None)
+        if rule_id is None:
+            pending.append(i)
+        else:
+            ids[i] = rule_id
+            matched.add(rule_id)
+    modified, added = [], []
+    for i in pending:
+        rule_id = next((rule_id for _, rule_id in index.get(boxes[i], ()) if rule_id not in matched), None)
+        if rule_id is None:
+            added.append(i)
+        else:
+            ids[i] = rule_id
+            matched.add(rule_id)
+            modified.append((rule_id, i))
+    removed = [rule_id for entries in index.values() for _, rule_id in entries if rule_id not in matched]
+    return ids, modified, removed, added
+
+
+def load_rules(alg, ml_model, rules_file=None, cache_dir=cd.CACHE_DIR):
+    """
+    Returns the compiled GridREx rules of the desired algorithm and ML model.
+    The export is parsed only once: the compiled rules are cached in cache_dir, keyed by the hash of the export content.
+
+    :param alg: algorithm of interest (i.e., 'ANTICIPATE' or 'CONTINGENCY')
+    :param ml_model: ml model of interest
+    :param rules_file: path of the GridREx export (default: '{ml_model}/{cd.RULES_FILE}')
+    :param cache_dir: directory of the compiled rules; if None, caching is disabled
+
+    :return: CompiledRules object
+    """
+    if rules_file is None:
+        rules_file = os.path.join(ml_model, cd.RULES_FILE)
+    with open(rules_file, 'rb') as f:
+        content = f.read()
+
+    cache_path = None
+    if cache_dir is not None:
+        key = hashlib.sha256(content)
+        key.update(f'{RULES_FORMAT_VERSION}:{alg}'.encode())
+        model_name = os.path.basename(os.path.normpath(ml_model))
+        cache_path = os.path.join(cache_dir, f'rules_{alg}_{model_name}_{key.hexdigest()[:16]}.npz')
+        if os.path.exists(cache_path):
+            return CompiledRules.load(cache_path)
+
+    rules = CompiledRules.from_rules(parse_gridrex_rules(content.decode('utf-8'), alg))
+
+    if alg in cd.TARGET and ml_model in cd.TARGET[alg]:
+        expected_target = _model_var_name(cd.TARGET[alg][ml_model], alg)
+        if rules.target != expected_target:
+            raise ValueError(f'Rules in {rules_file} predict {rules.target}, expected {expected_target}')
+
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        rules.save(cache_path)
+
+    return rules
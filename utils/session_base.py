@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:14:06 2026
+
+Bookkeeping shared by the sessions on the EML problem (utils.build_model_symbolic.EMLSession and
+utils.enumeration.EnumerationSession).
+"""
+
+from utils.util_functions import is_debug, print_log
+
+
+class SessionBase:
+    """
+    User constraints and solution reporting of a session. The subclasses keep the user constraints in _user_cts, a dict
+    mapping each handle to a tuple (variable, type, right-hand side, constraints), and implement add_user_constraint and
+    remove_user_constraint, as well as the list of algorithms algs, the variable lists DT_vars, DT_vars_int and
+    binary_vars_names and the solve_details of the last solve.
+    """
+
+    @property
+    def user_constraints(self):
+        """
+        Current user constraints, in the dict format {'variable': [...], 'type': [...], 'value': [...]}.
+        """
+        user_constraints = {'variable': [], 'type': [], 'value': []}
+        for var_name, cstr_type, v, _ in self._user_cts.values():
+            user_constraints['variable'].append(var_name)
+            user_constraints['type'].append(cstr_type)
+            user_constraints['value'].append(v)
+        return user_constraints
+
+    def set_user_constraints(self, user_constraints):
+        """
+        Replaces all the user constraints.
+
+        :param user_constraints: dict {'variable': [...], 'type': [...], 'value': [...]}
+
+        :return: list of the handles of the new constraints
+        """
+        for handle in list(self._user_cts):
+            self.remove_user_constraint(handle)
+        print_log("Custom constraints:")
+        return [self.add_user_constraint(var_name, cstr_type, v)
+                for var_name, cstr_type, v in zip(user_constraints['variable'], user_constraints['type'],
+                                                  user_constraints['value'])]
+
+    def print_solution(self, sol):
+        """
+        Prints the solution values of the problem variables.
+        """
+        if sol is None:
+            print_log('No solution found')
+        else:
+            print_log('SOLUTION DATA')
+            print_log('Solution time: {:.2f} (sec)'.format(self.solve_details.time))
+            print_log('Solver status: {}'.format(sol.solve_details.status))
+
+            print_log(f'\t*CONT VARIABLES')
+            for var in self.DT_vars:
+                print_log(f'\t\t* {var}: {sol[var]}')
+
+            print_log(f'\t*INT VARIABLES')
+            for var in self.DT_vars_int:
+                print_log(f'\t\t* {var}: {sol[var]}')
+
+            if is_debug():
+                print_log(f'\t*BINARY VARIABLES', level='debug')
+                for var in self.binary_vars_names:
+                    print_log(f'\t\t* {var}: {sol[var]}', level='debug')
+
+    def solution_point(self, sol, ml_trgt):
+        """
+        Returns the record of a solution: the status of the last solve, the chosen algorithm, its ML targets and the
+        values of the problem variables.
+
+        :param sol: solution of the last solve, or None
+        :param ml_trgt: ML targets to report
+
+        :return: dict with keys 'status', 'objective_value', 'algorithm', 'targets' and 'variables'
+        """
+        point = {'status': str(self.solve_details.status), 'objective_value': None, 'algorithm': None, 'targets': {},
+                 'variables': {}}
+        if sol is not None:
+            alg = max(self.algs, key=lambda a: sol[f'b_{a}'])
+            point['objective_value'] = sol.objective_value
+            point['algorithm'] = alg
+            point['targets'] = {var: sol[f'y_{alg}_{var}'] for var in ml_trgt}
+            point['variables'] = {getattr(var, 'name', var): sol[var] for var in self.DT_vars + self.DT_vars_int}
+        return point
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:37:05 2026
+
+Named solver parameter profiles, and the profiles tuned offline for each model (see utils.tuning).
+"""
+
+import datetime
+import json
+import os
+
+import const_define as cd
+from utils.util_functions import print_log
+
+# Parameters, named after the CPLEX parameter tree (e.g., 'mip.tolerances.mipgap' for parameters.mip.tolerances.mipgap)
+SOLVER_PROFILES = {
+    'default': {},
+    # Many solves at once in worker processes (e.g., utils.batch): one thread per solve, and a looser gap
+    'throughput': {'threads': 1, 'mip.tolerances.mipgap': 1e-3},
+    # A single solve as fast as possible: all the cores, opportunistic parallel search, feasible solutions first
+    'latency': {'threads': 0, 'parallel': -1, 'emphasis.mip': 1},
+    # Reproducible runs: deterministic parallel search, fixed seed, and careful numerics, so that the big-M
+    # constraints of the rules do not switch on by integrality tolerance
+    'deterministic': {'parallel': 1, 'randomseed': 0, 'emphasis.numerical': 1, 'mip.tolerances.integrality': 0.},
+}
+
+# HiGHS options equivalent to the parameters, with the conversion of their values; the other parameters are ignored
+HIGHS_OPTIONS = {
+    'threads': ('threads', int),
+    'randomseed': ('random_seed', int),
+    'mip.tolerances.mipgap': ('mip_rel_gap', float),
+    'mip.tolerances.absmipgap': ('mip_abs_gap', float),
+    'mip.tolerances.integrality': ('mip_feasibility_tolerance', lambda v: max(float(v), 1e-10)),
+    'preprocessing.presolve': ('presolve', lambda v: 'on' if v else 'off'),
+}
+
+
+def _cplex_param(parameters, name):
+    for part in name.split('.'):
+        parameters = getattr(parameters, part)
+    return parameters
+
+
+def apply_cplex_params(parameters, params, previous=()):
+    """
+    Sets the parameters of a CPLEX model, resetting to their default the previous ones not in params.
+
+    :param parameters: parameters of a docplex model (mdl.parameters) or of a cplex.Cplex object (cpx.parameters)
+    :param params: dict mapping the parameter names (e.g., 'emphasis.mip') to their values
+    :param previous: names of the parameters set before
+    """
+    for name in previous:
+        if name not in params:
+            _cplex_param(parameters, name).reset()
+    for name, value in params.items():
+        _cplex_param(parameters, name).set(value)
+
+
+def highs_options(params):
+    """
+    Returns the HiGHS options equivalent to the parameters (see HIGHS_OPTIONS).
+    """
+    options = {}
+    for name, value in params.items():
+        if name in HIGHS_OPTIONS:
+            option, convert = HIGHS_OPTIONS[name]
+            options[option] = convert(value)
+        else:
+            print_log(f'Parameter {name} has no HiGHS equivalent, ignored', level='debug')
+    return options
+
+
+def load_tuned_profiles(profiles_file=cd.SOLVER_PROFILES_FILE):
+    """
+    Returns the tuned profiles, {profile key: {backend: entry}} (see save_tuned_profile), or an empty dict.
+    """
+    if profiles_file is None or not os.path.exists(profiles_file):
+        return {}
+    with open(profiles_file) as f:
+        return json.load(f)
+
+
+def save_tuned_profile(model_key, backend, params, profiles_file=cd.SOLVER_PROFILES_FILE, **info):
+    """
+    Saves the tuned parameters of a model and backend, replacing the previous ones.
+
+    :param model_key: key of the model (see utils.model_io.rules_key)
+    :param backend: solver backend
+    :param params: dict with the parameters
+    :param profiles_file: JSON file of the tuned profiles
+    :param info: other fields of the entry (e.g., the measured solve times)
+
+    :return: the saved entry
+    """
+    profiles = load_tuned_profiles(profiles_file)
+    entry = dict(params=params, tuned_at=datetime.datetime.now().isoformat(timespec='seconds'), **info)
+    profiles.setdefault(model_key, {})[backend] = entry
+    os.makedirs(os.path.dirname(os.path.abspath(profiles_file)), exist_ok=True)
+    # Write to a temporary file first, so that concurrent readers never see a partial file
+    tmp_path = f'{profiles_file}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(profiles, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, profiles_file)
+    return entry
+
+
+def select_solver_params(solver_profile, model_key=None, backend='cplex', profiles_file=cd.SOLVER_PROFILES_FILE):
+    """
+    Returns the parameters of a solver profile.
+
+    :param solver_profile: name of a profile of SOLVER_PROFILES, dict of parameters, or None for the profile tuned for
+        the model and backend (see utils.tuning), if any, and the 'default' profile otherwise
+    :param model_key: key of the model (see utils.model_io.rules_key), used when solver_profile is None
+
+    :return: tuple (name of the profile, dict with the parameters)
+    """
+    if isinstance(solver_profile, dict):
+        return 'custom', dict(solver_profile)
+    if solver_profile is not None:
+        if solver_profile not in SOLVER_PROFILES:
+            raise ValueError(f"Unknown solver profile '{solver_profile}', choose among {list(SOLVER_PROFILES)}")
+        return solver_profile, dict(SOLVER_PROFILES[solver_profile])
+    entry = load_tuned_profiles(profiles_file).get(model_key, {}).get(backend) if model_key is not None else None
+    if entry is not None:
+        return 'tuned', dict(entry['params'])
+    return 'default', {}
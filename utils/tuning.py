@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 23:05:48 2026
+
+Offline tuning of the solver parameters on representative queries, saving the fastest profile of each base model.
+"""
+
+import itertools
+import random
+import statistics
+import time
+
+import const_define as cd
+from utils.build_model_symbolic import open_session
+from utils.model_io import rules_key, snapshot_key
+from utils.solver_params import SOLVER_PROFILES, save_tuned_profile
+from utils.util_functions import print_log
+
+# Parameters searched by the tuning, besides the named profiles. The first value of each parameter is its default,
+# omitted from the candidate profiles
+TUNING_SPACES = {
+    'cplex': {'threads': [0, 1],
+              'emphasis.mip': [0, 1, 2],
+              'mip.strategy.search': [0, 1, 2]},
+    'highs': {'preprocessing.presolve': [1, 0]},
+}
+
+# Parameters added to every candidate while it is timed, so that each solve starts from scratch: CPLEX would
+# otherwise start from the incumbent and basis of the previous solve of the same model. HiGHS reads the model again
+# at each solve (see utils.backends.solve_highs), so it needs none
+COLD_START_PARAMS = {
+    'cplex': {'advance': 0},
+    'highs': {},
+}
+
+# Relative tolerance on the objective values of a candidate, on top of its own mip gap
+TUNING_OBJECTIVE_TOL = 1e-4
+
+# After the first round, the candidates slower than this factor times the fastest one are not timed any more
+TUNING_PRUNE_FACTOR = 2.
+
+# Minimum relative gain over the default profile for the tuned profile to be saved
+TUNING_MIN_GAIN = 0.1
+
+
+def candidate_profiles(backend='cplex', space=None):
+    """
+    Returns the candidate profiles of the tuning: the named profiles (see SOLVER_PROFILES), then every combination of
+    the values of the search space.
+
+    :param backend: solver backend, selecting the default search space
+    :param space: dict mapping the parameter names to their values (the first one being the default); if None,
+        TUNING_SPACES[backend]
+
+    :return: list of tuples (name, dict of parameters), without duplicates, starting with ('default', {})
+    """
+    space = TUNING_SPACES[backend] if space is None else space
+    candidates = [(name, dict(params)) for name, params in SOLVER_PROFILES.items()]
+    for values in itertools.product(*space.values()):
+        params = {name: v for (name, choices), v in zip(space.items(), values) if v != choices[0]}
+        if all(params != other for _, other in candidates):
+            candidates.append(('custom', params))
+    return candidates
+
+
+def run_queries(session, queries, repeats=1, time_limit=20000, budget=None):
+    """
+    Solves the queries on a session with its current solver parameters, each one from scratch repeats times: the
+    previous solution is not used as MIP start, and the parameters of COLD_START_PARAMS are added during the solves.
+
+    :param session: EMLSession
+    :param queries: list of dicts with the 'user_constraints', 'objective_type' and 'objective_var' of a query, and
+        optionally the values of the problem variables to fix ('fixed', see EMLSession.fix_variables)
+    :param repeats: number of solves of each query
+    :param time_limit: time limit of each solve (sec)
+    :param budget: if the total time exceeds it (sec), the remaining queries are skipped
+
+    :return: tuple (list of the median solve times of the queries, list of the objective values of the queries,
+        None for the queries without a solution); the times are None if the budget is exceeded
+    """
+    params = session.solver_params
+    session.set_solver_params(dict(params, **COLD_START_PARAMS.get(session.backend, {})))
+    times = []
+    objectives = []
+    try:
+        for query in queries:
+            session.fix_variables(query.get('fixed', {}))
+            session.set_user_constraints(query['user_constraints'])
+            session.set_objective(query['objective_type'], query['objective_var'])
+            query_times = []
+            for _ in range(repeats):
+                session.last_solution = None
+                start = time.perf_counter()
+                sol = session.solve(time_limit=time_limit)
+                query_times.append(time.perf_counter() - start)
+            objectives.append(sol.objective_value if sol is not None else None)
+            times.append(statistics.median(query_times))
+            if budget is not None and sum(times) > budget:
+                return None, objectives
+    finally:
+        session.set_solver_params(params)
+    return times, objectives
+
+
+def _same_objectives(objectives, reference, params):
+    """
+    Returns True if the objective values of a candidate match the reference ones, within its mip gap.
+    """
+    tol = max(TUNING_OBJECTIVE_TOL, params.get('mip.tolerances.mipgap', 0.))
+    for value, ref in zip(objectives, reference):
+        if (value is None) != (ref is None):
+            return False
+        if value is not None and abs(value - ref) > tol * max(1., abs(ref)):
+            return False
+    return True
+
+
+def _total_time(round_times):
+    """
+    Returns the total over the queries of their median solve time across the rounds.
+    """
+    return sum(statistics.median(query_times) for query_times in zip(*round_times))
+
+
+def tune_solver_profile(df_mins, df_maxs, logic_constraints, queries, enable_var_type=False, inst_descr=None,
+                        ml_trgt=None, algs=None, formulation='indicator', grid_encoding='unary',
+                        objective_linearization='mccormick', backend='cplex', snapshot_dir=cd.SNAPSHOT_DIR,
+                        space=None, repeats=3, time_limit=20000, profiles_file=cd.SOLVER_PROFILES_FILE,
+                        min_gain=TUNING_MIN_GAIN, seed=0, profile_key=None):
+    """
+    Tunes the solver parameters of a base model. The candidate profiles (see candidate_profiles) solve the
+    representative queries in repeats rounds, in a new random order at each round, so that no candidate is favored by
+    its position (e.g., by the warm-up of the process); after the first round, the candidates whose objective values
+    differ from those of the default profile, or slower than TUNING_PRUNE_FACTOR times the fastest one, are dropped.
+    The fastest candidate, by the total of the median times of the queries, is then timed again against the default
+    profile, alternating the two, and saved in profiles_file (under the key of the rules and the backend) only if it is
+    faster than the default profile by min_gain at least. open_session and build_and_solve_EML then use it whenever
+    they build (or reload) a model of the same rules with the same backend and no explicit solver profile, whatever
+    the user constraints.
+
+    :param queries: list of representative queries (see run_queries)
+    :param space: search space of the parameters (see candidate_profiles)
+    :param repeats: number of rounds, i.e., of solves of each query with each candidate
+    :param time_limit: time limit of each solve (sec)
+    :param profiles_file: JSON file of the tuned profiles; if None, the profile is not saved
+    :param min_gain: minimum relative gain of the fastest profile over the default one for it to be saved
+    :param seed: seed of the order of the candidates
+    :param profile_key: key the profile is saved under (see utils.model_io.rules_key); if None, the key of
+        logic_constraints. Pass the key of the rules before the presolve, as the later runs do
+    The other parameters are those of build_and_solve_EML.
+
+    :return: dict with the fastest profile ('profile' and 'params'), the total solve time of the queries with it
+        ('solve_time') and with the default profile ('default_solve_time') when timed against each other, and whether
+        it has been saved ('saved')
+    """
+    key = snapshot_key(df_mins=df_mins, df_maxs=df_maxs, logic_constraints=logic_constraints, algs=algs,
+                       inst_descr=inst_descr, ml_trgt=ml_trgt, enable_var_type=enable_var_type,
+                       formulation=formulation, grid_encoding=grid_encoding)
+    if profile_key is None:
+        profile_key = rules_key(logic_constraints=logic_constraints, algs=algs, inst_descr=inst_descr, ml_trgt=ml_trgt,
+                                enable_var_type=enable_var_type, formulation=formulation, grid_encoding=grid_encoding)
+    session = open_session(df_mins=df_mins, df_maxs=df_maxs, logic_constraints=logic_constraints,
+                           enable_var_type=enable_var_type, inst_descr=inst_descr, ml_trgt=ml_trgt, algs=algs,
+                           formulation=formulation, grid_encoding=grid_encoding,
+                           objective_linearization=objective_linearization, backend=backend,
+                           snapshot_dir=snapshot_dir, key=key, solver_profile='default')
+    candidates = candidate_profiles(backend=backend, space=space)
+    rng = random.Random(seed)
+
+    print_log(f'\n=== Tuning the solver parameters of model {profile_key} ({backend}): {len(candidates)} candidates, '
+              f'{len(queries)} queries x {repeats} rounds')
+    start = time.perf_counter()
+    # Solve times of the queries of each candidate at each round, and objective values of the first round
+    round_times = {k: [] for k in range(len(candidates))}
+    objectives = {}
+    for n_round in range(repeats):
+        order = list(round_times)
+        rng.shuffle(order)
+        best = min(_total_time(round_times[k]) for k in order) if n_round > 0 else None
+        for k in order:
+            name, params = candidates[k]
+            session.set_solver_params(params)
+            # A candidate much slower than the best one so far is stopped as soon as it exceeds its budget; the default
+            # profile is always timed, as the reference of the others
+            budget = TUNING_PRUNE_FACTOR * best if n_round > 0 and k > 0 else None
+            times, objectives[k] = run_queries(session, queries, time_limit=time_limit, budget=budget)
+            if times is None:
+                print_log(f'\t* {name} {params}: slower than the best profile', level='debug')
+                del round_times[k]
+            else:
+                round_times[k].append(times)
+        if n_round == 0:
+            for k in list(round_times):
+                name, params = candidates[k]
+                if k > 0 and not _same_objectives(objectives[k], objectives[0], params):
+                    print_log(f'\t* {name} {params}: objective values differ from the default profile, discarded')
+                    del round_times[k]
+    session.set_solver_params({})
+    for k, times in round_times.items():
+        print_log(f'\t* {candidates[k][0]} {candidates[k][1]}: {_total_time(times):.3f} sec')
+
+    fastest = min(round_times, key=lambda k: _total_time(round_times[k]))
+    name, params = candidates[fastest]
+    # The fastest candidate against the default profile (candidate 0, never discarded), alternating them
+    final_times = {fastest: [], 0: []}
+    if fastest != 0:
+        for n_round in range(repeats):
+            for k in ([fastest, 0] if n_round % 2 else [0, fastest]):
+                session.set_solver_params(candidates[k][1])
+                final_times[k].append(run_queries(session, queries, time_limit=time_limit)[0])
+        session.set_solver_params({})
+    else:
+        final_times[0] = round_times[0]
+    solve_time, default_time = _total_time(final_times[fastest]), _total_time(final_times[0])
+    saved = fastest != 0 and solve_time <= (1. - min_gain) * default_time
+    result = {'profile': name, 'params': params, 'solve_time': solve_time, 'default_solve_time': default_time,
+              'saved': saved and profiles_file is not None}
+    print_log(f'Fastest profile: {name} {params}, {solve_time:.3f} sec ({default_time:.3f} sec with the default '
+              f'profile), tuned in {time.perf_counter() - start:.2f} sec')
+    if not saved:
+        print_log(f'Not faster than the default profile by {min_gain:.0%}, not saved')
+    elif profiles_file is not None:
+        save_tuned_profile(profile_key, backend, params, profiles_file=profiles_file, profile=name,
+                           solve_time=solve_time, default_solve_time=default_time, queries=len(queries),
+                           repeats=repeats)
+        print_log(f'Tuned profile saved to: {profiles_file}')
+    return result
@@ -5,14 +5,25 @@ Created on Thu Mar 2 16:37:45 2023
 @author: EleMisi
 """
 
-import csv
+import atexit
+import hashlib
+import logging
+import logging.handlers
 import os
-import time
+import queue
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
-import pandas as pd
 
 import const_define as cd
+from utils.rule_sets import load_rules
+
+# 'warning' is only used as the level of a message, e.g., print_log(..., level='warning')
+LOG_LEVELS = {'quiet': logging.WARNING, 'warning': logging.WARNING, 'info': logging.INFO, 'debug': logging.DEBUG}
+
+# Bump when the format of the training dataset cache changes
+TRAIN_CACHE_VERSION = 1
 
 
 def define_algs_dict(ml_models: list, algs: list):
@@ -41,54 +52,273 @@ def define_algs_dict(ml_models: list, algs: list):
     return algs_dict
 
 
-def load_var_intervals(algs_dict):
+def parse_series_column(col):
+    """
+    Parses a column of stringified arrays (e.g., '[  0.    10.4  20.4 ...]') in a single pass.
+
+    :param col: pandas Series of strings
+
+    :return: tuple (float array with the concatenated entries, int array with the length of each entry)
+    """
+    if len(col) == 0:
+        return np.empty(0), np.empty(0, dtype=int)
+    # The closing brackets become NaN separators, which give the length of each entry
+    text = ' '.join(col.to_numpy(dtype=str)).replace('[', ' ').replace(']', ' nan ')
+    values = np.fromstring(text, sep=' ')
+    separators = np.flatnonzero(np.isnan(values))
+    if len(separators) == len(col):
+        lengths = np.diff(separators, prepend=-1) - 1
+        values = np.delete(values, separators)
+    else:
+        # NaN entries in the arrays: count the entries of each array
+        lengths = col.str.count(r'[^\s\[\]]+').to_numpy(dtype=int)
+        text = ' '.join(col.to_numpy(dtype=str)).replace('[', ' ').replace(']', ' ')
+        values = np.fromstring(text, sep=' ')
+    if values.size != lengths.sum() or np.any(lengths == 0):
+        raise ValueError(f'Malformed array entries in column {col.name}')
+    return values, lengths
+
+
+def series_mean_std(values, lengths):
+    """
+    Returns the mean and the standard deviation of each entry of a column parsed by parse_series_column.
+    """
+    if len(lengths) == 0:
+        return np.empty(0), np.empty(0)
+    starts = np.cumsum(lengths) - lengths
+    mean = np.add.reduceat(values, starts) / lengths
+    dev = values - np.repeat(mean, lengths)
+    std = np.sqrt(np.add.reduceat(dev * dev, starts) / lengths)
+    return mean, std
+
+
+def _train_dataset_path(alg):
+    """
+    Returns the path of the training dataset of alg.
+    """
+    return os.path.join(cd.DATA_DIR, '{}_trainDataset.csv'.format(alg))
+
+
+def _train_dataset_key(path, cols, *extra):
+    """
+    Returns the cache key of a training dataset, i.e., the hash of its path, size and modification time, of the
+    parsed columns and of any extra parameter.
+    """
+    stat = os.stat(path)
+    return hashlib.sha256(f'{TRAIN_CACHE_VERSION}:{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}:'
+                          f'{cols}:{extra}'.encode()).hexdigest()[:16]
+
+
+def _save_npz(path, **arrays):
+    """
+    Saves the arrays to a .npz file, writing to a temporary file first so that concurrent readers never see a
+    partial file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def _parse_train_chunk(df, alg_params, cols):
+    """
+    Parses (a chunk of) a training dataset read as strings.
+
+    :return: tuple (table with the cols of each sample, (PV values, PV lengths), (Load values, Load lengths))
+    """
+    # Removes header entries
+    df = df[df['sol(keuro)'] != 'sol(keuro)'].copy()
+
+    # Algorithm specific vars
+    for var in alg_params.values():
+        df[var['name']] = df[var['name']].astype(float).astype(var['type'])
+
+    # Fixed stuff which is always there
+    pv_values, pv_lengths = parse_series_column(df['PV(kW)'])
+    load_values, load_lengths = parse_series_column(df['Load(kW)'])
+    df['sol(keuro)'] = df['sol(keuro)'].astype(float)
+    df['time(sec)'] = df['time(sec)'].astype(float)
+    df['memAvg(MB)'] = df['memAvg(MB)'].astype(float)
+
+    df['PV_mean'], df['PV_std'] = series_mean_std(pv_values, pv_lengths)
+    df['Load_mean'], df['Load_std'] = series_mean_std(load_values, load_lengths)
+
+    return df[cols].to_numpy(dtype=float), (pv_values, pv_lengths), (load_values, load_lengths)
+
+
+def _train_dataset_cache(alg, alg_params, cache_dir=cd.CACHE_DIR, path=None):
+    """
+    Returns the path of the binary cache of the training dataset of alg, parsing the csv file if the cache is missing
+    or stale. The cache is keyed by the path, size and modification time of the csv file.
+    """
+    path = path or _train_dataset_path(alg)
+    cols = [var['name'] for var in alg_params.values()] + cd.INSTANCE_FEATURES + cd.ML_TARGETS
+    cache_path = os.path.join(cache_dir, f'{alg}_trainDataset_{_train_dataset_key(path, cols)}.npz')
+    if os.path.exists(cache_path):
+        return cache_path
+
+    import pandas as pd
+
+    table, (pv_values, pv_lengths), (load_values, load_lengths) = _parse_train_chunk(pd.read_csv(path, dtype=str),
+                                                                                     alg_params, cols)
+    _save_npz(cache_path, columns=np.array(cols, dtype=str), table=table,
+              mins=table.min(axis=0), maxs=table.max(axis=0),
+              pv_values=pv_values, pv_lengths=pv_lengths,
+              load_values=load_values, load_lengths=load_lengths)
+
+    return cache_path
+
+
+def load_train_dataset(alg, alg_params, cache_dir=cd.CACHE_DIR):
+    """
+    Returns the training dataset of an algorithm, i.e., the algorithm parameters, the instance features and the ML
+    targets of each training sample. The csv file is parsed only once and cached in cache_dir.
+
+    :param alg: algorithm of interest (i.e., 'ANTICIPATE' or 'CONTINGENCY')
+    :param alg_params: dict with the algorithm parameters (algs_dict[alg]['alg_params'])
+    :param cache_dir: directory of the cache
+
+    :return: pd.DataFrame with one column per variable
+    """
+    import pandas as pd
+
+    with np.load(_train_dataset_cache(alg, alg_params, cache_dir=cache_dir)) as data:
+        return pd.DataFrame(data['table'], columns=data['columns'].tolist())
+
+
+def load_instances(path=cd.VALIDATION_SET):
+    """
+    Returns the instance features of the PV/Load instances of a csv file with columns 'PV(kW)' and 'Load(kW)' (e.g.,
+    the empirical validation set). The series of all the instances are parsed in a single pass.
+
+    :param path: path of the csv file
+
+    :return: pd.DataFrame with the instance features (cd.INSTANCE_FEATURES), indexed as in the csv file
+    """
+    import pandas as pd
+
+    df = pd.read_csv(path, dtype=str, index_col=0)
+    features = pd.DataFrame(index=df.index.astype(int))
+    features['PV_mean'], features['PV_std'] = series_mean_std(*parse_series_column(df['PV(kW)']))
+    features['Load_mean'], features['Load_std'] = series_mean_std(*parse_series_column(df['Load(kW)']))
+    return features[cd.INSTANCE_FEATURES]
+
+
+def _streaming_bounds(path, alg_params, cols, chunksize, quantiles, sample_size, seed=0):
+    """
+    Computes the bounds of the cols of a training dataset reading it in chunks, so that the memory is bounded by the
+    chunk size. The bounds are the running min/max or, if quantiles is given, the quantiles of a uniform sample of
+    sample_size rows (bottom-k sampling on random keys).
+    """
+    import pandas as pd
+
+    mins = np.full(len(cols), np.inf)
+    maxs = np.full(len(cols), -np.inf)
+    rng = np.random.default_rng(seed)
+    sample = np.empty((0, len(cols)))
+    sample_keys = np.empty(0)
+    for df in pd.read_csv(path, dtype=str, chunksize=chunksize):
+        table = _parse_train_chunk(df, alg_params, cols)[0]
+        if len(table) == 0:
+            continue
+        mins = np.minimum(mins, table.min(axis=0))
+        maxs = np.maximum(maxs, table.max(axis=0))
+        if quantiles is not None:
+            sample = np.concatenate([sample, table])
+            sample_keys = np.concatenate([sample_keys, rng.random(len(table))])
+            if len(sample) > sample_size:
+                keep = np.argpartition(sample_keys, sample_size)[:sample_size]
+                sample, sample_keys = sample[keep], sample_keys[keep]
+
+    if quantiles is not None:
+        mins, maxs = np.quantile(sample, quantiles, axis=0)
+    return mins, maxs
+
+
+def _train_bounds(alg, alg_params, path, cache_dir, streaming, chunksize, quantiles, sample_size,
+                  cached_only=False):
+    """
+    Returns the columns and the bounds of the training dataset of alg (see load_var_intervals), or None if
+    cached_only is True and the bounds are not cached.
+    """
+    cols = [var['name'] for var in alg_params.values()] + cd.INSTANCE_FEATURES + cd.ML_TARGETS
+    if not streaming:
+        cache_path = os.path.join(cache_dir, f'{alg}_trainDataset_{_train_dataset_key(path, cols)}.npz')
+        if cached_only and not os.path.exists(cache_path):
+            return None
+        with np.load(_train_dataset_cache(alg, alg_params, cache_dir=cache_dir, path=path)) as data:
+            if quantiles is None:
+                return cols, data['mins'], data['maxs']
+            mins, maxs = np.quantile(data['table'], quantiles, axis=0)
+            return cols, mins, maxs
+
+    key = _train_dataset_key(path, cols, quantiles, sample_size if quantiles is not None else None)
+    cache_path = os.path.join(cache_dir, f'{alg}_trainBounds_{key}.npz')
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as data:
+            return cols, data['mins'], data['maxs']
+    if cached_only:
+        return None
+    mins, maxs = _streaming_bounds(path, alg_params, cols, chunksize, quantiles, sample_size)
+    _save_npz(cache_path, columns=np.array(cols, dtype=str), mins=mins, maxs=maxs)
+    return cols, mins, maxs
+
+
+def load_var_intervals(algs_dict, cache_dir=cd.CACHE_DIR, streaming=False, chunksize=100000, quantiles=None,
+                       sample_size=100000, n_jobs=None):
     """
     Wrap-up function of Boscarini's code.
+    The training datasets are parsed only once, then the bounds are read from the cache (see load_train_dataset).
+    The algorithms whose bounds are not cached are processed concurrently in a process pool.
 
     :param algs_dict: dict with the information of the algorithma and ml models.
+    :param cache_dir: directory of the cache
+    :param streaming: if True, the datasets are read in chunks of chunksize rows and only the bounds are cached,
+        so that datasets that do not fit in memory can be processed
+    :param chunksize: number of rows of each chunk in streaming mode
+    :param quantiles: optional tuple (lower, upper) of quantiles used as robust bounds instead of min/max. In
+        streaming mode, they are computed on a uniform sample of sample_size rows
+    :param sample_size: number of rows sampled to compute the quantiles in streaming mode
+    :param n_jobs: number of worker processes (default: one per algorithm to process)
 
     :return: dict with lower and upper bounds of the problem variables.
     """
+    # pandas is imported lazily, so that importing this module (e.g., for print_log) stays cheap
+    import pandas as pd
+
     globminlist = []
     globmaxlist = []
     globmaxdict = {}
     globmindict = {}
 
+    """#### Load dataset bounds"""
+    args = {alg: (alg, algs_dict[alg]['alg_params'], _train_dataset_path(alg), cache_dir, streaming, chunksize,
+                  quantiles, sample_size) for alg in algs_dict.keys()}
+    bounds = {alg: _train_bounds(*args[alg], cached_only=True) for alg in algs_dict.keys()}
+    missing = [alg for alg in algs_dict.keys() if bounds[alg] is None]
+    if len(missing) > 1 and n_jobs != 1:
+        with ProcessPoolExecutor(max_workers=n_jobs or len(missing)) as executor:
+            futures = {alg: executor.submit(_train_bounds, *args[alg]) for alg in missing}
+            for alg, future in futures.items():
+                bounds[alg] = future.result()
+    else:
+        for alg in missing:
+            bounds[alg] = _train_bounds(*args[alg])
+
     for alg in algs_dict.keys():
-        """#### Load dataset"""
-        path = os.path.join(cd.DATA_DIR, '{}_trainDataset.csv'.format(alg))
-        df = pd.read_csv(path)
-
-        # Removes header entries
-        df = df[df['sol(keuro)'] != 'sol(keuro)']
-
-        # Algorithm specific vars
-        for var in algs_dict[alg]['alg_params'].values():
-            df[var['name']] = df[var['name']].astype(var['type'])
-
-        # Fixed stuff which is always there
-        df['PV(kW)'] = df['PV(kW)'].map(lambda entry: entry[1:-1].split())
-        df['PV(kW)'] = df['PV(kW)'].map(lambda entry: list(np.float_(entry)))
-        df['Load(kW)'] = df['Load(kW)'].map(lambda entry: entry[1:-1].split())
-        df['Load(kW)'] = df['Load(kW)'].map(lambda entry: list(np.float_(entry)))
-        df['sol(keuro)'] = df['sol(keuro)'].astype(float)
-        df['time(sec)'] = df['time(sec)'].astype(float)
-        df['memAvg(MB)'] = df['memAvg(MB)'].astype(float)
-
-        df['PV_mean'] = df['PV(kW)'].map(lambda entry: np.array(entry).mean())
-        df['PV_std'] = df['PV(kW)'].map(lambda entry: np.array(entry).std())
-        df['Load_mean'] = df['Load(kW)'].map(lambda entry: np.array(entry).mean())
-        df['Load_std'] = df['Load(kW)'].map(lambda entry: np.array(entry).std())
-
-        cur_cols = algs_dict[alg]['dataset_cols']
+        columns, mins, maxs = bounds[alg]
+        mins = pd.Series(mins, index=columns)
+        maxs = pd.Series(maxs, index=columns)
+
+        cur_cols = list(algs_dict[alg]['dataset_cols'])
         cur_cols.extend(cd.INSTANCE_FEATURES + cd.ML_TARGETS)
-        df_s = df[cur_cols]
 
-        globminlist.append(df_s.min())
-        globmaxlist.append(df_s.max())
+        globminlist.append(mins[cur_cols])
+        globmaxlist.append(maxs[cur_cols])
 
-        globmaxdict[alg] = df_s.max()
-        globmindict[alg] = df_s.min()
+        globmaxdict[alg] = maxs[cur_cols]
+        globmindict[alg] = mins[cur_cols]
 
     globmax = pd.DataFrame(globmaxlist).max()
     globmin = pd.DataFrame(globminlist).min()
@@ -101,172 +331,114 @@ def load_var_intervals(algs_dict):
 
 def define_logic_rules(algs, ml_models):
     """
-    Returns the logic rules for the desired algorithm(s) and model(s).
-    TODO: this is a temporary function, needs to be improved and extended to consider all the algorithms and all the models.
-    TODO: create a pickle file with the rules in the xlsx fil already transformed in the required dict format.
+    Returns the logic rules extracted by GridREx for the desired algorithm(s) and model(s).
+    The rules are read from the GridREx export in each model directory and compiled (and cached) by load_rules.
 
     :param algs: list of algorithm(s) of interest
     :param ml_models: list of ml model(s) of interest
 
-    :return: dict containing the logic rules for the desired algorithm(s) and model(s)
-    """
-
-    # TODO: I focused on 'no_input-memory_DecisionTree_MaxDepth10' with ANTICIPATE algorithm.
-    #  Extend the procedure to the other models.
-    assert algs == ['ANTICIPATE'] and ml_models == [
-        cd.MODEL_DIR + '/no_input-memory_DecisionTree_MaxDepth10'], "Currently supported algorithm and ml model are 'ANTICIPATE' and 'no_input-memory_DecisionTree_MaxDepth10' \n TODO: Extend to others "
-
-    logic_constraints = {'ANTICIPATE': {}}
-    logic_constraints['ANTICIPATE'][cd.MODEL_DIR + '/no_input-memory_DecisionTree_MaxDepth10'] = []
-    logic_constraints['ANTICIPATE'][cd.MODEL_DIR + '/no_input-memory_DecisionTree_MaxDepth10'].append({
-        'if': {
-            'variable': ['y_nScenarios'],
-            'type': ['range'],
-            'value': [(0.99, 20.79)]
-        },
-        'then': {
-            'variable': ['y_ANTICIPATE_memAvg(MB)'],
-            'type': ['=='],
-            'value': ['66.20 + 4.02 * y_nScenarios']
-        }
-    })
-
-    logic_constraints['ANTICIPATE'][cd.MODEL_DIR + '/no_input-memory_DecisionTree_MaxDepth10'].append({
-        'if': {
-            'variable': ['y_nScenarios'],
-            'type': ['range'],
-            'value': [(20.79, 40.6)]
-        },
-        'then': {
-            'variable': ['y_ANTICIPATE_memAvg(MB)'],
-            'type': ['=='],
-            'value': ['88.71 + 2.59 * y_nScenarios']
-        }
-    })
-
-    logic_constraints['ANTICIPATE'][cd.MODEL_DIR + '/no_input-memory_DecisionTree_MaxDepth10'].append({
-        'if': {
-            'variable': ['y_nScenarios'],
-            'type': ['range'],
-            'value': [(40.6, 60.4)]
-        },
-        'then': {
-            'variable': ['y_ANTICIPATE_memAvg(MB)'],
-            'type': ['=='],
-            'value': ['83.04 + 2.68 * y_nScenarios']
-        }
-    })
-
-    logic_constraints['ANTICIPATE'][cd.MODEL_DIR + '/no_input-memory_DecisionTree_MaxDepth10'].append({
-        'if':
-            {'variable': ['y_nScenarios'],
-             'type': ['range'],
-             'value': [(60.4, 80.20)]}
-        ,
-        'then': {
-            'variable': ['y_ANTICIPATE_memAvg(MB)'],
-            'type': ['=='],
-            'value': ['77.25 + 2.73 * y_nScenarios']
-        }
-    })
-
-    logic_constraints['ANTICIPATE'][cd.MODEL_DIR + '/no_input-memory_DecisionTree_MaxDepth10'].append({
-        'if':
-            {'variable': ['y_nScenarios'],
-             'type': ['range'],
-             'value': [(80.20, 100.00)]}
-        ,
-        'then': {
-            'variable': ['y_ANTICIPATE_memAvg(MB)'],
-            'type': ['=='],
-            'value': ['107.64 + 2.30 * y_nScenarios']
-        }
-    })
+    :return: dict containing the compiled logic rules (CompiledRules) for the desired algorithm(s) and model(s)
+    """
+
+    logic_constraints = {}
+    for alg in algs:
+        logic_constraints[alg] = {}
+        for model in ml_models:
+            logic_constraints[alg][model] = load_rules(alg=alg, ml_model=model)
 
     return logic_constraints
 
 
-def get_linear_expression(s: str):
+class _BufferedFileHandler(logging.FileHandler):
+    """
+    File handler that keeps one buffered file handle per run, instead of flushing the file at every record.
     """
-    Returns the input linear expression with the link to the cplex model variables.
 
-    :param s: string containing the linear expression
+    def __init__(self, filename, buffering=1 << 16):
+        self.buffering = buffering
+        super().__init__(filename, mode='a', delay=True)
 
-    :return:
-        A string with where the variables' name in the original linear expression have been replaced by the corresponding
-        cplex model variables
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=self.buffering, encoding=self.encoding)
 
-    """
-    l = s.split()
-    for i, token in enumerate(l):
+    def emit(self, record):
+        if self.stream is None:
+            self.stream = self._open()
         try:
-            eval(token)
-            l[i] = token
+            self.stream.write(self.format(record) + self.terminator)
         except Exception:
-            if token in ['+', '-', '*']:
-                l[i] = token
-            else:
-                var = f'mdl.get_var_by_name("{token}")'
-                l[i] = var
-    linear_expr = ' '.join(l)
-
-    return linear_expr
-
-
-def write_logs(EML_times, sol, mdl, DT_vars, user_constraints, objective_type,
-               objective_var, model_name, log_path="/content/EML_results"):
-    """
-    TODO: Boscarini's function to be 1) refactored for printing also logic constraints, 2) cleaned and 3) documented.
-    :param string:
-    :param log_file:
-    :return:
-    """
-    #### Log TIMES
-    EML_times['after_solve_time'] = time.time()
-    times = [EML_times['after_solve_time'] - EML_times['before_modelEM_time']]
-    labels = ['tot_solve_time']
-    for time_label in EML_times:
-        labels.append(time_label)
-        times.append(f"{EML_times[time_label] - EML_times['before_modelEM_time']}")
-    times.append(mdl.solve_details.time)
-    labels.append('CPLEX_time(sol)')
-    with open(f"{log_path}/time_logs.csv", mode='a+') as results_file:
-        results_writer = csv.writer(results_file, delimiter=',', quotechar='"',
-                                    quoting=csv.QUOTE_MINIMAL)
-        results_writer.writerow(labels)
-        results_writer.writerow(times)
-
-    #### Log DATA & SOLUTION
-    objective_str = f"{objective_type}({objective_var})"
-    user_constraints_strs = []
-    for i in range(len(user_constraints['variable'])):
-        var_name = user_constraints['variable'][i]
-        cstr_type = user_constraints['type'][i]
-        v = user_constraints['value'][i]
-        user_constraints_strs.append(f'{var_name}{cstr_type}{v}')
-    sols = [objective_str, user_constraints_strs, model_name]
-    labels = ['objective', 'constraints', 'model_file']
-
-    # solution
-    if sol is None:
-        sols = sols + ['No sol found']
-        labels = labels + ['status']
+            self.handleError(record)
+
+
+_logger = logging.getLogger('eml')
+_log_listener = None
+
+
+def setup_logging(level='info', log_file='log_shell.txt', background=False):
+    """
+    Configures the log of print_log. Records are printed to stdout and appended to log_file through a single buffered
+    file handle, which is flushed when the logging is closed (see close_logging) or at exit.
+
+    :param level: 'quiet' (warnings only), 'info' or 'debug' (also per-rule and per-constraint dumps)
+    :param log_file: path of the log file; if None, the records are only printed
+    :param background: if True, the records are formatted and written by a background thread
+    """
+    global _log_listener
+    assert level in LOG_LEVELS, f"Unsupported log level '{level}', choose among {list(LOG_LEVELS)}"
+    close_logging()
+
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file is not None:
+        handlers.append(_BufferedFileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter('%(message)s'))
+
+    _logger.setLevel(LOG_LEVELS[level])
+    _logger.propagate = False
+    if background:
+        log_queue = queue.SimpleQueue()
+        _logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        _log_listener = logging.handlers.QueueListener(log_queue, *handlers)
+        _log_listener.start()
+    else:
+        for handler in handlers:
+            _logger.addHandler(handler)
+
+
+def close_logging():
+    """
+    Stops the background thread (if any), flushes and closes the log handlers.
+    """
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        handlers = _log_listener.handlers
+        _log_listener = None
     else:
-        sols = sols + [f"{sol.solve_details.status}", '{:.2f}'.format(
-            mdl.solve_details.time)]
-        labels = labels + ['status', 'time']
-        for var in DT_vars:
-            labels.append(var)
-            sols.append(f"{sol[var]}")
-
-    with open(f"{log_path}/sol_logs.csv", mode='a+') as results_file:
-        results_writer = csv.writer(results_file, delimiter=',', quotechar='"',
-                                    quoting=csv.QUOTE_MINIMAL)
-        results_writer.writerow(labels)
-        results_writer.writerow(sols)
-
-
-def print_log(string, log_file='log_shell.txt'):
-    print(string)
-    with open(log_file, mode='a+') as f:
-        f.write(string + '\n')
+        handlers = []
+    for handler in list(_logger.handlers) + list(handlers):
+        _logger.removeHandler(handler)
+        # NB: closing a StreamHandler does not close sys.stdout
+        handler.close()
+
+
+atexit.register(close_logging)
+
+
+def is_debug():
+    """
+    Returns True if debug records are logged, so that expensive dumps can be skipped otherwise.
+    """
+    if not _logger.handlers:
+        setup_logging()
+    return _logger.isEnabledFor(logging.DEBUG)
+
+
+def print_log(string, level='info'):
+    """
+    Logs the string with the desired level (see setup_logging). The logging is configured with the default
+    settings on first use.
+    """
+    if not _logger.handlers:
+        setup_logging()
+    _logger.log(LOG_LEVELS[level], string)